@@ -1,19 +1,59 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from __future__ import annotations
+
+from fastapi import Depends, FastAPI, File, UploadFile, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from PIL import Image
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Match
+import asyncio
+import hashlib
+import importlib.util
 import io
+import json
+import multiprocessing
+import os
 import re
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
+import config
+import jobs
+import metrics
+import profiling
 # Import our chemistry solver
-from chemistry_solver import balance_equation
+from cache import ImageResultCache, hamming_distance
+from camera import FrameStabilizer, camera_counts
+from chemistry_solver import (INVALID_FORMAT_ERROR, ChemicalFormula, EquationBalancer, balance_equation, balance_equations,
+                              equation_cache, incomplete_reason, lookup_entry, parse_composition, reaction_index, result_store,
+                              snap_to_known_reaction, solve_for_cache, split_equation, warm_equation_cache)
+from equation_scanner import extract_equations
+from segmentation import Box, find_text_lines
+from singleflight import SingleFlight
+from jobs import Job, JobStore, JobStoreFullError
+from responses import CompressionMiddleware, FastJSONResponse, cacheable
+from upload_limit import BodySizeLimitMiddleware
+from worker_pool import BoundedWorkerPool, PoolSaturatedError
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# OCR engines are imported and probed on first use (or by the startup
+# task below), so importing this module stays fast
+TESSEROCR_INSTALLED = importlib.util.find_spec("tesserocr") is not None
 
-# Try to import OCR, but make it optional
-try:
-    import pytesseract
+
+def probe_pytesseract() -> bool:
+    """Import pytesseract and check that the tesseract executable runs."""
+    try:
+        import pytesseract
+    except ImportError:
+        print("Warning: pytesseract not available. OCR features will be limited.")
+        print("Install with: pip install pytesseract")
+        return False
+    
     # Try to configure Tesseract path for Windows (if not in PATH)
-    import os
     if os.name == 'nt':  # Windows
         default_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
         if os.path.exists(default_path):
@@ -22,20 +62,211 @@ try:
     # Test if Tesseract is accessible
     try:
         pytesseract.get_tesseract_version()
-        OCR_AVAILABLE = True
         print("✅ Tesseract OCR is available and ready!")
+        return True
     except Exception as e:
-        OCR_AVAILABLE = False
         print(f"⚠️  Warning: pytesseract installed but Tesseract executable not found.")
         print(f"   Error: {e}")
         print("   Install Tesseract from: https://github.com/UB-Mannheim/tesseract/wiki")
         print("   Or see INSTALL_OCR.md for detailed instructions")
-except ImportError:
-    OCR_AVAILABLE = False
-    print("Warning: pytesseract not available. OCR features will be limited.")
-    print("Install with: pip install pytesseract")
+        return False
+
+
+# Characters that can appear in a chemical equation
+CHEMISTRY_WHITELIST = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz+->→=()[]"
+
+# Named Tesseract configurations; each backend keeps one engine per profile
+OCR_PROFILES: Dict[str, Dict] = {
+    # Single block of text restricted to equation characters
+    "chemistry": {"oem": 3, "psm": 6, "whitelist": CHEMISTRY_WHITELIST},
+    # Tesseract defaults (automatic page segmentation, no whitelist)
+    "default": {"oem": 3, "psm": 3, "whitelist": None},
+    # One unrestricted line, for re-reading a cropped low-confidence word
+    "line": {"oem": 3, "psm": 7, "whitelist": None},
+}
+
+
+class OCRBackend:
+    """Interface for the OCR engines used by extract_text_from_image."""
+    
+    name = "none"
+    # Whether a call is cheap enough to re-read small crops one at a time
+    in_process = False
+    
+    def image_to_string(self, image: Image.Image, profile: str) -> str:
+        raise NotImplementedError
+    
+    def image_to_data(self, image: Image.Image, profile: str) -> List[Dict]:
+        """
+        Recognized words in reading order, each as a dict with "text",
+        "conf" (0-100), "box" (left, top, width, height) and "line" (an
+        identifier shared by words on the same text line).
+        """
+        raise NotImplementedError
+
+
+class PytesseractBackend(OCRBackend):
+    """Runs the tesseract executable once per image through pytesseract."""
+    
+    name = "pytesseract"
+    
+    def __init__(self):
+        import pytesseract
+        self._pytesseract = pytesseract
+    
+    def _config(self, profile: str) -> str:
+        settings = OCR_PROFILES[profile]
+        args = f"--oem {settings['oem']} --psm {settings['psm']}"
+        if settings["whitelist"]:
+            args += f" -c tessedit_char_whitelist={settings['whitelist']}"
+        return args
+    
+    def image_to_string(self, image: Image.Image, profile: str) -> str:
+        return self._pytesseract.image_to_string(image, config=self._config(profile))
+    
+    def image_to_data(self, image: Image.Image, profile: str) -> List[Dict]:
+        data = self._pytesseract.image_to_data(image, config=self._config(profile),
+                                               output_type=self._pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            if conf < 0 or not text.strip():
+                continue
+            words.append({
+                "text": text.strip(),
+                "conf": conf,
+                "box": (data["left"][i], data["top"][i], data["width"][i], data["height"][i]),
+                "line": (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            })
+        return words
+
+
+class TesserocrBackend(OCRBackend):
+    """
+    Keeps libtesseract engines loaded in-process, one per profile in each
+    OCR worker thread, and passes images as raw pixel buffers.
+    """
+    
+    name = "tesserocr"
+    in_process = True
+    
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+    
+    def _api(self, profile: str):
+        engines = self._local.__dict__.setdefault("engines", {})
+        api = engines.get(profile)
+        if api is None:
+            settings = OCR_PROFILES[profile]
+            api = self._tesserocr.PyTessBaseAPI(psm=settings["psm"], oem=settings["oem"])
+            if settings["whitelist"]:
+                api.SetVariable("tessedit_char_whitelist", settings["whitelist"])
+            engines[profile] = api
+        return api
+    
+    def probe(self) -> None:
+        """Start and release one engine; fails early if the language data cannot be found."""
+        settings = OCR_PROFILES["chemistry"]
+        api = self._tesserocr.PyTessBaseAPI(psm=settings["psm"], oem=settings["oem"])
+        api.End()
+    
+    def _set_image(self, image: Image.Image, profile: str):
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB")
+        bytes_per_pixel = 1 if image.mode == "L" else 3
+        api = self._api(profile)
+        api.SetImageBytes(image.tobytes(), image.width, image.height,
+                          bytes_per_pixel, bytes_per_pixel * image.width)
+        return api
+    
+    def image_to_string(self, image: Image.Image, profile: str) -> str:
+        return self._set_image(image, profile).GetUTF8Text()
+    
+    def image_to_data(self, image: Image.Image, profile: str) -> List[Dict]:
+        api = self._set_image(image, profile)
+        api.Recognize()
+        iterator = api.GetIterator()
+        if iterator is None:
+            return []
+        words = []
+        line = -1
+        RIL = self._tesserocr.RIL
+        level = RIL.WORD
+        for word in self._tesserocr.iterate_level(iterator, level):
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line += 1
+            text = word.GetUTF8Text(level)
+            if not text or not text.strip():
+                continue
+            x1, y1, x2, y2 = word.BoundingBox(level)
+            words.append({
+                "text": text.strip(),
+                "conf": word.Confidence(level),
+                "box": (x1, y1, x2 - x1, y2 - y1),
+                "line": line
+            })
+        return words
+
+
+def select_ocr_backend(preference: str) -> Optional[OCRBackend]:
+    """Pick the OCR backend ("auto", "tesserocr" or "pytesseract")."""
+    if preference in ("auto", "tesserocr") and TESSEROCR_INSTALLED:
+        try:
+            backend = TesserocrBackend()
+            # The probing thread is not an OCR worker, so it keeps no engine
+            backend.probe()
+            return backend
+        except Exception as e:
+            print(f"⚠️  Warning: tesserocr could not start an engine: {e}")
+    if preference in ("auto", "pytesseract") and probe_pytesseract():
+        return PytesseractBackend()
+    return None
+
+
+_ocr_backend: Optional[OCRBackend] = None
+_ocr_probed = False
+_ocr_probe_lock = threading.Lock()
 
-app = FastAPI(title="PhotoChem API", version="1.0.0")
+
+def get_ocr_backend() -> Optional[OCRBackend]:
+    """The OCR backend, selected on first call and cached afterwards."""
+    global _ocr_backend, _ocr_probed
+    if not _ocr_probed:
+        with _ocr_probe_lock:
+            if not _ocr_probed:
+                _ocr_backend = select_ocr_backend(config.OCR_BACKEND)
+                _ocr_probed = True
+                if _ocr_backend is not None:
+                    print(f"OCR backend: {_ocr_backend.name}")
+    return _ocr_backend
+
+
+def ocr_available() -> bool:
+    """Whether an OCR backend was found. Never waits for the probe: False while it runs."""
+    return _ocr_probed and _ocr_backend is not None
+
+
+async def wait_for_ocr() -> bool:
+    """Whether an OCR backend is available, running (or waiting for) the probe off the event loop."""
+    if not _ocr_probed:
+        await asyncio.to_thread(get_ocr_backend)
+    return _ocr_backend is not None
+
+
+app = FastAPI(title="PhotoChem API", version="1.0.0", default_response_class=FastJSONResponse)
+
+# Tesseract is blocking, so OCR runs here rather than on the event loop
+ocr_pool = BoundedWorkerPool("ocr", workers=config.OCR_WORKERS, max_queue=config.OCR_MAX_QUEUE)
+
+# OCR text and detected equation of recent uploads
+image_cache = ImageResultCache(config.IMAGE_CACHE_MAX_BYTES, config.IMAGE_CACHE_MAX_DISTANCE,
+                               config.IMAGE_CACHE_MAX_SCAN)
+
+# Identical requests in flight at the same time share one computation
+equation_flight = SingleFlight("equation")
+image_flight = SingleFlight("image")
 
 # CORS middleware to allow frontend to communicate with backend
 app.add_middleware(
@@ -46,6 +277,173 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Large JSON bodies are sent compressed to clients that accept it
+app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESS_MIN_BYTES)
+
+# Multipart framing around an uploaded file (boundaries, part headers)
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+
+def upload_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Image is too large. The maximum upload size is {max_bytes / (1024 * 1024):g} MB."
+    )
+
+
+# Oversized uploads are refused before Starlette spools them; read_upload
+# then checks the exact size of the file itself
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=config.MAX_UPLOAD_BYTES + UPLOAD_OVERHEAD_BYTES,
+                   detail=upload_too_large(config.MAX_UPLOAD_BYTES).detail)
+
+
+# Request headers, besides the URL, that compact_mode reads
+COMPACT_VARY = ("Prefer",)
+
+
+def compact_mode(request: Request) -> bool:
+    """
+    Compact responses, requested with ?compact=1 or "Prefer: return=minimal":
+    no steps, explanation or echoed OCR text are generated or sent.
+    Cacheable responses that honour it must vary on Prefer (COMPACT_VARY).
+    """
+    if request.query_params.get("compact", "").lower() in ("1", "true", "yes"):
+        return True
+    return "return=minimal" in request.headers.get("prefer", "").replace(" ", "").lower()
+
+
+def _route_template(scope) -> str:
+    """Route path such as /api/solve-equation, to keep metric labels bounded."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+# Not profiled or recorded itself, so reading it does not change it
+SLOW_REQUESTS_PATH = "/api/debug/slow-requests"
+
+
+if profiling.ENABLED:
+    # Added before instrument_requests, so it runs inside it and sees the stage timings
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        """Profile sampled or token-carrying requests; record every request's timings."""
+        if request.url.path == SLOW_REQUESTS_PATH:
+            return await call_next(request)
+        reason = profiling.choose(request.headers.get(profiling.TOKEN_HEADER))
+        profile = profiling.begin(reason) if reason else None
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            if profile is not None:
+                profiling.end(profile)
+            record = {
+                "time": time.time(),
+                "method": request.method,
+                "route": _route_template(request.scope),
+                "path": request.url.path,
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "stages_ms": profiling.stage_totals_ms(metrics.current_timings()),
+                "profile_id": profile.id if profile is not None else None,
+            }
+            profiling.recent.add(record)
+        if profile is not None:
+            try:
+                await asyncio.to_thread(profile.save, record)
+                response.headers["X-Profile-Id"] = profile.id
+            except OSError as e:
+                print(f"⚠️  Warning: could not write profile {profile.id}: {e}")
+        return response
+
+
+if profiling.ENABLED and config.PROFILE_TOKEN:
+    # Request paths and timings are not public: without a token to guard
+    # it the endpoint does not exist
+    @app.get(SLOW_REQUESTS_PATH)
+    def slow_requests(request: Request, limit: int = 20):
+        """The slowest recent requests with their stage breakdown and profile ids."""
+        if not profiling.token_matches(request.headers.get(profiling.TOKEN_HEADER)):
+            raise HTTPException(status_code=403, detail=f"Send the profiling token in {profiling.TOKEN_HEADER}.")
+        return {
+            "requests": profiling.recent.slowest(max(1, min(limit, 200))),
+            "recorded": len(profiling.recent),
+            "profiler": profiling.PROFILER,
+            "profile_dir": config.PROFILE_DIR,
+            "profiled": dict(profiling.counts),
+        }
+
+
+if metrics.ENABLED:
+    @app.middleware("http")
+    async def instrument_requests(request: Request, call_next):
+        """Request latency, in-flight gauge, error counts and Server-Timing."""
+        route = _route_template(request.scope)
+        metrics.REQUESTS_IN_FLIGHT.inc(route)
+        token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            metrics.ERRORS.inc(type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            timings = metrics.finish_request(token)
+            metrics.REQUESTS_IN_FLIGHT.dec(route)
+            metrics.REQUEST_SECONDS.observe(route, elapsed)
+        if response.status_code >= 400:
+            metrics.ERRORS.inc(f"http_{response.status_code}")
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings, elapsed)
+        return response
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        """Metrics in Prometheus text exposition format."""
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _collect_stats() -> List[str]:
+    """Expose cache, pool and OCR path counters alongside the histograms."""
+    equation_stats = equation_cache.stats()
+    image_stats = image_cache.stats()
+    pool_stats = ocr_pool.stats()
+    return (
+        metrics.format_samples("photochem_cache_hits_total", "counter", "Cache hits.", "cache", {
+            "equation": equation_stats["hits"],
+            "image": image_stats["hits"] + image_stats["similar_hits"]
+        }) +
+        metrics.format_samples("photochem_cache_misses_total", "counter", "Cache misses.", "cache", {
+            "equation": equation_stats["misses"],
+            "image": image_stats["misses"]
+        }) +
+        metrics.format_samples("photochem_cache_evictions_total", "counter", "Cache evictions.", "cache", {
+            "equation": equation_stats["evictions"],
+            "image": image_stats["evictions"]
+        }) +
+        metrics.format_samples("photochem_ocr_queue_depth", "gauge", "OCR tasks waiting for a worker.", "pool", {
+            "ocr": pool_stats["queue_depth"]
+        }) +
+        metrics.format_samples("photochem_ocr_rejected_total", "counter", "Uploads rejected because the OCR queue was full.", "pool", {
+            "ocr": pool_stats["rejected"]
+        }) +
+        metrics.format_samples("photochem_coalesced_requests_total", "counter",
+                               "Requests that waited for an identical computation already in flight.", "kind", {
+            equation_flight.name: equation_flight.coalesced,
+            image_flight.name: image_flight.coalesced
+        }) +
+        metrics.format_samples("photochem_ocr_path_total", "counter", "OCR passes by path taken (fallbacks and rescans).", "path",
+                               dict(ocr_path_counts))
+    )
+
+
+metrics.add_collector(_collect_stats)
+
 
 @app.get("/")
 def read_root():
@@ -54,58 +452,113 @@ def read_root():
 
 @app.get("/api/health")
 def health_check():
+    """Liveness: the process is up and serving requests."""
     return {"status": "healthy"}
 
 
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness: the OCR probe (and warm-up, if enabled) has finished."""
+    if not _ready:
+        return FastJSONResponse(status_code=503, content={"status": "starting"})
+    return {
+        "status": "ready",
+        "ocr_backend": _ocr_backend.name if _ocr_backend else None,
+        "warmed_up": _warmed_up
+    }
+
+
+@app.get("/api/stats")
+def stats():
+    """Cache statistics for the solver."""
+    return {
+        "equation_cache": equation_cache.stats(),
+        "formula_cache": parse_composition.cache_info()._asdict(),
+        "ocr_backend": _ocr_backend.name if _ocr_backend else None,
+        "ocr_pool": ocr_pool.stats(),
+        "image_cache": image_cache.stats(),
+        "ocr_paths": dict(ocr_path_counts),
+        "jobs": job_store.stats(),
+        "camera_frames": dict(camera_counts),
+        "live_solve": dict(live_counts),
+        "single_flight": {flight.name: flight.stats() for flight in (equation_flight, image_flight)},
+        "result_store": result_store.stats() if result_store is not None else None,
+        "reaction_index": reaction_index.stats() if reaction_index is not None else None
+    }
+
+
 def extract_equation_from_text(text: str) -> Optional[str]:
-    """Extract chemical equation from text using pattern matching."""
+    """
+    Extract a chemical equation from text (see equation_scanner). The first
+    one that matches a known reaction in the reaction index wins, with OCR
+    misreads such as C02 or 202 corrected; otherwise the first one found
+    whose terms all name a species (rather than a misread "02").
+    """
     if not text:
         return None
     
-    # Clean the text - remove extra whitespace, normalize
-    text = ' '.join(text.split())  # Normalize whitespace
-    text = text.replace('\n', ' ').replace('\r', ' ')
-    
-    # Common OCR mistakes to fix
-    replacements = {
-        'O': 'O',  # Sometimes 0 is read as O
-        'l': '1',  # Sometimes l is read as 1
-        'I': '1',  # Sometimes I is read as 1
-    }
-    
-    # More flexible patterns to match chemical equations
-    patterns = [
-        # Pattern: H2 + O2 → H2O (with arrow variations)
-        r'([A-Z][a-z]?\d*(?:\s*\+\s*[A-Z][a-z]?\d*)+)\s*(?:→|->|=>|=|arrow)\s*([A-Z][a-z]?\d*(?:\s*\+\s*[A-Z][a-z]?\d*)+)',
-        # Pattern with coefficients: 2H2 + O2 → 2H2O
-        r'(\d*[A-Z][a-z]?\d*(?:\s*\+\s*\d*[A-Z][a-z]?\d*)+)\s*(?:→|->|=>|=)\s*(\d*[A-Z][a-z]?\d*(?:\s*\+\s*\d*[A-Z][a-z]?\d*)+)',
-        # Pattern for single reactant/product: CaCO3 → CaO + CO2
-        r'([A-Z][a-z]?\d*(?:\s*\+\s*[A-Z][a-z]?\d*)*)\s*(?:→|->|=>|=)\s*([A-Z][a-z]?\d*(?:\s*\+\s*[A-Z][a-z]?\d*)+)',
-        # More lenient - allow spaces in formulas
-        r'([A-Z][a-z]?\s*\d*(?:\s*\+\s*[A-Z][a-z]?\s*\d*)+)\s*(?:→|->|=>|=)\s*([A-Z][a-z]?\s*\d*(?:\s*\+\s*[A-Z][a-z]?\s*\d*)+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            reactants = match.group(1).strip()
-            products = match.group(2).strip()
-            
-            # Clean up the equation (remove extra spaces in formulas)
-            reactants = re.sub(r'([A-Z])\s+(\d)', r'\1\2', reactants)  # H 2 -> H2
-            products = re.sub(r'([A-Z])\s+(\d)', r'\1\2', products)
-            
-            # Normalize the arrow
-            return f"{reactants} → {products}"
+    equations = extract_equations(text)
+    for equation in equations:
+        known = snap_to_known_reaction(equation)
+        if known is not None:
+            return known
+    readable = (equation for equation in equations if all(all(side) for side in split_equation(equation)))
+    return next(readable, equations[0] if equations else None)
+
+
+# Spooled uploads are copied into memory in chunks of this size
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+async def read_upload(upload: UploadFile, max_bytes: int) -> bytes:
+    """
+    Read an upload in chunks, rejecting it with 413 once it exceeds
+    max_bytes. The body as a whole was already limited while it arrived
+    (BodySizeLimitMiddleware); this bounds the file within it.
+    """
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise upload_too_large(max_bytes)
+    return bytes(buffer)
+
+
+def load_image(data: bytes) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Decode an uploaded image and return it with its original size.
+    JPEGs are decoded in draft mode: grayscale, with DCT scaling down to
+    roughly OCR_MAX_DIMENSION, so full-resolution RGB pixels never exist.
+    """
+    from PIL import Image
     
-    return None
+    image = Image.open(io.BytesIO(data))
+    original_size = image.size
+    if image.format == "JPEG":
+        scale = config.OCR_MAX_DIMENSION / max(image.size)
+        target = (int(image.width * scale), int(image.height * scale)) if scale < 1 else image.size
+        image.draft("L", target)
+    image.load()
+    return image, original_size
 
 
 def preprocess_image(image: Image.Image) -> Image.Image:
     """Preprocess image to improve OCR accuracy."""
-    # Convert to RGB if necessary
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
+    from PIL import Image, ImageEnhance
+    
+    # Tesseract only needs a single grayscale channel
+    if image.mode != 'L':
+        image = image.convert('L')
+    
+    # Shrink very large images (only JPEGs are reduced while decoding)
+    max_dimension = config.OCR_MAX_DIMENSION
+    if max(image.size) > max_dimension:
+        scale = max_dimension / max(image.size)
+        new_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image = image.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
     
     # Resize if too small (OCR works better on larger images)
     min_size = 300
@@ -116,44 +569,265 @@ def preprocess_image(image: Image.Image) -> Image.Image:
         image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
     
     # Enhance contrast (optional - can help with text recognition)
-    from PIL import ImageEnhance
     enhancer = ImageEnhance.Contrast(image)
     image = enhancer.enhance(1.2)  # Slight contrast boost
     
     return image
 
 
-def extract_text_from_image(image: Image.Image) -> str:
-    """Extract text from image using OCR."""
-    if not OCR_AVAILABLE:
-        return ""
+# A recognized word that looks like part of an equation: species,
+# coefficients, brackets, plus signs and arrows. The alternatives start
+# with different characters, so a failing match cannot backtrack over
+# ways of splitting a run of digits (linear time on any word)
+_PLAUSIBLE_TOKEN = re.compile(r'^(?:[\d()\[\]+=>→\-]|[A-Z][a-z]?)+$')
+
+# How often each OCR path was taken, for measuring rescans
+ocr_path_counts = Counter()
+
+
+def _words_to_text(words: List[Dict]) -> str:
+    """Join recognized words back into lines of text."""
+    lines = []
+    current = None
+    for word in words:
+        if not lines or word["line"] != current:
+            lines.append([])
+            current = word["line"]
+        lines[-1].append(word["text"])
+    return "\n".join(" ".join(line) for line in lines)
+
+
+def _ocr_legacy(ocr_backend: OCRBackend, image: Image.Image) -> Tuple[str, Dict]:
+    """Whitelisted pass, then a full unrestricted pass if it found too little."""
+    text = ocr_backend.image_to_string(image, "chemistry")
+    if not text or len(text.strip()) < 3:
+        text = ocr_backend.image_to_string(image, "default")
+        return text, {"path": "unrestricted_retry", "passes": 2}
+    return text, {"path": "whitelist", "passes": 1}
+
+
+def _ocr_confidence(ocr_backend: OCRBackend, image: Image.Image) -> Tuple[str, Dict]:
+    """
+    One structured whitelisted pass. Only words with low confidence or that
+    do not look like equation tokens are cropped and re-read unrestricted.
+    Engines that start a process per call re-read the whole image instead,
+    since each crop would cost as much as a full pass.
+    """
+    words = ocr_backend.image_to_data(image, "chemistry")
+    if sum(len(word["text"]) for word in words) < 3:
+        text = ocr_backend.image_to_string(image, "default")
+        return text, {"path": "full_rescan", "passes": 2}
+    
+    weak = [
+        word for word in words
+        if word["conf"] < config.OCR_MIN_CONFIDENCE or not _PLAUSIBLE_TOKEN.match(word["text"])
+    ]
+    if not weak:
+        return _words_to_text(words), {"path": "single_pass", "passes": 1}
+    if not ocr_backend.in_process or len(weak) > config.OCR_MAX_RESCAN_REGIONS:
+        # Re-reading many crops costs more than one more full pass
+        text = ocr_backend.image_to_string(image, "default")
+        return text, {"path": "full_rescan", "passes": 2, "weak_words": len(weak)}
+    
+    for word in weak:
+        left, top, width, height = word["box"]
+        pad = max(4, height // 4)
+        region = image.crop((max(0, left - pad), max(0, top - pad),
+                             min(image.width, left + width + pad), min(image.height, top + height + pad)))
+        candidates = ocr_backend.image_to_data(region, "line")
+        if not candidates:
+            continue
+        conf = sum(c["conf"] for c in candidates) / len(candidates)
+        if conf > word["conf"]:
+            word["text"] = "".join(c["text"] for c in candidates)
+            word["conf"] = conf
+    
+    return _words_to_text(words), {"path": "region_rescan", "passes": 1 + len(weak), "rescanned_regions": len(weak)}
+
+
+def extract_text_from_image(image: Image.Image, preprocess: bool = True) -> Tuple[str, Dict]:
+    """
+    Extract text from image using OCR.
+    Returns the text and a dict describing which OCR path was taken.
+    """
+    ocr_backend = get_ocr_backend()
+    if ocr_backend is None:
+        return "", {"path": "unavailable", "passes": 0}
     
     try:
         # Preprocess image for better OCR
-        processed_img = preprocess_image(image)
-        
-        # Configure OCR for better chemistry equation recognition
-        # Use custom config for better number and symbol recognition
-        custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz+->→=()[]'
+        processed_img = preprocess_image(image) if preprocess else image
         
-        # Try OCR with custom config
-        text = pytesseract.image_to_string(processed_img, config=custom_config)
-        
-        # If that doesn't work well, try without restrictions
-        if not text or len(text.strip()) < 3:
-            text = pytesseract.image_to_string(processed_img)
-        
-        return text
+        if config.OCR_MODE == "legacy":
+            return _ocr_legacy(ocr_backend, processed_img)
+        return _ocr_confidence(ocr_backend, processed_img)
     except Exception as e:
         print(f"OCR error: {e}")
         # If pytesseract is installed but Tesseract executable not found
         if "tesseract" in str(e).lower() or "not found" in str(e).lower():
             print("Note: Tesseract OCR executable not found. Install Tesseract OCR for image text extraction.")
-        return ""
+        return "", {"path": "error", "passes": 0}
+
+
+def image_dhash(image: Image.Image) -> int:
+    """64-bit difference hash: brightness gradients of a 9x8 thumbnail."""
+    from PIL import Image
+    
+    small = image.convert('L').resize((9, 8), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    pixels = list(small.getdata())
+    fingerprint = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            fingerprint = (fingerprint << 1) | (left > right)
+    return fingerprint
+
+
+def analyze_image(data: bytes, digest: str) -> Tuple[Dict, Optional[str]]:
+    """
+    Decode raw upload bytes, OCR them and detect the equation; runs on the
+    OCR pool. Returns the result entry and "similar" when it came from a
+    near-duplicate image in the cache (None when freshly computed).
+    """
+    with metrics.stage("decode"):
+        image, original_size = load_image(data)
+    
+    fingerprint = None
+    if config.IMAGE_CACHE_PERCEPTUAL:
+        fingerprint = image_dhash(image)
+        cached = image_cache.find_similar(fingerprint)
+        if cached is not None:
+            return dict(cached, image_size=original_size), "similar"
+    
+    with metrics.stage("preprocess"):
+        processed = preprocess_image(image)
+    # Free the decoded pixels before the (slow) OCR pass
+    image.close()
+    del image
+    with metrics.stage("ocr"):
+        text, info = extract_text_from_image(processed, preprocess=False)
+    with metrics.stage("extract_equation"):
+        equation = extract_equation_from_text(text)
+    
+    entry = {
+        "extracted_text": text,
+        "ocr": info,
+        "image_size": original_size,
+        "equation": equation
+    }
+    if info["path"] not in ("error", "unavailable"):
+        image_cache.set(digest, entry, _entry_cost(entry), fingerprint)
+        if result_store is not None:
+            result_store.set("image", digest, entry)
+    return entry, None
+
+
+def _entry_cost(entry: Dict) -> int:
+    """Approximate size of an image cache entry in bytes."""
+    return 256 + len(entry["extracted_text"].encode()) + len(entry["equation"] or "")
+
+
+async def solve_image(contents: bytes, progress: Optional[Callable[[str, Dict], None]] = None,
+                      compact: bool = False) -> Dict:
+    """
+    Run OCR, equation detection and balancing on raw upload bytes and
+    return the response body. progress(stage, data) is called as the
+    pipeline passes ocr_done, equation_detected and balanced. A compact
+    body leaves out the steps, the explanation and the extracted text.
+    """
+    def report(stage: str, **data) -> None:
+        if progress is not None:
+            progress(stage, data)
+    
+    # Repeated uploads are answered from the cache without decoding; hashing
+    # megabytes takes milliseconds, so it runs off the event loop
+    digest = (await asyncio.to_thread(hashlib.sha256, contents)).hexdigest()
+    entry = image_cache.get(digest)
+    cache_match = "exact" if entry is not None else None
+    if entry is None and result_store is not None:
+        # OCRed earlier by this or another worker process; SQLite can wait
+        # on other processes' writes, so it is read off the event loop
+        entry = await asyncio.to_thread(result_store.get, "image", digest)
+        if entry is not None:
+            cache_match = "stored"
+            image_cache.set(digest, entry, _entry_cost(entry))
+    if entry is None:
+        # Decode, extract text using OCR and detect the equation; the same
+        # upload arriving while that runs waits for it instead
+        (entry, cache_match), shared = await image_flight.do(
+            digest, lambda: ocr_pool.run(profiling.call, analyze_image, contents, digest))
+        if cache_match is None and not shared:
+            # Requests that waited for this OCR pass do not count it again
+            ocr_path_counts[entry["ocr"]["path"]] += 1
+    
+    extracted_text = entry["extracted_text"]
+    ocr_info = entry["ocr"]
+    width, height = entry["image_size"]
+    equation = entry["equation"]
+    report("ocr_done", extracted_text=extracted_text[:200], cache_hit=cache_match is not None)
+    
+    ocr_used = await wait_for_ocr()
+    if not equation:
+        # Provide helpful error message
+        error_msg = "Could not detect a chemical equation in the image."
+        suggestions = []
+        
+        if not ocr_used:
+            suggestions.append("OCR is not available. Please install Tesseract OCR for image text extraction.")
+        elif not extracted_text or len(extracted_text.strip()) < 3:
+            suggestions.append("No text was extracted from the image. Try:")
+            suggestions.append("- Uploading a clearer, higher resolution image")
+            suggestions.append("- Ensuring the equation is clearly visible")
+            suggestions.append("- Using better lighting")
+        else:
+            suggestions.append(f"Extracted text: {extracted_text[:100]}...")
+            suggestions.append("The text doesn't appear to contain a valid chemical equation.")
+        
+        suggestions.append("\nYou can enter the equation manually using the input field below.")
+        metrics.ERRORS.inc("no_equation_detected")
+        
+        return {
+            "error": error_msg,
+            "extracted_text": extracted_text[:300] if extracted_text else "No text extracted",
+            "suggestions": suggestions,
+            "ocr_available": ocr_used,
+            "ocr": ocr_info,
+            "cache_hit": cache_match is not None
+        }
+    report("equation_detected", equation=equation)
+    
+    # Balance the equation
+    with metrics.stage("balance"):
+        result = await balance_coalesced(equation, include_steps=not compact)
+    
+    # Check if balancing had an error
+    if "error" in result:
+        metrics.ERRORS.inc("balance_failed")
+        return {
+            "error": f"Detected equation: {equation}\n\n{result['error']}",
+            "detected_equation": equation,
+            "extracted_text": extracted_text[:200] if extracted_text else "No text extracted",
+            "ocr": ocr_info,
+            "cache_hit": cache_match is not None
+        }
+    report("balanced", balanced_equation=result["balanced_equation"])
+    
+    # Add metadata
+    result["image_processed"] = True
+    result["image_size"] = f"{width}x{height}"
+    if not compact:
+        result["extracted_text"] = extracted_text[:200] if extracted_text else "No text extracted"
+    result["detected_equation"] = equation
+    result["ocr_used"] = ocr_used
+    result["ocr"] = ocr_info
+    result["cache_hit"] = cache_match is not None
+    result["cache_match"] = cache_match
+    return result
 
 
 @app.post("/api/process-image")
-async def process_image(image: UploadFile = File(...)):
+async def process_image(image: UploadFile = File(...), compact: bool = Depends(compact_mode)):
     """
     Process uploaded chemistry problem image.
     1. Extract text from image using OCR
@@ -163,83 +837,669 @@ async def process_image(image: UploadFile = File(...)):
     """
     try:
         # Read image
-        contents = await image.read()
-        img = Image.open(io.BytesIO(contents))
-        
-        # Extract text from image using OCR
-        extracted_text = extract_text_from_image(img)
-        
-        # Try to extract equation from text
-        equation = extract_equation_from_text(extracted_text)
-        
-        if not equation:
-            # Provide helpful error message
-            error_msg = "Could not detect a chemical equation in the image."
-            suggestions = []
-            
-            if not OCR_AVAILABLE:
-                suggestions.append("OCR is not available. Please install Tesseract OCR for image text extraction.")
-            elif not extracted_text or len(extracted_text.strip()) < 3:
-                suggestions.append("No text was extracted from the image. Try:")
-                suggestions.append("- Uploading a clearer, higher resolution image")
-                suggestions.append("- Ensuring the equation is clearly visible")
-                suggestions.append("- Using better lighting")
-            else:
-                suggestions.append(f"Extracted text: {extracted_text[:100]}...")
-                suggestions.append("The text doesn't appear to contain a valid chemical equation.")
-            
-            suggestions.append("\nYou can enter the equation manually using the input field below.")
-            
-            return JSONResponse(content={
-                "error": error_msg,
-                "extracted_text": extracted_text[:300] if extracted_text else "No text extracted",
-                "suggestions": suggestions,
-                "ocr_available": OCR_AVAILABLE
-            })
-        
-        # Balance the equation
-        result = balance_equation(equation)
+        with metrics.stage("upload_read"):
+            contents = await read_upload(image, config.MAX_UPLOAD_BYTES)
         
-        # Check if balancing had an error
-        if "error" in result:
-            return JSONResponse(content={
-                "error": f"Detected equation: {equation}\n\n{result['error']}",
-                "detected_equation": equation,
-                "extracted_text": extracted_text[:200] if extracted_text else "No text extracted"
-            })
-        
-        # Add metadata
-        result["image_processed"] = True
-        result["image_size"] = f"{img.width}x{img.height}"
-        result["extracted_text"] = extracted_text[:200] if extracted_text else "No text extracted"
-        result["detected_equation"] = equation
-        result["ocr_used"] = OCR_AVAILABLE
-        
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=await solve_image(contents, compact=compact))
         
+    except HTTPException:
+        raise
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="The server is busy reading other images. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         import traceback
+        metrics.ERRORS.inc(type(e).__name__)
         error_detail = str(e)
         print(f"Error processing image: {error_detail}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error processing image: {error_detail}")
 
 
+def scan_frame(data: bytes, reference: Optional[int]) -> Tuple[int, Optional[str], bool]:
+    """
+    Read the equation in one camera frame; runs on the OCR pool. Frames
+    whose perceptual hash is within CAMERA_SKIP_DISTANCE bits of the last
+    scanned frame are not OCRed. Returns (reference hash, equation, scanned).
+    """
+    with metrics.stage("decode"):
+        image, _ = load_image(data)
+    fingerprint = image_dhash(image)
+    if reference is not None and hamming_distance(fingerprint, reference) <= config.CAMERA_SKIP_DISTANCE:
+        return reference, None, False
+    
+    with metrics.stage("preprocess"):
+        processed = preprocess_image(image)
+    image.close()
+    with metrics.stage("ocr"):
+        text, _ = extract_text_from_image(processed, preprocess=False)
+    with metrics.stage("extract_equation"):
+        equation = extract_equation_from_text(text)
+    return fingerprint, equation, True
+
+
+@app.websocket("/api/ws/camera")
+async def camera_socket(websocket: WebSocket):
+    """
+    Live scanning: the client sends downscaled camera frames as binary
+    messages. Only the newest frame is kept while OCR is busy, and frames
+    that barely changed are not OCRed again. Once the same equation has
+    been read from CAMERA_STABLE_FRAMES frames in a row the server sends
+    {"type": "equation"} followed by {"type": "result"} with the balanced
+    equation.
+    """
+    await websocket.accept()
+    latest: Optional[bytes] = None
+    frame_ready = asyncio.Event()
+    
+    async def process_frames():
+        nonlocal latest
+        stabilizer = FrameStabilizer(config.CAMERA_STABLE_FRAMES)
+        reference: Optional[int] = None
+        equation: Optional[str] = None
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            data, latest = latest, None
+            try:
+                reference, read, scanned = await ocr_pool.run(scan_frame, data, reference)
+            except PoolSaturatedError:
+                camera_counts["dropped"] += 1
+                continue
+            except Exception as e:
+                # An undecodable frame should not end the session
+                camera_counts["errors"] += 1
+                await websocket.send_json({"type": "error", "error": f"Could not read frame: {e}"})
+                continue
+            
+            if scanned:
+                camera_counts["scanned"] += 1
+                equation = read
+            else:
+                # Unchanged picture: it still counts towards stability
+                camera_counts["skipped"] += 1
+            confirmed = stabilizer.update(equation)
+            if confirmed is None:
+                continue
+            
+            await websocket.send_json({"type": "equation", "equation": confirmed})
+            with metrics.stage("balance"):
+                result = await balance_coalesced(confirmed)
+            camera_counts["results"] += 1
+            await websocket.send_json({"type": "result", "equation": confirmed, "result": result})
+    
+    processor = asyncio.get_running_loop().create_task(process_frames())
+    try:
+        while not processor.done():
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if not data:
+                continue
+            camera_counts["received"] += 1
+            if len(data) > config.CAMERA_MAX_FRAME_BYTES:
+                camera_counts["dropped"] += 1
+                await websocket.send_json({"type": "error", "error": "Frame is too large; send downscaled frames."})
+                continue
+            if latest is not None:
+                camera_counts["dropped"] += 1
+            latest = data
+            frame_ready.set()
+    finally:
+        processor.cancel()
+
+
+# Background image jobs: POST /api/jobs answers at once with a job id
+job_store = JobStore(config.JOB_STORE_SIZE, config.JOB_TTL, config.JOB_MAX_PENDING_BYTES)
+
+# A background job waits for a free OCR slot instead of failing with 503
+JOB_POOL_RETRIES = 10
+
+
+async def run_job(job: Job, contents: bytes) -> None:
+    # The task runs in a copy of the request context; give it its own timings
+    token = metrics.start_request()
+    job.start()
+    try:
+        for attempt in range(JOB_POOL_RETRIES + 1):
+            try:
+                result = await solve_image(contents, job.emit)
+                break
+            except PoolSaturatedError as e:
+                if attempt == JOB_POOL_RETRIES:
+                    raise
+                await asyncio.sleep(e.retry_after)
+        job.finish(result)
+    except asyncio.CancelledError:
+        job.fail("Job was cancelled")
+        raise
+    except Exception as e:
+        metrics.ERRORS.inc(type(e).__name__)
+        job.fail(f"Error processing image: {e}")
+    finally:
+        metrics.finish_request(token)
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(request: Request, image: UploadFile = File(...)):
+    """
+    Start processing an image in the background and return its job id.
+    Retries that send the same Idempotency-Key header get the existing job,
+    unless it failed. Keys are scoped to the client's address, so other
+    clients that pick the same key get jobs of their own.
+    """
+    with metrics.stage("upload_read"):
+        contents = await read_upload(image, config.MAX_UPLOAD_BYTES)
+    
+    key = request.headers.get("Idempotency-Key")
+    if key is not None:
+        key = (request.client.host if request.client else None, key)
+    try:
+        job, created = job_store.create(key, len(contents))
+    except JobStoreFullError:
+        raise HTTPException(status_code=503, detail="Too many jobs in progress. Please try again shortly.",
+                            headers={"Retry-After": "5"})
+    if not created:
+        return FastJSONResponse(status_code=200, content=job.to_dict())
+    job.emit("uploaded", {"bytes": len(contents)})
+    job.task = asyncio.get_running_loop().create_task(run_job(job, contents))
+    return FastJSONResponse(status_code=202, content=job.to_dict())
+
+
+def _get_job(job_id: str) -> Job:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Poll a job's status; the result is included once it is done."""
+    return FastJSONResponse(content=_get_job(job_id).to_dict())
+
+
+# Comment lines sent on idle event streams so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+def _sse(job: Job, event: Dict) -> str:
+    if event["stage"] == jobs.DONE:
+        event = dict(event, result=job.result)
+    return f"event: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-sent events for a job: one event per stage (uploaded, ocr_done,
+    equation_detected, balanced) and a final done or failed event that
+    carries the result or error. Past events are replayed first.
+    """
+    job = _get_job(job_id)
+    
+    async def stream():
+        past, queue = job.subscribe()
+        try:
+            for event in past:
+                yield _sse(job, event)
+            if job.finished:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(job, event)
+                if event["stage"] in (jobs.DONE, jobs.FAILED):
+                    return
+        finally:
+            job.unsubscribe(queue)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 from pydantic import BaseModel
 
 class EquationRequest(BaseModel):
     equation: str
 
+async def balance_coalesced(equation: str, species: Optional[Dict[str, ChemicalFormula]] = None,
+                            include_steps: bool = True) -> Dict:
+    """
+    balance_equation for request handlers: solving happens off the event
+    loop, and concurrent requests for the same reaction (by canonical key)
+    share one solve. Each request still gets a result in its own species
+    order, rebuilt from the shared cache entry. `species` is passed on to
+    EquationBalancer.parse_equation.
+    """
+    try:
+        balancer = EquationBalancer(equation)
+        if not balancer.parse_equation(species):
+            return {
+                "error": INVALID_FORMAT_ERROR
+            }
+        
+        key = balancer.canonical_key()
+        if key is None:
+            # Not cacheable or shared (e.g. a repeated species), but still solved off the loop
+            return await asyncio.to_thread(profiling.call, balancer.balance_parsed, include_steps)
+        
+        # The shared store is read on the worker thread, by solve_for_cache
+        entry = lookup_entry(key, shared=False)
+        if entry is None:
+            entry, _ = await equation_flight.do(
+                key, lambda: asyncio.to_thread(profiling.call, solve_for_cache, balancer, key))
+        return balancer.result_from_cache(entry, include_steps)
+    except Exception as e:
+        return {
+            "error": f"Error balancing equation: {str(e)}"
+        }
+
+
+async def solve_response(request: Request, equation: str, compact: bool) -> Response:
+    """
+    Balance an equation for the solve endpoints. Successful results depend
+    only on the equation (and the solver version), so they carry an ETag
+    and may be cached by browsers and CDNs.
+    """
+    if len(equation) > config.MAX_EQUATION_LENGTH:
+        raise HTTPException(status_code=413, detail=f"Equation is longer than {config.MAX_EQUATION_LENGTH} characters.")
+    try:
+        with metrics.stage("balance"):
+            result = await balance_coalesced(equation, include_steps=not compact)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error solving equation: {str(e)}")
+    if "error" in result:
+        metrics.ERRORS.inc("balance_failed")
+        return FastJSONResponse(content=result, headers={"Cache-Control": "no-cache"})
+    return cacheable(request, FastJSONResponse(content=result), config.SOLVE_CACHE_MAX_AGE, vary=COMPACT_VARY)
+
+
 @app.post("/api/solve-equation")
-async def solve_equation(request: EquationRequest):
+async def solve_equation(body: EquationRequest, request: Request, compact: bool = Depends(compact_mode)):
     """
     Solve a chemical equation directly from text input.
     """
+    return await solve_response(request, body.equation, compact)
+
+
+@app.get("/api/solve-equation")
+async def solve_equation_get(request: Request, equation: str, compact: bool = Depends(compact_mode)):
+    """
+    Solve a chemical equation given as ?equation=...; cacheable by URL.
+    """
+    return await solve_response(request, equation, compact)
+
+
+# Live-solve sessions: revisions received, superseded before their result
+# was sent, rejected as incomplete, and results sent
+live_counts = Counter()
+
+
+@app.websocket("/api/ws/solve")
+async def live_solve_socket(websocket: WebSocket):
+    """
+    As-you-type balancing. The client sends {"revision": n, "equation": "..."}
+    (or the equation as plain text) on every edit. A revision is solved once
+    no newer one has arrived for LIVE_DEBOUNCE_MS; a newer revision cancels
+    the older one's pending work. Incomplete input is answered with
+    {"status": "incomplete"} without being parsed. Only the latest
+    revision's result is sent.
+    """
+    await websocket.accept()
+    # Formulas parsed in earlier revisions of this session
+    species: Dict[str, ChemicalFormula] = {}
+    latest = 0
+    pending: Optional[asyncio.Task] = None
+    
+    async def solve_revision(revision: int, equation: str) -> None:
+        await asyncio.sleep(config.LIVE_DEBOUNCE_MS / 1000)
+        reason = incomplete_reason(equation, species)
+        if reason is not None:
+            live_counts["incomplete"] += 1
+            reply = {"revision": revision, "status": "incomplete", "reason": reason}
+        else:
+            if len(species) > config.LIVE_MAX_SPECIES:
+                species.clear()
+            with metrics.stage("balance"):
+                result = await balance_coalesced(equation, species)
+            reply = {"revision": revision, "status": "error" if "error" in result else "balanced", "result": result}
+        if revision == latest:
+            live_counts["results"] += 1
+            await websocket.send_json(reply)
+    
     try:
-        result = balance_equation(request.equation)
-        return JSONResponse(content=result)
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            text = message.get("text")
+            if text is None:
+                continue
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError:
+                data = text
+            if isinstance(data, dict):
+                equation = str(data.get("equation", ""))
+                revision = data.get("revision") if isinstance(data.get("revision"), int) else latest + 1
+            else:
+                equation, revision = str(data), latest + 1
+            live_counts["revisions"] += 1
+            latest = revision
+            
+            if pending is not None and not pending.done():
+                pending.cancel()
+                live_counts["superseded"] += 1
+            if len(equation) > config.MAX_EQUATION_LENGTH:
+                await websocket.send_json({"revision": revision, "status": "error", "result": {
+                    "error": f"Equation is longer than {config.MAX_EQUATION_LENGTH} characters."}})
+                continue
+            pending = asyncio.get_running_loop().create_task(solve_revision(revision, equation.strip()))
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+class BatchEquationRequest(BaseModel):
+    equations: List[str]
+
+
+_batch_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_batch_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for large batches, created on first use. Workers are not
+    forked from this (threaded) process, which could copy a lock held by
+    another thread; they come from a fork server, or are spawned.
+    """
+    global _batch_pool
+    if _batch_pool is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _batch_pool = ProcessPoolExecutor(max_workers=config.BATCH_WORKERS,
+                                          mp_context=multiprocessing.get_context(method))
+    return _batch_pool
+
+
+# Set once the startup task has probed OCR and run the optional warm-up
+_ready = False
+# Set only if that warm-up finished without errors
+_warmed_up = False
+_startup_task: Optional[asyncio.Task] = None
+
+WARMUP_EQUATIONS = ["H2 + O2 → H2O", "CH4 + O2 → CO2 + H2O", "Fe + O2 → Fe2O3"]
+
+
+def _warm_ocr_thread(barrier: threading.Barrier) -> None:
+    """Create this worker thread's OCR engine and import PIL."""
+    from PIL import Image
+    
+    backend = get_ocr_backend()
+    if isinstance(backend, TesserocrBackend):
+        for profile in OCR_PROFILES:
+            backend._api(profile)
+    # Hold the thread until every worker has taken one of these tasks
+    try:
+        barrier.wait(timeout=5)
+    except threading.BrokenBarrierError:
+        pass
+
+
+async def warm_up() -> None:
+    """Prime the solver caches and an OCR engine on every OCR worker thread."""
+    for equation in WARMUP_EQUATIONS:
+        await asyncio.to_thread(balance_equation, equation)
+    if await wait_for_ocr():
+        barrier = threading.Barrier(ocr_pool.workers)
+        await asyncio.gather(*(ocr_pool.run(_warm_ocr_thread, barrier) for _ in range(ocr_pool.workers)))
+
+
+async def prepare_worker() -> None:
+    global _ready, _warmed_up
+    try:
+        await asyncio.to_thread(get_ocr_backend)
+        # Start from the results other (or earlier) workers have stored
+        await asyncio.to_thread(warm_equation_cache, config.RESULT_STORE_WARM_ENTRIES)
+        if config.WARMUP_ON_STARTUP:
+            await warm_up()
+            _warmed_up = True
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error solving equation: {str(e)}")
+        print(f"⚠️  Warning: startup preparation failed: {e}")
+    finally:
+        _ready = True
+
+
+@app.on_event("startup")
+async def start_preparation():
+    """Probe OCR in the background so the server accepts requests at once."""
+    global _startup_task
+    _startup_task = asyncio.get_running_loop().create_task(prepare_worker())
+
+
+@app.on_event("shutdown")
+def shutdown_pools():
+    job_store.cancel_all()
+    ocr_pool.shutdown()
+    if _batch_pool is not None:
+        _batch_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def balance_batch(equations: List[str], include_steps: bool = True) -> List[Dict]:
+    """Balance equations on a thread, or in chunks on the process pool when there are many."""
+    if len(equations) <= config.BATCH_INLINE_THRESHOLD:
+        return await asyncio.to_thread(profiling.call, balance_equations, equations, include_steps)
+    loop = asyncio.get_running_loop()
+    pool = get_batch_pool()
+    size = config.BATCH_CHUNK_SIZE
+    chunks = [equations[i:i + size] for i in range(0, len(equations), size)]
+    chunk_results = await asyncio.gather(
+        *(loop.run_in_executor(pool, balance_equations, chunk, include_steps) for chunk in chunks)
+    )
+    return [result for chunk in chunk_results for result in chunk]
+
+
+@app.post("/api/solve-equations")
+async def solve_equations(request: BatchEquationRequest, compact: bool = Depends(compact_mode)):
+    """
+    Balance a list of equations in one request.
+    Results (or per-item errors) are returned in input order.
+    """
+    if len(request.equations) > config.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many equations: {len(request.equations)} (maximum is {config.MAX_BATCH_SIZE})"
+        )
+    
+    # Deduplicate; over-long items get an error instead of being solved
+    unique = list(dict.fromkeys(
+        eq.strip() for eq in request.equations if len(eq) <= config.MAX_EQUATION_LENGTH
+    ))
+    
+    try:
+        solved = await balance_batch(unique, include_steps=not compact)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error solving equations: {str(e)}")
+    
+    by_equation = dict(zip(unique, solved))
+    too_long = {"error": f"Equation is longer than {config.MAX_EQUATION_LENGTH} characters."}
+    results = [
+        by_equation[eq.strip()] if len(eq) <= config.MAX_EQUATION_LENGTH else too_long
+        for eq in request.equations
+    ]
+    
+    return FastJSONResponse(content={
+        "results": results,
+        "count": len(results),
+        "unique": len(unique)
+    })
+
+
+class StoichiometryRequest(BaseModel):
+    equation: str
+    # Reactant formula -> amount available, one mapping per scenario
+    scenarios: List[Dict[str, float]]
+    unit: str = "g"
+
+
+@app.post("/api/stoichiometry")
+async def stoichiometry(request: StoichiometryRequest):
+    """
+    Balance an equation and compute molar masses, mass ratios, and the
+    limiting reagent and theoretical yields for each scenario.
+    Reactants missing from a scenario are treated as in excess.
+    """
+    from stoichiometry import solve_scenarios
+    
+    if len(request.scenarios) > config.STOICHIOMETRY_MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many scenarios: {len(request.scenarios)} (maximum is {config.STOICHIOMETRY_MAX_SCENARIOS})"
+        )
+    if len(request.equation) > config.MAX_EQUATION_LENGTH:
+        raise HTTPException(status_code=413, detail=f"Equation is longer than {config.MAX_EQUATION_LENGTH} characters.")
+    
+    with metrics.stage("balance"):
+        result = await balance_coalesced(request.equation, include_steps=False)
+    if "error" in result:
+        metrics.ERRORS.inc("balance_failed")
+        return FastJSONResponse(content=result)
+    
+    balancer = EquationBalancer(request.equation)
+    balancer.parse_equation()
+    coefficients = (
+        [result["coefficients"]["reactants"][f.formula] for f in balancer.reactants] +
+        [result["coefficients"]["products"][f.formula] for f in balancer.products]
+    )
+    try:
+        with metrics.stage("stoichiometry"):
+            answer = solve_scenarios(balancer, coefficients, request.scenarios, request.unit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return FastJSONResponse(content={
+        "balanced_equation": result["balanced_equation"],
+        "coefficients": result["coefficients"],
+        **answer
+    })
+
+
+def segment_page(data: bytes) -> Tuple[Image.Image, List[Box], Tuple[int, int]]:
+    """Decode and preprocess a worksheet photo and find its text lines; runs on the OCR pool."""
+    with metrics.stage("decode"):
+        image, original_size = load_image(data)
+    with metrics.stage("preprocess"):
+        processed = preprocess_image(image)
+    image.close()
+    with metrics.stage("segment"):
+        boxes = find_text_lines(processed)
+    return processed, boxes[:config.WORKSHEET_MAX_LINES], original_size
+
+
+def read_line(page: Image.Image, box: Box) -> Tuple[str, float, Optional[str]]:
+    """
+    OCR one text line of a page as a single line; runs on the OCR pool.
+    An OCR error is returned for this line rather than failing the page.
+    """
+    start = time.perf_counter()
+    try:
+        with metrics.stage("ocr"):
+            text = get_ocr_backend().image_to_string(page.crop(box), "line")
+    except Exception as e:
+        print(f"OCR error on worksheet line {box}: {e}")
+        metrics.ERRORS.inc(type(e).__name__)
+        return "", time.perf_counter() - start, f"OCR error: {e}"
+    return text.strip(), time.perf_counter() - start, None
+
+
+def line_equations(text: str) -> List[str]:
+    """Every equation on a worksheet line, each snapped to a known reaction like a single photo."""
+    snapped = (extract_equation_from_text(equation) for equation in extract_equations(text))
+    return list(dict.fromkeys(equation for equation in snapped if equation))
+
+
+@app.post("/api/process-worksheet")
+async def process_worksheet(image: UploadFile = File(...), compact: bool = Depends(compact_mode)):
+    """
+    Worksheet mode: split a photographed page into text lines, OCR the
+    lines in parallel on the OCR pool and balance every equation found.
+    Lines are returned top to bottom with bounding boxes (in the uploaded
+    image's pixels) and OCR time per line; a line whose OCR failed carries
+    an "error" instead of text.
+    """
+    if not await wait_for_ocr():
+        raise HTTPException(status_code=503, detail="OCR is not available. Please install Tesseract OCR.")
+    
+    timing: Dict[str, float] = {}
+    try:
+        with metrics.stage("upload_read"):
+            contents = await read_upload(image, config.MAX_UPLOAD_BYTES)
+        
+        start = time.perf_counter()
+        page, boxes, original_size = await ocr_pool.run(profiling.call, segment_page, contents)
+        del contents
+        timing["segment_ms"] = (time.perf_counter() - start) * 1000
+        
+        # Leave room in the pool's queue for other requests
+        slots = asyncio.Semaphore(ocr_pool.workers)
+        
+        async def read(box: Box) -> Tuple[str, float, Optional[str]]:
+            async with slots:
+                return await ocr_pool.run(profiling.call, read_line, page, box)
+        
+        start = time.perf_counter()
+        readings = await asyncio.gather(*(read(box) for box in boxes))
+        timing["ocr_ms"] = (time.perf_counter() - start) * 1000
+        scale_x = original_size[0] / page.width
+        scale_y = original_size[1] / page.height
+        page.close()
+        
+        lines = []
+        for index, (box, (text, seconds, error)) in enumerate(zip(boxes, readings)):
+            if error:
+                lines.append({"index": index, "box": box, "text": "", "equations": [],
+                              "error": error, "ocr_ms": round(seconds * 1000, 2)})
+            elif text:
+                lines.append({"index": index, "box": box, "text": text,
+                              "equations": line_equations(text), "ocr_ms": round(seconds * 1000, 2)})
+        
+        unique = list(dict.fromkeys(eq for line in lines for eq in line["equations"]))
+        start = time.perf_counter()
+        with metrics.stage("balance"):
+            by_equation = dict(zip(unique, await balance_batch(unique, include_steps=not compact)))
+        timing["balance_ms"] = (time.perf_counter() - start) * 1000
+    except HTTPException:
+        raise
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="The server is busy reading other images. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        metrics.ERRORS.inc(type(e).__name__)
+        raise HTTPException(status_code=500, detail=f"Error processing worksheet: {str(e)}")
+    
+    # Boxes were found on the preprocessed page; map them back to the upload
+    for line in lines:
+        left, top, right, bottom = line["box"]
+        line["box"] = [round(left * scale_x), round(top * scale_y), round(right * scale_x), round(bottom * scale_y)]
+        line["equations"] = [{"equation": eq, "result": by_equation[eq]} for eq in line["equations"]]
+    
+    return FastJSONResponse(content={
+        "lines": lines,
+        "lines_detected": len(boxes),
+        "equations_found": sum(len(line["equations"]) for line in lines),
+        "image_size": f"{original_size[0]}x{original_size[1]}",
+        "timing": {name: round(ms, 2) for name, ms in timing.items()}
+    })
 
 
 if __name__ == "__main__":
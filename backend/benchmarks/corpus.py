@@ -0,0 +1,56 @@
+"""
+Graded equation corpus for the benchmarks, from trivial to pathological.
+"""
+
+# Lowest alkanes through C40 burn the same way; heavier ones exercise larger coefficients
+_ALKANES = [f"C{n if n > 1 else ''}H{2 * n + 2} + O2 -> CO2 + H2O" for n in (1, 2, 3, 8, 16, 40)]
+
+CORPUS = {
+    "trivial": [
+        "H2 + O2 -> H2O",
+        "N2 + H2 -> NH3",
+        "Na + Cl2 -> NaCl",
+        "CaCO3 -> CaO + CO2",
+        "Fe + O2 -> Fe2O3",
+        "Mg + O2 -> MgO",
+    ],
+    "combustion": _ALKANES + [
+        "C2H5OH + O2 -> CO2 + H2O",
+        "C6H6 + O2 -> CO2 + H2O",
+        "CH3OH + O2 -> CO2 + H2O",
+    ],
+    "large_organic": [
+        "C6H12O6 + O2 -> CO2 + H2O",
+        "C57H110O6 + O2 -> CO2 + H2O",
+        "C12H22O11 + O2 -> CO2 + H2O",
+        "C55H72MgN4O5 + O2 -> CO2 + H2O + MgO + NO2",
+    ],
+    "redox": [
+        "KMnO4 + HCl -> KCl + MnCl2 + H2O + Cl2",
+        "K2Cr2O7 + HCl -> KCl + CrCl3 + H2O + Cl2",
+        "Cu + HNO3 -> CuN2O6 + NO + H2O",
+        "K4FeC6N6 + KMnO4 + H2SO4 -> KHSO4 + Fe2S3O12 + MnSO4 + HNO3 + CO2 + H2O",
+        "FeS2 + O2 -> Fe2O3 + SO2",
+    ],
+    "unbalanceable": [
+        "H2 -> O2",
+        "Fe + O2 -> FeCl3",
+        "NaCl -> Na + Cl2 + O2",
+        "H2O",
+    ],
+    "multi_solution": [
+        "H2 + O2 -> H2O + H2O2",
+        "C + O2 -> CO + CO2",
+        "NH3 + O2 -> NO + NO2 + H2O",
+    ],
+    # Many species and independent reactions: the sparse solver and the positive search
+    "many_species": [
+        " + ".join(f"C{n}H{2 * n + 2}" for n in range(2, 30)) + " + O2 -> CO2 + H2O",
+        "Fe + O2 + H2O -> FeO + Fe2O3 + Fe3O4 + FeOH + H2O2 + H2",
+    ],
+}
+
+
+def all_equations():
+    """(category, equation) pairs in a fixed order."""
+    return [(category, equation) for category, equations in CORPUS.items() for equation in equations]
@@ -0,0 +1,80 @@
+"""
+Microbenchmark of equation extraction on adversarial OCR text.
+
+Compares the old four-pattern regex cascade with the single-pass scanner
+on inputs that contain no complete equation, which is where the regexes
+backtrack the most. Times are in milliseconds per call.
+
+Run from the backend folder: python benchmarks/extraction.py
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from equation_scanner import extract_equations
+
+# The patterns extract_equation_from_text used before the scanner
+LEGACY_PATTERNS = [
+    r'([A-Z][a-z]?\d*(?:\s*\+\s*[A-Z][a-z]?\d*)+)\s*(?:→|->|=>|=|arrow)\s*([A-Z][a-z]?\d*(?:\s*\+\s*[A-Z][a-z]?\d*)+)',
+    r'(\d*[A-Z][a-z]?\d*(?:\s*\+\s*\d*[A-Z][a-z]?\d*)+)\s*(?:→|->|=>|=)\s*(\d*[A-Z][a-z]?\d*(?:\s*\+\s*\d*[A-Z][a-z]?\d*)+)',
+    r'([A-Z][a-z]?\d*(?:\s*\+\s*[A-Z][a-z]?\d*)*)\s*(?:→|->|=>|=)\s*([A-Z][a-z]?\d*(?:\s*\+\s*[A-Z][a-z]?\d*)+)',
+    r'([A-Z][a-z]?\s*\d*(?:\s*\+\s*[A-Z][a-z]?\s*\d*)+)\s*(?:→|->|=>|=)\s*([A-Z][a-z]?\s*\d*(?:\s*\+\s*[A-Z][a-z]?\s*\d*)+)',
+]
+
+
+def legacy_extract(text: str):
+    text = ' '.join(text.split())
+    for pattern in LEGACY_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(0)
+    return None
+
+
+# name -> function building an input of roughly n characters
+ADVERSARIAL_INPUTS = {
+    # Long reactant chain that never reaches an arrow
+    "plus_chain": lambda n: "H2 + " * (n // 5),
+    # Reactant chains each ended by an arrow with nothing valid after it
+    "dangling_arrows": lambda n: ("H + O + N -> . " * (n // 15)),
+    # Letters and digits split by OCR spaces
+    "spaced_digits": lambda n: "H 2 " * (n // 4),
+    # Ordinary noisy OCR text with no equation
+    "noise": lambda n: ("Balance the following reaction carefully; see p. 12 " * (n // 52 + 1))[:n],
+}
+
+SIZES = [250, 500, 1000, 2000, 4000]
+
+
+def _time(fn, text: str, budget: float = 0.5) -> float:
+    """Mean milliseconds per call over as many calls as fit in the budget."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn(text)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget or calls >= 1000:
+            return round(1000 * elapsed / calls, 4)
+
+
+def run() -> list:
+    results = []
+    for name, build in ADVERSARIAL_INPUTS.items():
+        for size in SIZES:
+            text = build(size)
+            results.append({
+                "input": name,
+                "chars": len(text),
+                "legacy_ms": _time(legacy_extract, text),
+                "scanner_ms": _time(extract_equations, text),
+            })
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps({"benchmark": "extraction", "results": run()}, indent=2))
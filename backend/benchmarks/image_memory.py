@@ -0,0 +1,120 @@
+"""
+Peak memory of decoding and preprocessing one camera-sized upload.
+
+Compares the old pipeline (full RGB decode, RGB preprocessing) with the
+current one (draft-mode grayscale decode, single-channel preprocessing).
+Each measurement runs in a fresh process so peak RSS is not shared.
+
+Run from the backend folder: python benchmarks/image_memory.py
+"""
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (label, width, height) of synthetic phone-camera photos
+SIZES = [
+    ("12MP", 4000, 3000),
+    ("48MP", 8000, 6000),
+]
+
+
+def _proc_status_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def _reset_peak() -> float:
+    """Reset the peak-RSS counter where possible and return the current RSS in MB."""
+    try:
+        # Linux: writing 5 to clear_refs resets VmHWM to the current RSS
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _proc_status_mb("VmRSS")
+    except OSError:
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    try:
+        return _proc_status_mb("VmHWM")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_photo(path: str, width: int, height: int) -> None:
+    """Write a noisy JPEG with an equation drawn on it."""
+    from PIL import Image, ImageDraw
+    
+    noise = Image.effect_noise((width, height), 24).point(lambda v: 160 + v // 3)
+    photo = Image.merge("RGB", (noise, noise, noise))
+    draw = ImageDraw.Draw(photo)
+    draw.text((width // 10, height // 2), "CH4 + 2O2 -> CO2 + 2H2O", fill=(0, 0, 0))
+    photo.save(path, "JPEG", quality=90)
+
+
+def legacy_pipeline(data: bytes):
+    from PIL import Image, ImageEnhance
+    
+    image = Image.open(io.BytesIO(data))
+    image = image.convert("RGB")
+    return ImageEnhance.Contrast(image).enhance(1.2)
+
+
+def current_pipeline(data: bytes):
+    from app import load_image, preprocess_image
+    
+    image, _ = load_image(data)
+    return preprocess_image(image)
+
+
+def _measure(pipeline_name: str, path: str, queue) -> None:
+    import app  # noqa: F401  (imported before the baseline is taken)
+    
+    with open(path, "rb") as f:
+        data = f.read()
+    pipeline = globals()[pipeline_name]
+    baseline = _reset_peak()
+    start = time.perf_counter()
+    processed = pipeline(data)
+    elapsed = time.perf_counter() - start
+    queue.put({
+        "pipeline": pipeline_name,
+        "peak_mb": round(_peak_rss_mb() - baseline, 1),
+        "seconds": round(elapsed, 3),
+        "output_size": list(processed.size),
+        "output_mode": processed.mode,
+    })
+
+
+def run() -> list:
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, width, height in SIZES:
+            path = os.path.join(tmp, f"{label}.jpg")
+            make_photo(path, width, height)
+            for pipeline_name in ("legacy_pipeline", "current_pipeline"):
+                queue = ctx.Queue()
+                process = ctx.Process(target=_measure, args=(pipeline_name, path, queue))
+                process.start()
+                result = queue.get()
+                process.join()
+                result.update({"image": label, "upload_bytes": os.path.getsize(path)})
+                results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps({"benchmark": "image_memory", "results": run()}, indent=2))
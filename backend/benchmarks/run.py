@@ -0,0 +1,274 @@
+"""
+Benchmark suite for the equation balancer and the image pipeline.
+
+Measures throughput and p50/p99 latency of balance_equation per corpus
+category and per solver path, with cold caches (cleared before every
+call) and warm caches, plus peak Python memory. The image part renders
+the trivial equations locally with PIL and times preprocessing, OCR (when
+Tesseract is available) and equation extraction end to end. Cold import
+time of the app and solver modules is measured in fresh interpreters, and
+the reaction index is timed for building, opening and lookups, including
+from worker processes that share the memory-mapped file.
+
+Results are printed as JSON so they can be compared between releases;
+anything else written while benchmarking (such as OCR probe warnings) goes
+to stderr, so stdout can be piped straight into a JSON parser.
+
+Run from the backend folder:
+    python benchmarks/run.py [--repeat N] [--output results.json] [--all]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from corpus import CORPUS, all_equations
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Throughput and latency percentiles (ms) of a list of durations in seconds."""
+    if not samples:
+        return {"calls": 0}
+    ordered = sorted(samples)
+    
+    def percentile(p: float) -> float:
+        return round(1000 * ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+    
+    total = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "per_second": round(len(ordered) / total, 1) if total else None,
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(1000 * ordered[-1], 4),
+    }
+
+
+def _clear_solver_caches() -> None:
+    from chemistry_solver import equation_cache, parse_composition
+    equation_cache.clear()
+    parse_composition.cache_clear()
+
+
+def _timed(fn: Callable, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_balancer(repeat: int) -> Dict:
+    import chemistry_solver
+    from chemistry_solver import balance_equation
+    
+    # The reaction index is measured on its own (bench_reaction_index)
+    reaction_index, chemistry_solver.reaction_index = chemistry_solver.reaction_index, None
+    equations = all_equations()
+    by_category = {"cold": defaultdict(list), "warm": defaultdict(list)}
+    by_path = defaultdict(list)
+    outcomes = {}
+    
+    # Cold: every call parses and solves from scratch
+    for _ in range(repeat):
+        for category, equation in equations:
+            _clear_solver_caches()
+            elapsed, result = _timed(balance_equation, equation)
+            by_category["cold"][category].append(elapsed)
+            path = result["solver"]["method"] if "solver" in result else "failed"
+            by_path[path].append(elapsed)
+            outcomes[equation] = result.get("balanced_equation") or result.get("error")
+    
+    # Warm: caches primed by one pass, then timed
+    for _, equation in equations:
+        balance_equation(equation)
+    for _ in range(repeat):
+        for category, equation in equations:
+            elapsed, _ = _timed(balance_equation, equation)
+            by_category["warm"][category].append(elapsed)
+    
+    # Peak Python memory of one cold pass over the corpus
+    _clear_solver_caches()
+    tracemalloc.start()
+    for _, equation in equations:
+        balance_equation(equation)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    chemistry_solver.reaction_index = reaction_index
+    
+    return {
+        "categories": {
+            cache: {category: summarize(samples) for category, samples in categories.items()}
+            for cache, categories in by_category.items()
+        },
+        "solver_paths": {path: summarize(samples) for path, samples in by_path.items()},
+        "peak_memory_kb": round(peak / 1024, 1),
+        "outcomes": outcomes,
+    }
+
+
+def _index_lookups(path: str, keys: List[str]) -> Dict:
+    """Open the index in a worker process and time a lookup of every key."""
+    from chemistry_solver import SOLVER_VERSION
+    from reaction_index import ReactionIndex
+    
+    index = ReactionIndex.open(path, SOLVER_VERSION)
+    samples = [_timed(index.get, key)[0] for key in keys]
+    return {"pid": os.getpid(), "found": sum(index.get(key) is not None for key in keys), **summarize(samples)}
+
+
+def bench_reaction_index(repeat: int) -> Dict:
+    """Build, open and lookup times of the reaction index, in this and in worker processes."""
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    
+    from chemistry_solver import SOLVER_VERSION, EquationBalancer, canonical_equation
+    from reaction_index import DEFAULT_SOURCE, ReactionIndex, build, ocr_signature, read_equations
+    
+    keys, signatures = [], []
+    for equation in read_equations([DEFAULT_SOURCE]):
+        balancer = EquationBalancer(equation)
+        balancer.parse_equation()
+        keys.append(balancer.canonical_key())
+        signatures.append(canonical_equation([ocr_signature(f.formula) for f in balancer.reactants],
+                                             [ocr_signature(f.formula) for f in balancer.products]))
+    missing = [f"{key} + Xe" for key in keys]
+    
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "reactions.idx")
+        build_seconds, summary = _timed(build, [DEFAULT_SOURCE], path)
+        opens = [_timed(ReactionIndex.open, path, SOLVER_VERSION)[0] for _ in range(repeat)]
+        index = ReactionIndex.open(path, SOLVER_VERSION)
+        hits = [_timed(index.get, key)[0] for _ in range(repeat) for key in keys]
+        misses = [_timed(index.get, key)[0] for _ in range(repeat) for key in missing]
+        snaps = [_timed(index.find_signature, signature)[0] for _ in range(repeat) for signature in signatures]
+        # Each worker maps the same file; pages are shared, not copied
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            workers = list(pool.map(_index_lookups, [path, path], [keys * repeat, keys * repeat]))
+    
+    return {
+        "index": summary,
+        "build_ms": round(build_seconds * 1000, 2),
+        "open": summarize(opens),
+        "lookup_hit": summarize(hits),
+        "lookup_miss": summarize(misses),
+        "signature_lookup": summarize(snaps),
+        "worker_processes": workers,
+    }
+
+
+def render_equation(equation: str, size: int = 40):
+    """Black text on a white card, like a cropped photo of a worksheet line."""
+    from PIL import Image, ImageDraw, ImageFont
+    
+    text = equation.replace("->", "→")
+    font = ImageFont.load_default(size=size)
+    left, top, right, bottom = font.getbbox(text)
+    image = Image.new("RGB", (right - left + 2 * size, bottom - top + 2 * size), "white")
+    ImageDraw.Draw(image).text((size - left, size - top), text, fill="black", font=font)
+    return image
+
+
+def bench_images(repeat: int) -> Dict:
+    import app
+    
+    stages = defaultdict(list)
+    detected = 0
+    cases = CORPUS["trivial"]
+    for _ in range(repeat):
+        for equation in cases:
+            buffer = io.BytesIO()
+            render_equation(equation).save(buffer, "JPEG", quality=90)
+            data = buffer.getvalue()
+            
+            elapsed, (image, _) = _timed(app.load_image, data)
+            stages["decode"].append(elapsed)
+            elapsed, processed = _timed(app.preprocess_image, image)
+            stages["preprocess"].append(elapsed)
+            elapsed, (text, _) = _timed(app.extract_text_from_image, processed, False)
+            stages["ocr"].append(elapsed)
+            elapsed, found = _timed(app.extract_equation_from_text, text)
+            stages["extract_equation"].append(elapsed)
+            stages["total"].append(sum(stages[name][-1] for name in ("decode", "preprocess", "ocr", "extract_equation")))
+            detected += found is not None
+    
+    return {
+        "ocr_available": app.ocr_available(),
+        "ocr_backend": app.get_ocr_backend().name if app.ocr_available() else None,
+        "images": len(cases) * repeat,
+        "equations_detected": detected,
+        "stages": {name: summarize(samples) for name, samples in stages.items()},
+    }
+
+
+def bench_import_time(repeat: int) -> Dict:
+    """Cold import time of the API and solver modules, each in a fresh interpreter."""
+    import subprocess
+    
+    results = {}
+    for module in ("app", "chemistry_solver"):
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        samples = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR,
+                                 capture_output=True, text=True, check=True).stdout
+            samples.append(float(out.strip().splitlines()[-1]))
+        results[module] = summarize(samples)
+    return results
+
+
+@contextmanager
+def stdout_to_stderr() -> Iterator[None]:
+    """Send stdout to stderr at the file descriptor level, so prints from C code and child processes move too."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus per measurement")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--all", action="store_true",
+                        help="include the image memory and extraction microbenchmarks")
+    args = parser.parse_args()
+    
+    with stdout_to_stderr():
+        results = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "import_time": bench_import_time(max(3, args.repeat // 4)),
+            "balancer": bench_balancer(args.repeat),
+            "reaction_index": bench_reaction_index(args.repeat),
+            "image_pipeline": bench_images(max(1, args.repeat // 5)),
+        }
+        if args.all:
+            import extraction
+            import image_memory
+            results["extraction"] = extraction.run()
+            results["image_memory"] = image_memory.run()
+    
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
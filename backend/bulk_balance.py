@@ -0,0 +1,192 @@
+"""
+Balance equations in bulk from a JSONL or CSV file (or stdin).
+
+Input is read as a stream and balanced in chunks on a process pool, with
+a bounded number of chunks in flight, so memory use does not grow with
+the input. Results are written as JSON lines as soon as they are ready,
+in input order (default) or in completion order (--unordered). A
+throughput and failure summary is printed to stderr at the end.
+
+Input formats:
+    JSONL  one object per line with an "equation" field, or a JSON string
+    CSV    a header row with an "equation" column
+
+Run from the backend folder, e.g.:
+    python bulk_balance.py homework.csv --output answers.jsonl
+    cat equations.jsonl | python bulk_balance.py - --format jsonl --unordered
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import config
+
+# (line number, equation or None when the line could not be read)
+Item = Tuple[int, Optional[str]]
+
+# Fields of a result that are kept unless --steps is given
+SUMMARY_FIELDS = ("balanced_equation", "coefficients", "solver", "error")
+
+
+def read_jsonl(stream: TextIO, field: str) -> Iterator[Item]:
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError:
+            yield number, None
+            continue
+        equation = value.get(field) if isinstance(value, dict) else value
+        yield number, equation if isinstance(equation, str) else None
+
+
+def read_csv(stream: TextIO, field: str) -> Iterator[Item]:
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None or field not in reader.fieldnames:
+        raise ValueError(f"CSV input has no {field!r} column")
+    for row in reader:
+        # Data rows start on line 2, after the header
+        yield reader.line_num, row.get(field)
+
+
+def balance_chunk(chunk: List[Item], include_steps: bool) -> List[Dict]:
+    """Balance one chunk in a worker process; only the fields to be written are sent back."""
+    from chemistry_solver import balance_equation
+
+    results = []
+    for number, equation in chunk:
+        if equation is None:
+            result = {"error": "Could not read an equation from this line."}
+        elif len(equation) > config.MAX_EQUATION_LENGTH:
+            result = {"error": f"Equation is longer than {config.MAX_EQUATION_LENGTH} characters."}
+        else:
+            result = balance_equation(equation, include_steps)
+            if not include_steps:
+                result = {name: result[name] for name in SUMMARY_FIELDS if name in result}
+        results.append({"line": number, "equation": equation, **result})
+    return results
+
+
+def chunked(items: Iterable[Item], size: int) -> Iterator[List[Item]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(items: Iterable[Item], out: TextIO, workers: int, chunk_size: int,
+        ordered: bool = True, include_steps: bool = False) -> Dict:
+    """Balance every item, writing results to out; returns the summary."""
+    totals = Counter()
+    errors = Counter()
+    start = time.perf_counter()
+
+    def write(results: List[Dict]) -> None:
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if "error" in result:
+                totals["failed"] += 1
+                errors[result["error"].split("\n")[0][:80]] += 1
+            else:
+                totals["balanced"] += 1
+
+    chunks = chunked(items, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            write(balance_chunk(chunk, include_steps))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # A few chunks per worker in flight keeps workers busy; chunks
+            # finished ahead of their turn count too, so memory stays bounded
+            max_in_flight = workers * 2
+            in_flight: Dict[Future, int] = {}
+            finished: Dict[int, List[Dict]] = {}
+            next_to_write = 0
+            submitted = 0
+            exhausted = False
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) + len(finished) < max_in_flight:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    in_flight[pool.submit(balance_chunk, chunk, include_steps)] = submitted
+                    submitted += 1
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    sequence = in_flight.pop(future)
+                    if ordered:
+                        finished[sequence] = future.result()
+                    else:
+                        write(future.result())
+                while next_to_write in finished:
+                    write(finished.pop(next_to_write))
+                    next_to_write += 1
+                out.flush()
+
+    elapsed = time.perf_counter() - start
+    total = totals["balanced"] + totals["failed"]
+    return {
+        "equations": total,
+        "balanced": totals["balanced"],
+        "failed": totals["failed"],
+        "seconds": round(elapsed, 3),
+        "per_second": round(total / elapsed, 1) if elapsed else None,
+        "top_errors": dict(errors.most_common(5)),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Balance equations in bulk from a JSONL or CSV file.")
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="input format (default: from the file extension, jsonl for stdin)")
+    parser.add_argument("--field", default="equation", help="JSON field or CSV column holding the equation")
+    parser.add_argument("--output", help="output JSONL file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="equations per work unit")
+    parser.add_argument("--unordered", action="store_true", help="write results as soon as they complete")
+    parser.add_argument("--steps", action="store_true", help="include the step-by-step explanation")
+    args = parser.parse_args(argv)
+
+    input_format = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    if args.input == "-":
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        source = open(args.input, encoding="utf-8", newline="")
+    out = open(args.output, "w", encoding="utf-8") if args.output else \
+        io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", write_through=True)
+
+    reader = read_csv if input_format == "csv" else read_jsonl
+    try:
+        summary = run(reader(source, args.field), out, max(1, args.workers), max(1, args.chunk_size),
+                      ordered=not args.unordered, include_steps=args.steps)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        source.close()
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
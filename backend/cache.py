@@ -0,0 +1,164 @@
+"""
+In-process caches used by the solver and the API.
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a size bound and per-entry time-to-live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ImageResultCache:
+    """
+    LRU cache of image results keyed by a content hash and bounded by the
+    approximate total size of the cached values. Entries may also carry a
+    perceptual hash, so near-identical images can be found by Hamming
+    distance among the max_scan most recently used entries.
+    """
+
+    def __init__(self, max_bytes: int, max_distance: int = 0, max_scan: int = 256):
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.max_scan = max_scan
+        # digest -> (value, perceptual hash or None, cost in bytes)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, digest: str) -> Optional[Any]:
+        """Exact lookup by content hash."""
+        with self._lock:
+            entry = self._data.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def find_similar(self, fingerprint: int) -> Optional[Any]:
+        """
+        Closest entry whose perceptual hash is within max_distance bits.
+        The scan holds the lock, so only the most recently used entries are
+        compared and a large cache does not stall exact lookups.
+        """
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            recent = islice(reversed(self._data.items()), self.max_scan)
+            for key, (_, other, _) in recent:
+                if other is not None:
+                    distance = hamming_distance(fingerprint, other)
+                    if distance < best_distance:
+                        best_key, best_distance = key, distance
+            if best_key is None:
+                return None
+            self._data.move_to_end(best_key)
+            self.similar_hits += 1
+            return self._data[best_key][0]
+
+    def set(self, digest: str, value: Any, cost: int, fingerprint: Optional[int] = None) -> None:
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(digest, None)
+            if previous is not None:
+                self.total_bytes -= previous[2]
+            self._data[digest] = (value, fingerprint, cost)
+            self.total_bytes += cost
+            while self.total_bytes > self.max_bytes:
+                _, (_, _, evicted_cost) = self._data.popitem(last=False)
+                self.total_bytes -= evicted_cost
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_distance": self.max_distance,
+                "max_scan": self.max_scan,
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
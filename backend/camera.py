@@ -0,0 +1,34 @@
+"""
+Helpers for the live camera WebSocket: result stabilization and counters.
+"""
+from collections import Counter
+from typing import Optional
+
+# Frame counters across all camera sessions: received, dropped (replaced
+# while OCR was busy), skipped (unchanged picture), scanned, results
+camera_counts: Counter = Counter()
+
+
+class FrameStabilizer:
+    """
+    Confirms an equation once it has been read from `required` frames in a
+    row. Each equation is confirmed once, until a different one replaces it.
+    """
+
+    def __init__(self, required: int):
+        self.required = max(1, required)
+        self.candidate: Optional[str] = None
+        self.streak = 0
+        self.confirmed: Optional[str] = None
+
+    def update(self, equation: Optional[str]) -> Optional[str]:
+        """Feed one frame's equation; returns it when it has just become stable."""
+        if equation is None or equation != self.candidate:
+            self.candidate = equation
+            self.streak = 0 if equation is None else 1
+        else:
+            self.streak += 1
+        if self.candidate is not None and self.streak >= self.required and self.candidate != self.confirmed:
+            self.confirmed = self.candidate
+            return self.confirmed
+        return None
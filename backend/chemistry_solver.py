@@ -2,17 +2,345 @@
 Chemistry equation balancing module.
 Implements proper chemical equation balancing using matrix methods.
 """
+from __future__ import annotations
+
 import re
-from typing import Dict, List, Tuple, Optional
+import math
+import threading
+import time
+from fractions import Fraction
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Container, Dict, Iterator, List, Tuple, Optional, Sequence, Mapping
 from collections import defaultdict
-import numpy as np
 
-# Try to import sympy for alternative balancing method
-try:
-    from sympy import Matrix, lcm
-    SYMPY_AVAILABLE = True
-except ImportError:
-    SYMPY_AVAILABLE = False
+import config
+import metrics
+from cache import TTLCache
+from elements import ELEMENT_SYMBOLS
+from reaction_index import ReactionIndex, ocr_signature
+from result_store import ResultStore
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# NumPy is only needed for build_matrix, so it is imported lazily
+
+
+def _primitive(vector: List[int]) -> List[int]:
+    """Divide an integer vector by the GCD of its entries."""
+    divisor = math.gcd(*vector)
+    if divisor > 1:
+        return [v // divisor for v in vector]
+    return vector
+
+
+class SolverBudgetExceeded(Exception):
+    """Balancing ran past its time budget (config.SOLVER_TIME_BUDGET_MS)."""
+
+
+def _check_deadline(deadline: Optional[float]) -> None:
+    if deadline is not None and time.monotonic() > deadline:
+        raise SolverBudgetExceeded()
+
+
+def integer_nullspace(matrix: Sequence[Sequence[int]], deadline: Optional[float] = None) -> Tuple[List[List[int]], int]:
+    """
+    Compute an exact integer basis of the null space of an integer matrix.
+
+    Uses fraction-free Gauss-Jordan elimination: rows are combined by
+    cross-multiplication and divided by their content (GCD) after every
+    step, so entries stay small and no fractions or floats are involved.
+    Returns (basis, rank); each basis vector is primitive and the nullity
+    is len(basis). Raises SolverBudgetExceeded once past the deadline
+    (a time.monotonic() value).
+    """
+    rows = [[int(x) for x in row] for row in matrix]
+    num_cols = len(rows[0]) if rows else 0
+    pivots = []
+    
+    r = 0
+    for c in range(num_cols):
+        if r == len(rows):
+            break
+        pivot = next((i for i in range(r, len(rows)) if rows[i][c]), None)
+        if pivot is None:
+            continue
+        rows[r], rows[pivot] = rows[pivot], rows[r]
+        pivot_row = rows[r]
+        p = pivot_row[c]
+        for i, row in enumerate(rows):
+            f = row[c]
+            if i != r and f:
+                rows[i] = _primitive([p * a - f * b for a, b in zip(row, pivot_row)])
+        pivots.append(c)
+        r += 1
+        _check_deadline(deadline)
+    
+    return _nullspace_basis(rows, pivots, num_cols), len(pivots)
+
+
+def sparse_integer_nullspace(rows: Sequence[Mapping[int, int]], num_cols: int,
+                             deadline: Optional[float] = None) -> Tuple[List[List[int]], int]:
+    """
+    integer_nullspace for a matrix given as sparse rows ({column: value}).
+    Elimination only touches the nonzero entries, which keeps equations
+    with many species (where most formulas contain few of the elements)
+    cheap. Returns dense basis vectors, like integer_nullspace.
+    """
+    rows = [dict(row) for row in rows if row]
+    pivots = []
+    
+    r = 0
+    for c in range(num_cols):
+        if r == len(rows):
+            break
+        pivot = next((i for i in range(r, len(rows)) if rows[i].get(c)), None)
+        if pivot is None:
+            continue
+        rows[r], rows[pivot] = rows[pivot], rows[r]
+        pivot_row = rows[r]
+        p = pivot_row[c]
+        for i, row in enumerate(rows):
+            f = row.get(c)
+            if i != r and f:
+                combined = {}
+                for col in row.keys() | pivot_row.keys():
+                    value = p * row.get(col, 0) - f * pivot_row.get(col, 0)
+                    if value:
+                        combined[col] = value
+                divisor = math.gcd(*combined.values()) if combined else 1
+                rows[i] = {col: value // divisor for col, value in combined.items()} if divisor > 1 else combined
+        pivots.append(c)
+        r += 1
+        _check_deadline(deadline)
+    
+    reduced = [[row.get(col, 0) for col in range(num_cols)] for row in rows[:len(pivots)]]
+    return _nullspace_basis(reduced, pivots, num_cols), len(pivots)
+
+
+def _nullspace_basis(rows: List[List[int]], pivots: List[int], num_cols: int) -> List[List[int]]:
+    """One primitive basis vector per free column of a reduced matrix (row i pivots on pivots[i])."""
+    pivot_set = set(pivots)
+    # Scaling the free variable by the LCM of the pivots keeps every entry integral
+    scale = math.lcm(*(abs(rows[i][c]) for i, c in enumerate(pivots))) if pivots else 1
+    
+    basis = []
+    for free in range(num_cols):
+        if free in pivot_set:
+            continue
+        vector = [0] * num_cols
+        vector[free] = scale
+        for i, c in enumerate(pivots):
+            vector[c] = -rows[i][free] * scale // rows[i][c]
+        basis.append(_primitive(vector))
+    
+    return basis
+
+
+def _positive_weights(parts: int, total: int, bound: int) -> Iterator[Tuple[int, ...]]:
+    """Tuples of `parts` integers in 1..bound summing to total."""
+    if parts == 1:
+        if 1 <= total <= bound:
+            yield (total,)
+        return
+    for first in range(1, min(bound, total - parts + 1) + 1):
+        for rest in _positive_weights(parts - 1, total - first, bound):
+            yield (first,) + rest
+
+
+# Equations with more weight combinations than this skip the search for
+# the smallest coefficients
+LATTICE_SEARCH_MAX_CANDIDATES = 50_000
+
+
+def smallest_positive_combination(basis: List[List[int]], bound: int,
+                                  deadline: Optional[float] = None) -> Optional[List[int]]:
+    """
+    Smallest all-positive primitive vector in the span of an integer_nullspace
+    basis with weights 1..bound, or None if there is none.
+
+    Each basis vector is the only one that is nonzero (and positive) in
+    its free column, so a positive solution needs a positive weight on
+    every vector; and since vectors are reduced to primitive form, integer
+    weights also reach every solution with rational weights. Weights are
+    tried in order of increasing sum; the search stops at the deadline and
+    returns the best vector found so far (smallest coefficient sum, then
+    lexicographically).
+    """
+    num_cols = len(basis[0])
+    best = None
+    checked = 0
+    for total in range(len(basis), len(basis) * bound + 1):
+        for weights in _positive_weights(len(basis), total, bound):
+            if math.gcd(*weights) > 1:
+                continue
+            combined = [sum(w * vector[col] for w, vector in zip(weights, basis)) for col in range(num_cols)]
+            if all(v > 0 for v in combined):
+                candidate = _primitive(combined)
+                if best is None or (sum(candidate), candidate) < (sum(best), best):
+                    best = candidate
+            checked += 1
+            if checked % 256 == 0 and deadline is not None and time.monotonic() > deadline:
+                return best
+    return best
+
+
+def _pivot(table: List[List[Fraction]], basis: List[int], row: int, col: int) -> None:
+    pivot_row = table[row]
+    p = pivot_row[col]
+    table[row] = pivot_row = [v / p for v in pivot_row]
+    for i, other in enumerate(table):
+        f = other[col]
+        if i != row and f:
+            table[i] = [a - f * b for a, b in zip(other, pivot_row)]
+    basis[row] = col
+
+
+def _simplex(table: List[List[Fraction]], basis: List[int], cost: List[int], columns: range,
+             deadline: Optional[float]) -> None:
+    """Minimise cost over a tableau in canonical form (Bland's rule, so it cannot cycle)."""
+    while True:
+        _check_deadline(deadline)
+        entering = next((j for j in columns
+                         if cost[j] - sum(cost[basis[i]] * row[j] for i, row in enumerate(table)) < 0), None)
+        if entering is None:
+            return
+        candidates = [(row[-1] / row[entering], basis[i], i) for i, row in enumerate(table) if row[entering] > 0]
+        if not candidates:
+            return
+        _pivot(table, basis, min(candidates)[2], entering)
+
+
+def positive_solution(matrix: Sequence[Sequence[int]], deadline: Optional[float] = None) -> Optional[List[int]]:
+    """
+    An all-positive integer x with matrix @ x = 0, or None if there is none.
+
+    Solves the linear program "minimise sum(x) with every x >= 1" exactly
+    (two-phase simplex over fractions) and scales the optimum to a
+    primitive integer vector. Unlike smallest_positive_combination this is
+    polynomial in practice for any nullity, and it proves that no positive
+    solution exists; the coefficients need not be the smallest possible.
+    """
+    num_cols = len(matrix[0]) if matrix else 0
+    # With y = x - 1: matrix @ y = -matrix @ 1, y >= 0; rows are flipped so
+    # the right-hand side is non-negative, then one artificial variable per row
+    table = []
+    for i, row in enumerate(matrix):
+        rhs = -sum(row)
+        sign = -1 if rhs < 0 else 1
+        table.append([Fraction(sign * v) for v in row] +
+                     [Fraction(int(i == j)) for j in range(len(matrix))] + [Fraction(sign * rhs)])
+    basis = [num_cols + i for i in range(len(matrix))]
+    artificial = range(num_cols, num_cols + len(matrix))
+    
+    # Phase 1: find a feasible point by driving the artificial variables to zero
+    _simplex(table, basis, [0] * num_cols + [1] * len(matrix), range(num_cols + len(matrix)), deadline)
+    if any(table[i][-1] for i, var in enumerate(basis) if var in artificial):
+        return None
+    # Swap artificial variables left in the basis (at zero) for real ones; a
+    # row with no real entry left is redundant
+    for i in reversed(range(len(table))):
+        if basis[i] in artificial:
+            col = next((j for j in range(num_cols) if table[i][j]), None)
+            if col is None:
+                del table[i], basis[i]
+            else:
+                _pivot(table, basis, i, col)
+    
+    # Phase 2: minimise the sum over the real variables
+    _simplex(table, basis, [1] * num_cols + [0] * len(matrix), range(num_cols), deadline)
+    x = [Fraction(1)] * num_cols
+    for i, var in enumerate(basis):
+        x[var] += table[i][-1]
+    scale = math.lcm(*(v.denominator for v in x))
+    return _primitive([int(v * scale) for v in x])
+
+
+# Maximum number of distinct formula strings kept in the intern table
+FORMULA_CACHE_SIZE = 2048
+
+# Process-wide element table; compositions store indices into it
+_ELEMENT_SYMBOLS: List[str] = []
+_ELEMENT_INDEX: Dict[str, int] = {}
+_ELEMENT_LOCK = threading.Lock()
+
+_FORMULA_PATTERN = re.compile(r'([A-Z][a-z]?)(\d*)')
+_GROUP_COUNT = re.compile(r'\d*')
+
+
+def element_index(symbol: str) -> int:
+    """Return the global index of an element symbol, registering it if new."""
+    index = _ELEMENT_INDEX.get(symbol)
+    if index is None:
+        with _ELEMENT_LOCK:
+            index = _ELEMENT_INDEX.get(symbol)
+            if index is None:
+                index = len(_ELEMENT_SYMBOLS)
+                _ELEMENT_SYMBOLS.append(symbol)
+                _ELEMENT_INDEX[symbol] = index
+    return index
+
+
+class Composition:
+    """Immutable element-count vector of a formula, keyed by global element index."""
+    
+    __slots__ = ('indices', 'counts', 'symbols', '_mapping')
+    
+    def __init__(self, counts: Dict[str, int]):
+        ordered = sorted((element_index(symbol), count) for symbol, count in counts.items())
+        self.indices = tuple(index for index, _ in ordered)
+        self.counts = tuple(count for _, count in ordered)
+        self.symbols = tuple(_ELEMENT_SYMBOLS[index] for index in self.indices)
+        self._mapping = MappingProxyType(dict(zip(self.symbols, self.counts)))
+    
+    def get(self, symbol: str, default: int = 0) -> int:
+        return self._mapping.get(symbol, default)
+    
+    def as_mapping(self) -> Mapping[str, int]:
+        """Read-only element -> count view (no copy)."""
+        return self._mapping
+    
+    def __repr__(self) -> str:
+        return f"Composition({dict(self._mapping)})"
+
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def parse_composition(formula: str) -> Composition:
+    """
+    Parse a (stripped) formula string into a shared, interned Composition.
+    Bracketed groups are multiplied out, e.g. Ca(OH)2 has two O and two H.
+    """
+    # One count dict per open bracket; the bottom one is the whole formula
+    stack = [{}]
+    i = 0
+    while i < len(formula):
+        ch = formula[i]
+        if ch in '([':
+            stack.append({})
+            i += 1
+        elif ch in ')]':
+            count_str = _GROUP_COUNT.match(formula, i + 1).group(0)
+            i += 1 + len(count_str)
+            if len(stack) > 1:
+                group = stack.pop()
+                multiplier = int(count_str) if count_str else 1
+                for element, count in group.items():
+                    stack[-1][element] = stack[-1].get(element, 0) + count * multiplier
+        else:
+            match = _FORMULA_PATTERN.match(formula, i)
+            if match is None:
+                i += 1
+                continue
+            element, count_str = match.groups()
+            stack[-1][element] = stack[-1].get(element, 0) + (int(count_str) if count_str else 1)
+            i = match.end()
+    # Unclosed brackets count once
+    counts = stack[0]
+    for group in stack[1:]:
+        for element, count in group.items():
+            counts[element] = counts.get(element, 0) + count
+    return Composition(counts)
 
 
 class ChemicalFormula:
@@ -20,23 +348,95 @@ class ChemicalFormula:
     
     def __init__(self, formula: str):
         self.formula = formula.strip()
-        self.elements = self._parse_formula()
-    
-    def _parse_formula(self) -> Dict[str, int]:
-        """Parse a chemical formula and return element counts."""
-        elements = {}
-        # Pattern to match element symbols (capital letter + optional lowercase + optional number)
-        pattern = r'([A-Z][a-z]?)(\d*)'
-        matches = re.findall(pattern, self.formula)
-        
-        for element, count_str in matches:
-            count = int(count_str) if count_str else 1
-            elements[element] = elements.get(element, 0) + count
-        
-        return elements
+        self.composition = parse_composition(self.formula)
     
-    def get_elements(self) -> Dict[str, int]:
-        return self.elements.copy()
+    @property
+    def elements(self) -> Mapping[str, int]:
+        return self.composition.as_mapping()
+    
+    def get_elements(self) -> Mapping[str, int]:
+        """Element counts as a read-only view shared with the intern table."""
+        return self.composition.as_mapping()
+
+
+# Reaction arrows accepted between reactants and products, in match order
+ARROWS = ['→', '->', '=>', '=']
+
+INVALID_FORMAT_ERROR = "Invalid equation format. Please use → or -> to separate reactants and products."
+
+_LEADING_COEFFICIENT = re.compile(r'^\d+\s*')
+
+
+def split_equation(equation: str, keep_coefficients: bool = False) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Split an equation into reactant and product species strings.
+    Whitespace around species and, unless keep_coefficients is set, any
+    leading stoichiometric coefficients (e.g. the 2 in "2H2O") are stripped.
+    """
+    separator = next((arrow for arrow in ARROWS if arrow in equation), None)
+    if not separator:
+        return None
+    
+    parts = equation.split(separator)
+    if len(parts) != 2:
+        return None
+    
+    def species(side: str) -> List[str]:
+        if keep_coefficients:
+            return [f.strip() for f in side.strip().split('+')]
+        return [_LEADING_COEFFICIENT.sub('', f.strip()) for f in side.strip().split('+')]
+    
+    return species(parts[0]), species(parts[1])
+
+
+_SPECIES_PATTERN = re.compile(r'(?:[A-Z][a-z]?\d*|[()\[\]]\d*)+')
+
+
+def incomplete_reason(equation: str, known: Container[str] = ()) -> Optional[str]:
+    """
+    Why an equation (e.g. one still being typed) cannot be balanced yet,
+    found with string checks only: no arrow, an empty side or dangling
+    "+", or a species that is malformed or names an unknown element.
+    Species in `known` were already validated and are skipped. Returns
+    None when the equation is worth parsing.
+    """
+    sides = split_equation(equation)
+    if sides is None:
+        return "Type an arrow (→ or ->) between the reactants and the products."
+    for name, side in zip(("reactants", "products"), sides):
+        if not any(side):
+            return f"Add the {name}."
+        if not all(side):
+            return "Add a species after each \"+\"."
+        for formula in side:
+            if formula in known:
+                continue
+            if not _SPECIES_PATTERN.fullmatch(formula):
+                return f"\"{formula}\" is not a chemical formula."
+            unknown = next((symbol for symbol, _ in _FORMULA_PATTERN.findall(formula)
+                            if symbol not in ELEMENT_SYMBOLS), None)
+            if unknown is not None:
+                return f"Unknown element \"{unknown}\" in {formula}."
+            depth = 0
+            for ch in formula:
+                depth += ch in "(["
+                depth -= ch in ")]"
+                if depth < 0:
+                    break
+            if depth != 0:
+                return f"Unbalanced brackets in {formula}."
+    return None
+
+
+def canonical_equation(reactants: List[str], products: List[str]) -> Optional[str]:
+    """
+    Order-independent key for an equation (sorted species per side, one arrow).
+    Returns None when a side repeats a species, since coefficients could not
+    be mapped back to the caller's order unambiguously.
+    """
+    if len(set(reactants)) != len(reactants) or len(set(products)) != len(products):
+        return None
+    return f"{' + '.join(sorted(reactants))} -> {' + '.join(sorted(products))}"
 
 
 class EquationBalancer:
@@ -47,166 +447,144 @@ class EquationBalancer:
         self.reactants = []
         self.products = []
         self.all_elements = set()
+        self.element_rows = {}
         self.coefficients = []
         self.steps = []
-        
-    def parse_equation(self) -> bool:
-        """Parse the equation into reactants and products."""
-        # Find the separator
-        separators = ['→', '->', '=>', '=']
-        separator = None
-        for sep in separators:
-            if sep in self.original_equation:
-                separator = sep
-                break
-        
-        if not separator:
+        self.rank = None
+        self.nullity = None
+        self.solver_path = None
+        # Exact null space basis, and the reactions it stands for when nullity > 1
+        self.basis = []
+        self.independent_reactions = None
+        
+    def parse_equation(self, species: Optional[Dict[str, ChemicalFormula]] = None) -> bool:
+        """
+        Parse the equation into reactants and products. Formulas found in
+        `species` (e.g. from earlier revisions of a live-input session) are
+        reused, and newly parsed ones are added to it.
+        """
+        sides = split_equation(self.original_equation)
+        if sides is None:
             return False
         
-        parts = self.original_equation.split(separator)
-        if len(parts) != 2:
-            return False
-        
-        reactants_str = parts[0].strip()
-        products_str = parts[1].strip()
-        
-        # Parse reactants
-        self.reactants = [ChemicalFormula(f.strip()) for f in reactants_str.split('+')]
-        
-        # Parse products
-        self.products = [ChemicalFormula(f.strip()) for f in products_str.split('+')]
+        if species is None:
+            self.reactants = [ChemicalFormula(f) for f in sides[0]]
+            self.products = [ChemicalFormula(f) for f in sides[1]]
+        else:
+            for f in sides[0] + sides[1]:
+                if f not in species:
+                    species[f] = ChemicalFormula(f)
+            self.reactants = [species[f] for f in sides[0]]
+            self.products = [species[f] for f in sides[1]]
         
         # Collect all elements
         for formula in self.reactants + self.products:
-            self.all_elements.update(formula.get_elements().keys())
+            self.all_elements.update(formula.composition.symbols)
         
         self.all_elements = sorted(list(self.all_elements))
+        # Map global element indices to matrix rows
+        self.element_rows = {element_index(element): j for j, element in enumerate(self.all_elements)}
         return True
     
+    def build_integer_matrix(self) -> List[List[int]]:
+        """Element-by-compound matrix as plain integer rows (no NumPy)."""
+        A = [[0] * (len(self.reactants) + len(self.products)) for _ in self.all_elements]
+        
+        # Reactants get positive entries, products negative ones
+        for col, formula in enumerate(self.reactants + self.products):
+            sign = 1 if col < len(self.reactants) else -1
+            composition = formula.composition
+            for index, count in zip(composition.indices, composition.counts):
+                A[self.element_rows[index]][col] = sign * count
+        
+        return A
+    
+    def build_sparse_rows(self) -> List[Dict[int, int]]:
+        """The build_integer_matrix rows as {column: count}, without the zeros."""
+        rows = [{} for _ in self.all_elements]
+        for col, formula in enumerate(self.reactants + self.products):
+            sign = 1 if col < len(self.reactants) else -1
+            composition = formula.composition
+            for index, count in zip(composition.indices, composition.counts):
+                rows[self.element_rows[index]][col] = sign * count
+        return rows
+    
     def build_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
         """Build the matrix for balancing (Ax = 0)."""
+        import numpy as np
+        
         num_compounds = len(self.reactants) + len(self.products)
         num_elements = len(self.all_elements)
         
-        # Create matrix A
-        A = np.zeros((num_elements, num_compounds), dtype=int)
-        
-        # Fill matrix for reactants (positive coefficients)
-        for i, formula in enumerate(self.reactants):
-            elements = formula.get_elements()
-            for j, element in enumerate(self.all_elements):
-                A[j, i] = elements.get(element, 0)
-        
-        # Fill matrix for products (negative coefficients)
-        for i, formula in enumerate(self.products):
-            elements = formula.get_elements()
-            for j, element in enumerate(self.all_elements):
-                A[j, len(self.reactants) + i] = -elements.get(element, 0)
-        
+        A = np.array(self.build_integer_matrix(), dtype=int).reshape(num_elements, num_compounds)
         return A, np.zeros(num_elements)
     
-    def solve_balance(self) -> Optional[List[int]]:
-        """Solve the balancing equation using null space."""
-        A, _ = self.build_matrix()
-        
-        # Try using SymPy if available (more reliable)
-        if SYMPY_AVAILABLE:
-            try:
-                A_sympy = Matrix(A.tolist())
-                # Find null space
-                nullspace = A_sympy.nullspace()
-                if nullspace:
-                    null_vec = nullspace[0]
-                    # Convert to numpy array
-                    null_space_vec = np.array([float(x) for x in null_vec])
-                    # Make positive
-                    if np.any(null_space_vec < 0):
-                        null_space_vec = -null_space_vec
-                    # Rationalize
-                    solution = self._rationalize_coefficients(null_space_vec)
-                    if np.all(solution > 0):
-                        return solution.tolist()
-            except Exception:
-                pass
-        
-        # Fallback to QR decomposition
-        try:
-            Q, R = np.linalg.qr(A.T)
-            rank = np.sum(np.abs(np.diag(R)) > 1e-10)
-            null_dim = A.shape[1] - rank
-            
-            if null_dim > 0:
-                null_space_vec = Q[:, -1]
-                if np.any(null_space_vec < 0):
-                    null_space_vec = -null_space_vec
-                solution = self._rationalize_coefficients(null_space_vec)
-                if np.all(solution > 0):
-                    return solution.tolist()
-        except Exception:
-            pass
-        
-        # Final fallback to SVD
-        try:
-            U, s, Vt = np.linalg.svd(A.astype(float), full_matrices=True)
-            null_space_vec = Vt[-1]
-            if np.any(null_space_vec < 0):
-                null_space_vec = -null_space_vec
-            solution = self._rationalize_coefficients(null_space_vec)
-            if np.all(solution > 0):
-                return solution.tolist()
-        except Exception:
-            pass
-        
-        return None
+    def count_atoms(self, coefficients: List[int]) -> Tuple[List[int], List[int]]:
+        """Total atoms of each element (in all_elements order) on each side."""
+        reactant_totals = [0] * len(self.all_elements)
+        product_totals = [0] * len(self.all_elements)
+        for col, (coeff, formula) in enumerate(zip(coefficients, self.reactants + self.products)):
+            totals = reactant_totals if col < len(self.reactants) else product_totals
+            composition = formula.composition
+            for index, count in zip(composition.indices, composition.counts):
+                totals[self.element_rows[index]] += coeff * count
+        return reactant_totals, product_totals
     
-    def _rationalize_coefficients(self, coeffs: np.ndarray) -> np.ndarray:
-        """Convert float coefficients to smallest integer coefficients."""
-        # Find the minimum positive value
-        min_val = np.min(coeffs[coeffs > 0])
-        
-        # Scale to make minimum value 1
-        scaled = coeffs / min_val
-        
-        # Find LCM to convert to integers
-        from fractions import Fraction
-        
-        fractions = [Fraction(c).limit_denominator(1000) for c in scaled]
-        denominators = [f.denominator for f in fractions]
-        lcm = self._lcm_multiple(denominators)
-        
-        # Convert to integers
-        int_coeffs = np.array([int(f * lcm) for f in fractions])
-        
-        # Find GCD and simplify
-        gcd = self._gcd_multiple(int_coeffs)
-        if gcd > 0:
-            int_coeffs = int_coeffs // gcd
-        
-        return int_coeffs
-    
-    def _gcd(self, a: int, b: int) -> int:
-        """Greatest common divisor."""
-        while b:
-            a, b = b, a % b
-        return abs(a)
-    
-    def _gcd_multiple(self, numbers: np.ndarray) -> int:
-        """GCD of multiple numbers."""
-        result = numbers[0]
-        for num in numbers[1:]:
-            result = self._gcd(result, int(num))
-        return result
+    def solve_balance(self) -> Optional[List[int]]:
+        """
+        Solve the balancing equation using null space. Raises
+        SolverBudgetExceeded if the exact solve runs past the time budget.
+        """
+        deadline = time.monotonic() + config.SOLVER_TIME_BUDGET_MS / 1000
+        # Exact integer solve. With a one-dimensional null space the basis
+        # vector is the only candidate.
+        with metrics.solver_path("exact"):
+            solution = self._solve_exact(deadline)
+        if solution is not None or self.nullity < 2:
+            return solution
+        
+        # Several independent reactions: find a positive combination of them
+        # exactly, then look for smaller coefficients among small weights
+        self.independent_reactions = [self.describe_reaction(vector) for vector in self.basis]
+        with metrics.solver_path("lattice"):
+            solution = positive_solution(self.build_integer_matrix(), deadline)
+            if solution is not None and config.LATTICE_SEARCH_BOUND ** self.nullity <= LATTICE_SEARCH_MAX_CANDIDATES:
+                smallest = smallest_positive_combination(self.basis, config.LATTICE_SEARCH_BOUND, deadline)
+                if smallest is not None and (sum(smallest), smallest) < (sum(solution), solution):
+                    solution = smallest
+        if solution is not None:
+            self.solver_path = "lattice"
+        return solution
     
-    def _lcm(self, a: int, b: int) -> int:
-        """Least common multiple."""
-        return abs(a * b) // self._gcd(a, b) if a and b else 0
+    def _solve_exact(self, deadline: Optional[float] = None) -> Optional[List[int]]:
+        """Exact integer null space (sparse for many species); sets rank, nullity and basis."""
+        num_species = len(self.reactants) + len(self.products)
+        if num_species >= config.SPARSE_SOLVER_MIN_SPECIES:
+            self.basis, self.rank = sparse_integer_nullspace(self.build_sparse_rows(), num_species, deadline)
+        else:
+            self.basis, self.rank = integer_nullspace(self.build_integer_matrix(), deadline)
+        self.nullity = len(self.basis)
+        if self.nullity != 1:
+            return None
+        vector = self.basis[0]
+        if all(v < 0 for v in vector):
+            vector = [-v for v in vector]
+        if all(v > 0 for v in vector):
+            self.solver_path = "exact"
+            return vector
+        return None
     
-    def _lcm_multiple(self, numbers: List[int]) -> int:
-        """LCM of multiple numbers."""
-        result = numbers[0]
-        for num in numbers[1:]:
-            result = self._lcm(result, num)
-        return result
+    def describe_reaction(self, vector: List[int]) -> Dict[str, Dict[str, int]]:
+        """
+        A null space vector as a reaction: species with a negative entry move
+        to the other side, species with a zero entry are left out.
+        """
+        reaction = {"reactants": {}, "products": {}}
+        for col, (value, formula) in enumerate(zip(vector, self.reactants + self.products)):
+            if value:
+                on_reactant_side = (col < len(self.reactants)) == (value > 0)
+                reaction["reactants" if on_reactant_side else "products"][formula.formula] = abs(value)
+        return reaction
     
     def generate_steps(self, coefficients: List[int]) -> List[str]:
         """Generate step-by-step solution."""
@@ -217,15 +595,8 @@ class EquationBalancer:
         steps.append(f"   Elements found: {', '.join(self.all_elements)}")
         
         steps.append("Step 2: Count atoms on each side")
-        for element in self.all_elements:
-            reactant_count = sum(
-                coeff * formula.get_elements().get(element, 0)
-                for coeff, formula in zip(coefficients[:len(self.reactants)], self.reactants)
-            )
-            product_count = sum(
-                coeff * formula.get_elements().get(element, 0)
-                for coeff, formula in zip(coefficients[len(self.reactants):], self.products)
-            )
+        reactant_totals, product_totals = self.count_atoms(coefficients)
+        for element, reactant_count, product_count in zip(self.all_elements, reactant_totals, product_totals):
             steps.append(f"   {element}: Reactants = {reactant_count}, Products = {product_count}")
         
         steps.append("Step 3: Apply coefficients to balance atoms")
@@ -266,54 +637,233 @@ class EquationBalancer:
         """Main method to balance the equation."""
         if not self.parse_equation():
             return {
-                "error": "Invalid equation format. Please use → or -> to separate reactants and products."
+                "error": INVALID_FORMAT_ERROR
             }
         
-        coefficients = self.solve_balance()
+        return self.balance_parsed()
+    
+    def balance_parsed(self, include_steps: bool = True) -> Dict:
+        """Solve and report an equation that has already been parsed."""
+        try:
+            coefficients = self.solve_balance()
+        except SolverBudgetExceeded:
+            # Not a property of the equation, so never cached (see save_entry)
+            return {
+                "error": f"The equation is too large to balance within {config.SOLVER_TIME_BUDGET_MS} ms.",
+                "budget_exceeded": True
+            }
         
         if coefficients is None:
+            if self.independent_reactions:
+                return {
+                    "error": (f"Could not balance the equation: it combines {len(self.independent_reactions)} "
+                              "independent reactions, and no combination gives every species a positive coefficient."),
+                    "independent_reactions": self.independent_reactions
+                }
             return {
                 "error": "Could not balance the equation. Please check the equation format."
             }
         
+        return self.build_result(coefficients, include_steps)
+    
+    def build_result(self, coefficients: List[int], include_steps: bool = True) -> Dict:
+        """
+        Verify the coefficients and build the response. The steps and the
+        explanation are only generated when include_steps is set.
+        """
         # Verify the balance
-        for element in self.all_elements:
-            reactant_count = sum(
-                coeff * formula.get_elements().get(element, 0)
-                for coeff, formula in zip(coefficients[:len(self.reactants)], self.reactants)
-            )
-            product_count = sum(
-                coeff * formula.get_elements().get(element, 0)
-                for coeff, formula in zip(coefficients[len(self.reactants):], self.products)
-            )
+        reactant_totals, product_totals = self.count_atoms(coefficients)
+        for element, reactant_count, product_count in zip(self.all_elements, reactant_totals, product_totals):
             if reactant_count != product_count:
                 return {
                     "error": f"Balancing failed. {element} atoms don't match: {reactant_count} ≠ {product_count}"
                 }
         
-        balanced_eq = self.format_balanced_equation(coefficients)
-        steps = self.generate_steps(coefficients)
-        
-        explanation = f"The equation has been balanced. All {len(self.all_elements)} elements are now balanced on both sides."
-        
-        return {
+        result = {
             "equation": self.original_equation,
-            "balanced_equation": balanced_eq,
-            "steps": steps,
-            "explanation": explanation,
-            "coefficients": {
-                "reactants": dict(zip([f.formula for f in self.reactants], coefficients[:len(self.reactants)])),
-                "products": dict(zip([f.formula for f in self.products], coefficients[len(self.reactants):]))
-            }
+            "balanced_equation": self.format_balanced_equation(coefficients)
         }
+        if include_steps:
+            result["steps"] = self.generate_steps(coefficients)
+            result["explanation"] = (f"The equation has been balanced. All {len(self.all_elements)} "
+                                     "elements are now balanced on both sides.")
+        result["coefficients"] = {
+            "reactants": dict(zip([f.formula for f in self.reactants], coefficients[:len(self.reactants)])),
+            "products": dict(zip([f.formula for f in self.products], coefficients[len(self.reactants):]))
+        }
+        result["solver"] = {
+            "method": self.solver_path,
+            "rank": self.rank,
+            "nullity": self.nullity,
+            **({"independent_reactions": self.independent_reactions} if self.independent_reactions else {})
+        }
+        return result
+    
+    def canonical_key(self) -> Optional[str]:
+        """Cache key of the parsed equation (see canonical_equation)."""
+        return canonical_equation([f.formula for f in self.reactants], [f.formula for f in self.products])
+    
+    def cache_entry(self, result: Dict) -> Dict:
+        """Order-independent part of a result, suitable for the equation cache."""
+        if "error" in result:
+            return {name: result[name] for name in ("error", "independent_reactions", "budget_exceeded") if name in result}
+        return {
+            "coefficients": {side: dict(coeffs) for side, coeffs in result["coefficients"].items()},
+            "solver": dict(result["solver"])
+        }
+    
+    def result_from_cache(self, entry: Dict, include_steps: bool = True) -> Dict:
+        """Rebuild a full result for this equation's species order from a cache entry."""
+        if "error" in entry:
+            return dict(entry)
+        coefficients = (
+            [entry["coefficients"]["reactants"][f.formula] for f in self.reactants] +
+            [entry["coefficients"]["products"][f.formula] for f in self.products]
+        )
+        self.solver_path = entry["solver"]["method"]
+        self.rank = entry["solver"]["rank"]
+        self.nullity = entry["solver"]["nullity"]
+        self.independent_reactions = entry["solver"].get("independent_reactions")
+        return self.build_result(coefficients, include_steps)
+
+
+# Results of recent equations, keyed by canonical_equation()
+EQUATION_CACHE_SIZE = 4096
+EQUATION_CACHE_TTL = 3600.0
+equation_cache = TTLCache(maxsize=EQUATION_CACHE_SIZE, ttl=EQUATION_CACHE_TTL)
+
+# Bump when the balancer can produce different results for the same
+# equation, so persisted results from older versions are discarded
+SOLVER_VERSION = "3"
+
+# Optional on-disk store shared by all worker processes (see result_store)
+result_store = (
+    ResultStore(config.RESULT_STORE_PATH, f"solver-{SOLVER_VERSION}", config.RESULT_STORE_MAX_ENTRIES)
+    if config.RESULT_STORE_PATH else None
+)
+
+
+# Precomputed common reactions, memory-mapped (see reaction_index)
+reaction_index = ReactionIndex.open(config.REACTION_INDEX_PATH, SOLVER_VERSION)
+
+
+def lookup_entry(key: str, shared: bool = True) -> Optional[Dict]:
+    """
+    Cache entry for a canonical key from memory, the reaction index, then
+    the shared store. With shared=False the store (a SQLite read that can
+    wait on other processes' writes) is skipped, for the event loop.
+    """
+    entry = equation_cache.get(key)
+    if entry is not None:
+        return entry
+    if reaction_index is not None:
+        entry = reaction_index.get(key)
+    if entry is None and shared and result_store is not None:
+        entry = result_store.get("equation", key)
+    if entry is not None:
+        equation_cache.set(key, entry)
+    return entry
+
+
+def save_entry(key: str, entry: Dict) -> None:
+    """Cache an entry in memory and the shared store; a run out of time budget is not kept."""
+    if entry.get("budget_exceeded"):
+        return
+    equation_cache.set(key, entry)
+    if result_store is not None:
+        result_store.set("equation", key, entry)
+
+
+def split_ocr_coefficient(term: str) -> Tuple[str, str]:
+    """
+    Split an OCR-read term into its coefficient and species. A term read
+    as digits only is an O-leading species with its O misread as 0 (and
+    maybe a coefficient in front): "202" is 2 O2, "03" is O3.
+    """
+    match = _LEADING_COEFFICIENT.match(term)
+    coefficient = match.group(0) if match else ""
+    if coefficient == term and "0" in term:
+        coefficient = term[:term.rindex("0")]
+    return coefficient, term[len(coefficient):]
 
 
-def balance_equation(equation: str) -> Dict:
-    """Main function to balance a chemical equation."""
+def snap_to_known_reaction(equation: str) -> Optional[str]:
+    """
+    The equation with its species replaced by those of the indexed reaction
+    that matches it up to OCR confusions (e.g. "C + O2 → C02" becomes
+    "C + O2 → CO2", "CH4 + 202 → ..." becomes "CH4 + 2O2 → ...").
+    Coefficients and order are kept. None if no indexed reaction matches.
+    """
+    if reaction_index is None:
+        return None
+    sides = split_equation(equation, keep_coefficients=True)
+    if sides is None:
+        return None
+    reactants, products = ([split_ocr_coefficient(term) for term in side] for side in sides)
+    signature = canonical_equation([ocr_signature(f) for _, f in reactants], [ocr_signature(f) for _, f in products])
+    found = reaction_index.find_signature(signature) if signature else None
+    if found is None:
+        return None
+    _, entry = found
+    known = {ocr_signature(f): f for side in entry["coefficients"].values() for f in side}
+    
+    def snap(term: Tuple[str, str]) -> str:
+        coefficient, species = term
+        return coefficient + known[ocr_signature(species)]
+    
+    return f"{' + '.join(map(snap, reactants))} → {' + '.join(map(snap, products))}"
+
+
+def warm_equation_cache(limit: int) -> int:
+    """Load the most recently used stored results into memory; returns how many."""
+    if result_store is None:
+        return 0
+    entries = result_store.recent("equation", limit)
+    for key, entry in entries:
+        equation_cache.set(key, entry)
+    return len(entries)
+
+
+def balance_equation(equation: str, include_steps: bool = True) -> Dict:
+    """Main function to balance a chemical equation; see build_result for include_steps."""
     try:
         balancer = EquationBalancer(equation)
-        return balancer.balance()
+        if not balancer.parse_equation():
+            return {
+                "error": INVALID_FORMAT_ERROR
+            }
+        
+        key = balancer.canonical_key()
+        if key is None:
+            return balancer.balance_parsed(include_steps)
+        
+        entry = lookup_entry(key)
+        if entry is not None:
+            return balancer.result_from_cache(entry, include_steps)
+        
+        result = balancer.balance_parsed(include_steps)
+        save_entry(key, balancer.cache_entry(result))
+        return result
     except Exception as e:
         return {
             "error": f"Error balancing equation: {str(e)}"
         }
+
+
+def solve_for_cache(balancer: EquationBalancer, key: str) -> Dict:
+    """
+    Look a parsed equation up in the shared store, or solve it and cache
+    its order-independent result (see cache_entry). Blocking; used from
+    worker threads after lookup_entry(key, shared=False) missed.
+    """
+    entry = lookup_entry(key)
+    if entry is not None:
+        return entry
+    entry = balancer.cache_entry(balancer.balance_parsed(include_steps=False))
+    save_entry(key, entry)
+    return entry
+
+
+def balance_equations(equations: List[str], include_steps: bool = True) -> List[Dict]:
+    """Balance several equations; used for batch requests and worker processes."""
+    return [balance_equation(equation, include_steps) for equation in equations]
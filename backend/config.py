@@ -0,0 +1,126 @@
+"""
+Runtime settings for the PhotoChem API.
+Every value can be overridden with a PHOTOCHEM_* environment variable.
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Batch balancing (/api/solve-equations)
+MAX_BATCH_SIZE = _env_int("PHOTOCHEM_MAX_BATCH_SIZE", 200)
+MAX_EQUATION_LENGTH = _env_int("PHOTOCHEM_MAX_EQUATION_LENGTH", 500)
+BATCH_INLINE_THRESHOLD = _env_int("PHOTOCHEM_BATCH_INLINE_THRESHOLD", 16)
+BATCH_CHUNK_SIZE = _env_int("PHOTOCHEM_BATCH_CHUNK_SIZE", 16)
+BATCH_WORKERS = _env_int("PHOTOCHEM_BATCH_WORKERS", os.cpu_count() or 2)
+
+# OCR worker pool; uploads beyond workers + queue are rejected with 503
+OCR_WORKERS = _env_int("PHOTOCHEM_OCR_WORKERS", 2)
+OCR_MAX_QUEUE = _env_int("PHOTOCHEM_OCR_MAX_QUEUE", 8)
+
+# OCR engine: "auto" prefers the in-process tesserocr engine over pytesseract
+OCR_BACKEND = os.environ.get("PHOTOCHEM_OCR_BACKEND", "auto").strip().lower()
+
+# OCR strategy: "confidence" reads once with word confidences and re-reads
+# only weak words (crop by crop with tesserocr, else one full pass);
+# "legacy" retries the whole image without the whitelist
+OCR_MODE = os.environ.get("PHOTOCHEM_OCR_MODE", "confidence").strip().lower()
+OCR_MIN_CONFIDENCE = _env_int("PHOTOCHEM_OCR_MIN_CONFIDENCE", 60)
+OCR_MAX_RESCAN_REGIONS = _env_int("PHOTOCHEM_OCR_MAX_RESCAN_REGIONS", 6)
+
+# Image uploads: larger uploads are rejected with 413; larger images are
+# decoded/downscaled so their longest side is about OCR_MAX_DIMENSION pixels
+MAX_UPLOAD_BYTES = _env_int("PHOTOCHEM_MAX_UPLOAD_BYTES", 15 * 1024 * 1024)
+OCR_MAX_DIMENSION = _env_int("PHOTOCHEM_OCR_MAX_DIMENSION", 2000)
+
+# /api/process-image result cache, bounded by the approximate size of the
+# cached results. Near-duplicate lookup by perceptual hash is opt-in and
+# compares only the IMAGE_CACHE_MAX_SCAN most recently used images.
+IMAGE_CACHE_MAX_BYTES = _env_int("PHOTOCHEM_IMAGE_CACHE_MAX_BYTES", 8 * 1024 * 1024)
+IMAGE_CACHE_PERCEPTUAL = _env_bool("PHOTOCHEM_IMAGE_CACHE_PERCEPTUAL", False)
+IMAGE_CACHE_MAX_DISTANCE = _env_int("PHOTOCHEM_IMAGE_CACHE_MAX_DISTANCE", 4)
+IMAGE_CACHE_MAX_SCAN = _env_int("PHOTOCHEM_IMAGE_CACHE_MAX_SCAN", 256)
+
+# Per-stage timing histograms at /metrics and Server-Timing response headers
+METRICS_ENABLED = _env_bool("PHOTOCHEM_METRICS_ENABLED", True)
+
+# Balance a few equations and start an OCR engine on every OCR worker
+# thread before /api/ready reports ready
+WARMUP_ON_STARTUP = _env_bool("PHOTOCHEM_WARMUP_ON_STARTUP", False)
+
+# Background image jobs (/api/jobs): finished jobs are kept for JOB_TTL
+# seconds, and at most JOB_STORE_SIZE jobs are held at once. Unfinished jobs
+# keep their uploads; together these may take at most JOB_MAX_PENDING_BYTES.
+JOB_STORE_SIZE = _env_int("PHOTOCHEM_JOB_STORE_SIZE", 256)
+JOB_MAX_PENDING_BYTES = _env_int("PHOTOCHEM_JOB_MAX_PENDING_BYTES", 128 * 1024 * 1024)
+JOB_TTL = float(os.environ.get("PHOTOCHEM_JOB_TTL", "600"))
+
+# Live camera WebSocket: an equation is sent once it has been read from
+# CAMERA_STABLE_FRAMES frames in a row; frames whose perceptual hash is
+# within CAMERA_SKIP_DISTANCE bits of the last scanned frame are not OCRed
+CAMERA_STABLE_FRAMES = _env_int("PHOTOCHEM_CAMERA_STABLE_FRAMES", 3)
+CAMERA_SKIP_DISTANCE = _env_int("PHOTOCHEM_CAMERA_SKIP_DISTANCE", 2)
+CAMERA_MAX_FRAME_BYTES = _env_int("PHOTOCHEM_CAMERA_MAX_FRAME_BYTES", 1024 * 1024)
+
+# Worksheet mode (/api/process-worksheet): at most this many text lines
+# of a page are OCRed
+WORKSHEET_MAX_LINES = _env_int("PHOTOCHEM_WORKSHEET_MAX_LINES", 60)
+
+# Optional SQLite file shared by all worker processes on a host, holding
+# balanced equations and OCR results across restarts. Empty disables it.
+RESULT_STORE_PATH = os.environ.get("PHOTOCHEM_RESULT_STORE_PATH", "").strip()
+RESULT_STORE_MAX_ENTRIES = _env_int("PHOTOCHEM_RESULT_STORE_MAX_ENTRIES", 100_000)
+# Most recently used stored equations loaded into memory at startup
+RESULT_STORE_WARM_ENTRIES = _env_int("PHOTOCHEM_RESULT_STORE_WARM_ENTRIES", 2000)
+
+# Precomputed reaction index (build with: python reaction_index.py);
+# balancing and OCR equation detection use it when the file exists
+REACTION_INDEX_PATH = os.environ.get(
+    "PHOTOCHEM_REACTION_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reactions.idx")
+)
+
+# Live-solve WebSocket: a revision is solved once no newer one has arrived
+# for this long; sessions forget their parsed species beyond the limit
+LIVE_DEBOUNCE_MS = _env_int("PHOTOCHEM_LIVE_DEBOUNCE_MS", 150)
+LIVE_MAX_SPECIES = _env_int("PHOTOCHEM_LIVE_MAX_SPECIES", 256)
+
+# Balancing: time budget per equation; the lattice search for equations
+# with several independent reactions tries weights up to this bound; at
+# this many species the exact solver uses sparse rows
+SOLVER_TIME_BUDGET_MS = _env_int("PHOTOCHEM_SOLVER_TIME_BUDGET_MS", 250)
+LATTICE_SEARCH_BOUND = _env_int("PHOTOCHEM_LATTICE_SEARCH_BOUND", 8)
+SPARSE_SOLVER_MIN_SPECIES = _env_int("PHOTOCHEM_SPARSE_SOLVER_MIN_SPECIES", 24)
+
+# Stoichiometry (/api/stoichiometry): quantity sets accepted per request
+STOICHIOMETRY_MAX_SCENARIOS = _env_int("PHOTOCHEM_STOICHIOMETRY_MAX_SCENARIOS", 1000)
+
+# Responses: JSON bodies of at least this many bytes are compressed (br or
+# gzip); successful solve results may be cached by clients this long
+COMPRESS_MIN_BYTES = _env_int("PHOTOCHEM_COMPRESS_MIN_BYTES", 1024)
+SOLVE_CACHE_MAX_AGE = _env_int("PHOTOCHEM_SOLVE_CACHE_MAX_AGE", 86400)
+
+# Per-request profiling, off unless a sample rate or a token is set. A
+# fraction PROFILE_SAMPLE_RATE of requests, and requests sending the token
+# in X-Profile-Token, are profiled ("cprofile", or "pyinstrument" if it is
+# installed); the newest PROFILE_MAX_FILES profiles are kept in PROFILE_DIR
+PROFILE_SAMPLE_RATE = float(os.environ.get("PHOTOCHEM_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.environ.get("PHOTOCHEM_PROFILE_TOKEN", "").strip()
+PROFILER = os.environ.get("PHOTOCHEM_PROFILER", "cprofile").strip().lower()
+PROFILE_DIR = os.environ.get(
+    "PHOTOCHEM_PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+)
+PROFILE_MAX_FILES = _env_int("PHOTOCHEM_PROFILE_MAX_FILES", 100)
+# Requests kept for /api/debug/slow-requests while profiling is enabled
+PROFILE_RECENT_REQUESTS = _env_int("PHOTOCHEM_PROFILE_RECENT_REQUESTS", 1000)
@@ -0,0 +1,173 @@
+"""
+Single-pass scanner that finds chemical equations in OCR text.
+
+The text is split into tokens (formulas, numbers, plus signs, arrows and
+noise) in one left-to-right pass, and a small state machine assembles the
+tokens into equations. Every character is looked at a constant number of
+times, so the worst case is linear in the length of the text.
+"""
+from typing import Iterator, List, Optional, Tuple
+
+# Token kinds
+FORMULA = "formula"
+NUMBER = "number"
+PLUS = "plus"
+ARROW = "arrow"
+NOISE = "noise"
+
+# Single characters and words that OCR output uses as reaction arrows
+ARROW_CHARS = {"→", "⟶", "⇒", "➔", "➝", "⇌", "⇄"}
+ARROW_WORDS = {"arrow", "yields", "gives"}
+# Dash-like characters that, followed by ">", form an arrow
+DASH_CHARS = {"-", "—", "–", "="}
+
+SUBSCRIPT_DIGITS = {chr(0x2080 + d): str(d) for d in range(10)}
+
+_FORMULA_CHARS = set("()[]")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and (ch.isalnum() or ch in _FORMULA_CHARS) or ch in SUBSCRIPT_DIGITS
+
+
+def _classify_word(word: str) -> str:
+    """Classify a run of letters, digits and brackets."""
+    if word.isdigit():
+        return NUMBER
+    if word.lower() in ARROW_WORDS:
+        return ARROW
+
+    # Optional coefficient, then elements (capital + optional lowercase)
+    # and brackets, each optionally followed by a count
+    i = 0
+    while i < len(word) and word[i].isdigit():
+        i += 1
+    if i == len(word):
+        return NUMBER
+    seen_element = False
+    previous_capital = False
+    depth = 0
+    for ch in word[i:]:
+        if ch.isupper():
+            seen_element = True
+            previous_capital = True
+            continue
+        if ch.islower():
+            if not previous_capital:
+                return NOISE
+        elif ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+            if depth < 0:
+                return NOISE
+        previous_capital = False
+    return FORMULA if seen_element and depth == 0 else NOISE
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, str]]:
+    """Yield (kind, text) tokens; whitespace only separates tokens."""
+    n = len(text)
+    i = 0
+    while i < n:
+        ch = text[i]
+        if ch.isspace():
+            i += 1
+        elif _is_word_char(ch):
+            start = i
+            while i < n and _is_word_char(text[i]):
+                i += 1
+            word = "".join(SUBSCRIPT_DIGITS.get(c, c) for c in text[start:i])
+            yield _classify_word(word), word
+        elif ch == "+":
+            i += 1
+            yield PLUS, ch
+        elif ch in ARROW_CHARS:
+            i += 1
+            yield ARROW, ch
+        elif ch in DASH_CHARS or (ch == "<" and i + 1 < n and text[i + 1] in DASH_CHARS):
+            # "->", "=>", "-->", "<=>", "=" ...
+            start = i
+            i += 1
+            while i < n and text[i] in DASH_CHARS:
+                i += 1
+            if i < n and text[i] == ">":
+                i += 1
+                yield ARROW, text[start:i]
+            elif text[start:i] == "=":
+                yield ARROW, "="
+            else:
+                yield NOISE, text[start:i]
+        else:
+            i += 1
+            yield NOISE, ch
+
+
+def _format(reactants: List[str], products: List[str]) -> str:
+    return f"{' + '.join(reactants)} → {' + '.join(products)}"
+
+
+def extract_equations(text: str) -> List[str]:
+    """
+    Return every equation found in the text, in order, with a normalized
+    arrow and " + " separators. Formulas split by OCR whitespace, such as
+    "H 2 O", are joined back together.
+    """
+    equations = []
+    reactants: Optional[List[str]] = None  # completed left side, once an arrow is seen
+    side: List[str] = []                   # terms of the side being read
+    term: List[str] = []                   # fragments of the term being read
+    term_has_formula = False
+    last_kind = None
+
+    def finish_term() -> bool:
+        nonlocal term, term_has_formula
+        text = "".join(term)
+        # A lone number with a 0 may be an O-leading species misread by
+        # OCR ("02", "202"); it is kept for the reaction index to correct
+        ok = term_has_formula or (len(term) == 1 and "0" in text)
+        if ok:
+            side.append(text)
+        term, term_has_formula = [], False
+        return ok
+
+    def emit_and_reset() -> None:
+        nonlocal reactants, side
+        # Arithmetic ("10 + 20 = 30") is not an equation
+        if reactants and side and not all(t.isdigit() for t in reactants + side):
+            equations.append(_format(reactants, side))
+        reactants, side = None, []
+
+    for kind, value in tokenize(text):
+        if kind in (FORMULA, NUMBER):
+            # A new formula right after a finished one (no "+" between) starts over;
+            # numbers and fragments after a split-off number are joined ("H 2 O")
+            if kind == FORMULA and term_has_formula and last_kind == FORMULA:
+                finish_term()
+                emit_and_reset()
+            term.append(value)
+            term_has_formula = term_has_formula or kind == FORMULA
+        elif kind == PLUS:
+            if not finish_term():
+                reactants, side = None, []
+        elif kind == ARROW:
+            if finish_term():
+                if reactants is not None:
+                    # A second arrow: close this equation and chain from its products
+                    products = side
+                    emit_and_reset()
+                    reactants = products
+                else:
+                    reactants, side = side, []
+            else:
+                reactants, side = None, []
+        else:
+            if finish_term():
+                emit_and_reset()
+            else:
+                reactants, side = None, []
+        last_kind = kind
+
+    if finish_term():
+        emit_and_reset()
+    return equations
@@ -0,0 +1,175 @@
+"""
+In-memory store for background image jobs.
+
+A job records the pipeline stages it has passed through as events, so
+clients can poll its status or follow the events as they happen. Finished
+jobs expire after a time-to-live; the store never holds more than
+max_jobs jobs, and unfinished jobs never hold more than max_pending_bytes
+of uploads between them. All methods are called from the event loop.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobStoreFullError(Exception):
+    """Raised when unfinished jobs take every slot or the upload byte budget."""
+
+
+class Job:
+    def __init__(self, idempotency_key: Optional[Hashable] = None, upload_bytes: int = 0):
+        self.id = uuid.uuid4().hex
+        self.idempotency_key = idempotency_key
+        # Size of the upload the job keeps until it finishes
+        self.upload_bytes = upload_bytes
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.events: List[Dict[str, Any]] = []
+        self.task: Optional[asyncio.Task] = None
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def emit(self, stage: str, data: Optional[Dict] = None) -> None:
+        """Record a pipeline stage and pass it on to subscribers."""
+        self.stage = stage
+        self.updated_at = time.time()
+        event = {"stage": stage, "time": self.updated_at, **(data or {})}
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def start(self) -> None:
+        self.status = RUNNING
+        self.updated_at = time.time()
+
+    def finish(self, result: Dict) -> None:
+        self.status = DONE
+        self.result = result
+        self.emit(DONE)
+
+    def fail(self, error: str) -> None:
+        self.status = FAILED
+        self.error = error
+        self.emit(FAILED, {"error": error})
+
+    def subscribe(self) -> Tuple[List[Dict], asyncio.Queue]:
+        """Events so far plus a queue that receives the ones still to come."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return list(self.events), queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "events": self.events,
+        }
+        if self.status == DONE:
+            data["result"] = self.result
+        elif self.status == FAILED:
+            data["error"] = self.error
+        return data
+
+
+class JobStore:
+    def __init__(self, max_jobs: int, ttl: float, max_pending_bytes: Optional[int] = None):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.max_pending_bytes = max_pending_bytes
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: Dict[Hashable, str] = {}
+        self.created = 0
+        self.reused = 0
+        self.expired = 0
+
+    def _remove(self, job: Job) -> None:
+        del self._jobs[job.id]
+        if job.idempotency_key is not None and self._by_key.get(job.idempotency_key) == job.id:
+            del self._by_key[job.idempotency_key]
+
+    def purge_expired(self) -> None:
+        cutoff = time.time() - self.ttl
+        for job in [job for job in self._jobs.values() if job.finished and job.updated_at < cutoff]:
+            self._remove(job)
+            self.expired += 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.purge_expired()
+        return self._jobs.get(job_id)
+
+    def pending_bytes(self) -> int:
+        """Upload bytes held by jobs that have not finished."""
+        return sum(job.upload_bytes for job in self._jobs.values() if not job.finished)
+
+    def create(self, idempotency_key: Optional[Hashable] = None, upload_bytes: int = 0) -> Tuple[Job, bool]:
+        """
+        Return (job, created). A key that belongs to a live job that has not
+        failed returns that job instead of a new one; a failed job's key
+        starts a new job.
+        """
+        self.purge_expired()
+        if idempotency_key is not None:
+            existing_id = self._by_key.get(idempotency_key)
+            if existing_id is not None and self._jobs[existing_id].status != FAILED:
+                self.reused += 1
+                return self._jobs[existing_id], False
+
+        if self.max_pending_bytes is not None and self.pending_bytes() + upload_bytes > self.max_pending_bytes:
+            raise JobStoreFullError("Too many uploads waiting to be processed")
+
+        if len(self._jobs) >= self.max_jobs:
+            # Make room by dropping the oldest finished job
+            oldest = next((job for job in self._jobs.values() if job.finished), None)
+            if oldest is None:
+                raise JobStoreFullError("Too many jobs in progress")
+            self._remove(oldest)
+            self.expired += 1
+
+        job = Job(idempotency_key, upload_bytes)
+        self._jobs[job.id] = job
+        if idempotency_key is not None:
+            self._by_key[idempotency_key] = job.id
+        self.created += 1
+        return job, True
+
+    def cancel_all(self) -> None:
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "jobs": len(self._jobs),
+            "max_jobs": self.max_jobs,
+            "ttl_seconds": self.ttl,
+            "pending_bytes": self.pending_bytes(),
+            "max_pending_bytes": self.max_pending_bytes,
+            "by_status": statuses,
+            "created": self.created,
+            "reused": self.reused,
+            "expired": self.expired,
+        }
@@ -0,0 +1,193 @@
+"""
+Lightweight request and pipeline metrics in Prometheus text format.
+
+Stages are timed with `with stage("ocr"):`. Each measurement goes into a
+histogram and, while a request is being served, into that request's
+Server-Timing list. When metrics are disabled, stage() returns a shared
+no-op context manager, so instrumented code costs one function call.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+
+ENABLED = config.METRICS_ENABLED
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, seconds) pairs recorded while serving the current request
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = \
+    contextvars.ContextVar("request_timings", default=None)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], List[str]]] = []
+_NOOP = nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label: str):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label: str):
+        super().__init__(name, help_text, label)
+        self._values: Dict[str, float] = {}
+
+    def inc(self, label_value: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return format_samples(self.name, self.kind, self.help_text, self.label, values)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, label_value: str, amount: float = 1) -> None:
+        self.inc(label_value, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label)
+        self.buckets = buckets
+        # label value -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[str, list] = {}
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(series.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+def format_samples(name: str, kind: str, help_text: str, label: str, values: Dict[str, float]) -> List[str]:
+    """Render one labelled counter or gauge family."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for label_value, value in sorted(values.items()):
+        lines.append(f'{name}{{{label}="{_escape(str(label_value))}"}} {value}')
+    return lines
+
+
+def add_collector(collect: Callable[[], List[str]]) -> None:
+    """Register a function returning extra exposition lines (e.g. cache stats)."""
+    _collectors.append(collect)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("photochem_stage_seconds", "Time spent in each pipeline stage.", "stage")
+SOLVER_SECONDS = Histogram("photochem_solver_seconds", "Time spent in each equation balancer path.", "path")
+REQUEST_SECONDS = Histogram("photochem_request_seconds", "Request latency by route.", "route")
+REQUESTS_IN_FLIGHT = Gauge("photochem_requests_in_flight", "Requests currently being served.", "route")
+ERRORS = Counter("photochem_errors_total", "Failed requests by error type.", "type")
+
+
+class _Timer:
+    __slots__ = ("histogram", "label", "timing_name", "start")
+
+    def __init__(self, histogram: Histogram, label: str, timing_name: str):
+        self.histogram = histogram
+        self.label = label
+        self.timing_name = timing_name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.label, elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.timing_name, elapsed))
+        return False
+
+
+def stage(name: str):
+    """Time a pipeline stage (upload_read, decode, ocr, balance, ...)."""
+    if not ENABLED:
+        return _NOOP
+    return _Timer(STAGE_SECONDS, name, name)
+
+
+def solver_path(name: str):
+    """Time one balancer path (exact, lattice)."""
+    if not ENABLED:
+        return _NOOP
+    return _Timer(SOLVER_SECONDS, name, f"solver_{name}")
+
+
+def start_request() -> contextvars.Token:
+    """Begin collecting stage timings for the current request."""
+    return _request_timings.set([])
+
+
+def current_timings() -> List[Tuple[str, float]]:
+    """Stage timings recorded so far for the current request."""
+    return list(_request_timings.get() or [])
+
+
+def finish_request(token: contextvars.Token) -> List[Tuple[str, float]]:
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """Format timings as a Server-Timing header value (durations in ms)."""
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
@@ -0,0 +1,230 @@
+"""
+Opt-in per-request profiling.
+
+Profiling is enabled by PHOTOCHEM_PROFILE_SAMPLE_RATE (a fraction of all
+requests) or PHOTOCHEM_PROFILE_TOKEN (requests whose X-Profile-Token
+header matches). A profiled request runs under cProfile, or pyinstrument
+when PHOTOCHEM_PROFILER=pyinstrument and it is installed. Work it hands to
+worker threads through call() is profiled with cProfile in that thread
+and added to the request's profile. Each profile is written next to a
+JSON file with the request's route, status, duration and stage timings;
+the directory keeps the newest PHOTOCHEM_PROFILE_MAX_FILES profiles.
+
+From Python 3.12 cProfile is built on sys.monitoring, which allows one
+profiler per interpreter and sees every thread, so worker threads are
+covered by the request's profiler rather than profiled separately. Work
+is run unprofiled when a thread profiler cannot start because another
+profiling tool is active.
+
+Only one request is profiled at a time, and the event loop profile also
+sees other requests served meanwhile. While profiling is enabled every
+request's duration and stage timings are kept in a bounded list, so the
+slowest recent requests can be looked up.
+"""
+import contextvars
+import cProfile
+import glob
+import hmac
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import config
+
+ENABLED = config.PROFILE_SAMPLE_RATE > 0 or bool(config.PROFILE_TOKEN)
+
+TOKEN_HEADER = "X-Profile-Token"
+
+# The profile of the request being served, seen by its worker threads too
+_active: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("profile", default=None)
+
+# Set while a request is profiled; the event loop thread has one profiler
+_busy = False
+
+
+def _pyinstrument_available() -> bool:
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+PROFILER = "pyinstrument" if config.PROFILER == "pyinstrument" and _pyinstrument_available() else "cprofile"
+
+# One interpreter-wide cProfile that already sees worker threads (3.12+)
+SHARED_CPROFILE = PROFILER == "cprofile" and sys.version_info >= (3, 12)
+
+
+def token_matches(token: Optional[str]) -> bool:
+    return bool(config.PROFILE_TOKEN) and token is not None and \
+        hmac.compare_digest(token.encode(), config.PROFILE_TOKEN.encode())
+
+
+def choose(token: Optional[str]) -> Optional[str]:
+    """Why a request should be profiled ("token" or "sampled"), or None."""
+    if token_matches(token):
+        return "token"
+    if config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+class RequestProfile:
+    def __init__(self, reason: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.reason = reason
+        self._threads: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._token: Optional[contextvars.Token] = None
+        if PROFILER == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler = Profiler(async_mode="enabled")
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        self._token = _active.set(self)
+        if PROFILER == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if PROFILER == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+        _active.reset(self._token)
+
+    def add_thread(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            self._threads.append(profile)
+
+    def save(self, record: Dict[str, Any]) -> List[str]:
+        """Write the profile and its metadata; returns the file names."""
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        base = os.path.join(config.PROFILE_DIR, self.id)
+        files = []
+        if PROFILER == "pyinstrument":
+            with open(f"{base}.html", "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+            files.append(f"{self.id}.html")
+            profiles = self._threads
+            name = f"{self.id}.threads.prof"
+        else:
+            profiles = [self._profiler] + self._threads
+            name = f"{self.id}.prof"
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(os.path.join(config.PROFILE_DIR, name))
+            files.append(name)
+        record = {**record, "profile_id": self.id, "reason": self.reason, "profiler": PROFILER, "files": files}
+        # Metadata last: rotation counts profiles by their .json files
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        rotate(config.PROFILE_DIR, config.PROFILE_MAX_FILES)
+        return files
+
+
+def begin(reason: str) -> Optional[RequestProfile]:
+    """Start profiling the current request, unless another one is being profiled."""
+    global _busy
+    if _busy:
+        counts["skipped_busy"] += 1
+        return None
+    _busy = True
+    started = False
+    try:
+        profile = RequestProfile(reason)
+        profile.start()
+        started = True
+    except ValueError:
+        # Another profiling tool (a debugger, coverage) is active
+        counts["unavailable"] += 1
+        return None
+    finally:
+        if not started:
+            _busy = False
+    counts[reason] += 1
+    return profile
+
+
+def end(profile: RequestProfile) -> None:
+    global _busy
+    profile.stop()
+    _busy = False
+
+
+def call(fn: Callable, *args: Any) -> Any:
+    """fn(*args), profiled if the calling request is; for work sent to worker threads."""
+    profile = _active.get()
+    if profile is None or SHARED_CPROFILE:
+        return fn(*args)
+    thread_profile = cProfile.Profile()
+    try:
+        thread_profile.enable()
+    except ValueError:
+        # "Another profiling tool is already active"
+        return fn(*args)
+    try:
+        return fn(*args)
+    finally:
+        thread_profile.disable()
+        profile.add_thread(thread_profile)
+
+
+def stage_totals_ms(timings: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Milliseconds per stage name; stages such as per-line OCR run several times."""
+    totals: Dict[str, float] = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return {name: round(seconds * 1000, 3) for name, seconds in totals.items()}
+
+
+def rotate(directory: str, keep: int) -> None:
+    """Delete the oldest profiles beyond the newest `keep`."""
+    records = sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime)
+    for path in records[:max(0, len(records) - keep)]:
+        stem = path[:-len(".json")]
+        for name in glob.glob(f"{glob.escape(stem)}.*"):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+
+class RecentRequests:
+    """Bounded list of recently served requests and their stage timings."""
+
+    def __init__(self, size: int):
+        self._records: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def slowest(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = list(self._records)
+        return sorted(records, key=lambda record: record["duration_ms"], reverse=True)[:limit]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+recent = RecentRequests(config.PROFILE_RECENT_REQUESTS)
+
+# Profiled requests by reason, and requests not profiled because another
+# was or because another profiling tool was active
+counts: Dict[str, int] = {"token": 0, "sampled": 0, "skipped_busy": 0, "unavailable": 0}
@@ -0,0 +1,229 @@
+"""
+Precomputed index of balanced reactions.
+
+The index is built offline from a reaction list (data/reactions.txt by
+default) and written as one binary file that is memory-mapped read-only,
+so every worker process shares the same pages instead of loading a copy.
+
+Layout: a header, two open-addressing hash tables of (64-bit hash, record
+offset) slots, and the records. The first table maps canonical equation
+keys (see chemistry_solver.canonical_equation) to records. The second
+maps OCR signatures, where the digit 0 and the letter O are not told
+apart, so readings like "C02" still find the reaction. Each record holds
+the key, its signature and the order-independent cache entry as JSON.
+
+Build the index from the backend folder:
+    python reaction_index.py [reactions.txt ...] [--output data/reactions.idx]
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"PCRIDX\0\0"
+FORMAT_VERSION = 1
+
+# magic, format version, solver version, reactions, key slots, signature slots
+HEADER = struct.Struct("<8sI16sIII")
+# key hash, record offset + 1 (0 marks an empty slot)
+SLOT = struct.Struct("<QI")
+LENGTH = struct.Struct("<I")
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reactions.txt")
+
+
+def ocr_signature(formula: str) -> str:
+    """A formula with the OCR confusions 0/O and stray spaces folded together."""
+    return formula.replace(" ", "").replace("0", "O")
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def _table_size(count: int) -> int:
+    """Power of two keeping the load factor at or below one half."""
+    size = 8
+    while size < 2 * count:
+        size *= 2
+    return size
+
+
+def _fill_table(items: List[Tuple[str, int]]) -> bytes:
+    size = _table_size(len(items))
+    slots: List[Tuple[int, int]] = [(0, 0)] * size
+    for text, offset in items:
+        h = _hash(text)
+        i = h & (size - 1)
+        while slots[i][1]:
+            i = (i + 1) & (size - 1)
+        slots[i] = (h, offset + 1)
+    return b"".join(SLOT.pack(h, offset) for h, offset in slots)
+
+
+def write_index(records: Iterable[Tuple[str, str, Dict]], path: str, solver_version: str) -> Dict[str, int]:
+    """Write (key, signature, cache entry) records to an index file."""
+    blob = bytearray()
+    keys: List[Tuple[str, int]] = []
+    signatures: Dict[str, Optional[int]] = {}
+    for key, signature, entry in records:
+        offset = len(blob)
+        data = "\t".join((key, signature, json.dumps(entry, separators=(",", ":")))).encode()
+        blob += LENGTH.pack(len(data)) + data
+        keys.append((key, offset))
+        # A signature shared by two reactions cannot be resolved; leave it out
+        if signature:
+            signatures[signature] = None if signature in signatures else offset
+    unique = [(signature, offset) for signature, offset in signatures.items() if offset is not None]
+
+    key_table = _fill_table(keys)
+    signature_table = _fill_table(unique)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, solver_version.encode(), len(keys),
+                         len(key_table) // SLOT.size, len(signature_table) // SLOT.size)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header + key_table + signature_table + blob)
+    os.replace(temporary, path)
+    return {"reactions": len(keys), "signatures": len(unique), "bytes": len(header) + len(key_table) +
+            len(signature_table) + len(blob)}
+
+
+class ReactionIndex:
+    """Read-only view of an index file; lookups are O(1) probes into the mapping."""
+
+    def __init__(self, path: str, mapping: mmap.mmap):
+        self.path = path
+        self._mm = mapping
+        _, _, solver, self.count, self._key_slots, self._signature_slots = HEADER.unpack_from(mapping, 0)
+        self.solver_version = solver.rstrip(b"\0").decode()
+        self._key_table = HEADER.size
+        self._signature_table = self._key_table + self._key_slots * SLOT.size
+        self._records = self._signature_table + self._signature_slots * SLOT.size
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.signature_hits = 0
+
+    @classmethod
+    def open(cls, path: str, solver_version: str) -> Optional["ReactionIndex"]:
+        """Map an index file; None if it is missing, invalid or built by another solver version."""
+        try:
+            with open(path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mapping) < HEADER.size:
+            mapping.close()
+            return None
+        magic, format_version, solver, *_ = HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION or solver.rstrip(b"\0").decode() != solver_version:
+            print(f"⚠️  Warning: ignoring reaction index {path} (wrong format or solver version, rebuild it)")
+            mapping.close()
+            return None
+        return cls(path, mapping)
+
+    def _record(self, offset: int) -> Tuple[str, str, str]:
+        start = self._records + offset
+        (length,) = LENGTH.unpack_from(self._mm, start)
+        key, signature, payload = self._mm[start + LENGTH.size:start + LENGTH.size + length].decode().split("\t", 2)
+        return key, signature, payload
+
+    def _probe(self, table: int, slots: int, text: str, field: int) -> Optional[Tuple[str, str, str]]:
+        h = _hash(text)
+        i = h & (slots - 1)
+        while True:
+            slot_hash, offset = SLOT.unpack_from(self._mm, table + i * SLOT.size)
+            if not offset:
+                return None
+            if slot_hash == h:
+                record = self._record(offset - 1)
+                if record[field] == text:
+                    return record
+            i = (i + 1) & (slots - 1)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cache entry for a canonical equation key."""
+        record = self._probe(self._key_table, self._key_slots, key, 0)
+        with self._lock:
+            if record is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(record[2])
+
+    def find_signature(self, signature: str) -> Optional[Tuple[str, Dict]]:
+        """(key, cache entry) of the reaction with this OCR signature."""
+        record = self._probe(self._signature_table, self._signature_slots, signature, 1)
+        if record is None:
+            return None
+        with self._lock:
+            self.signature_hits += 1
+        return record[0], json.loads(record[2])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "reactions": self.count,
+                "bytes": len(self._mm),
+                "hits": self.hits,
+                "misses": self.misses,
+                "signature_hits": self.signature_hits,
+            }
+
+
+def read_equations(paths: Iterable[str]) -> Iterable[str]:
+    """Equations from text files, one per line; blank lines and # comments are skipped."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+
+def build(paths: Iterable[str], output: str) -> Dict[str, int]:
+    """Balance every equation in the source files and write the index."""
+    from chemistry_solver import SOLVER_VERSION, EquationBalancer, canonical_equation
+
+    records = {}
+    failed = []
+    for equation in read_equations(paths):
+        balancer = EquationBalancer(equation)
+        key = balancer.canonical_key() if balancer.parse_equation() else None
+        result = balancer.balance_parsed(include_steps=False) if key is not None else {"error": "invalid"}
+        if "error" in result:
+            failed.append(equation)
+            continue
+        signature = canonical_equation([ocr_signature(f.formula) for f in balancer.reactants],
+                                       [ocr_signature(f.formula) for f in balancer.products])
+        records[key] = (key, signature or "", balancer.cache_entry(result))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    summary = write_index(records.values(), output, SOLVER_VERSION)
+    for equation in failed:
+        print(f"  skipped (could not balance): {equation}")
+    summary["skipped"] = len(failed)
+    return summary
+
+
+def main() -> None:
+    import argparse
+    import config
+
+    parser = argparse.ArgumentParser(description="Build the precomputed reaction index.")
+    parser.add_argument("sources", nargs="*", default=[DEFAULT_SOURCE], help="reaction list files")
+    parser.add_argument("--output", default=config.REACTION_INDEX_PATH, help="index file to write")
+    args = parser.parse_args()
+    summary = build(args.sources, args.output)
+    print(f"Wrote {args.output}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+HTTP response helpers: fast JSON rendering, compression of JSON bodies,
+and ETag / Cache-Control headers for deterministic results.
+"""
+import gzip
+import hashlib
+from typing import Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# orjson and brotli are optional: without them responses are rendered with
+# the json module and only gzip is offered
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # e.g. coefficients beyond 64 bits, which orjson cannot encode
+            return super().render(content)
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """br (when available) or gzip, if the client accepts it."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON response bodies of at least minimum_size bytes with br or
+    gzip. Only complete bodies sent in one message are compressed, so
+    streamed responses (server-sent events) pass through unbuffered. Every
+    JSON response carries Vary: Accept-Encoding, compressed or not, so
+    shared caches keep the encodings apart.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start: Optional[Message] = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                # A 304 stands in for a JSON body and needs the same Vary
+                if not (headers.get("content-type", "").startswith("application/json")
+                        or message["status"] == 304):
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is None:
+                    await send(message)
+                    return
+                # Held back until the body shows whether it is worth compressing
+                start = message
+                return
+            if message["type"] == "http.response.body" and start is not None:
+                pending, start = start, None
+                headers = MutableHeaders(raw=pending["headers"])
+                body = message.get("body", b"")
+                if (not message.get("more_body") and len(body) >= self.minimum_size
+                        and "content-encoding" not in headers):
+                    body = self.compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+                await send(pending)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+def cacheable(request: Request, response: Response, max_age: int, vary: Sequence[str] = ()) -> Response:
+    """
+    Mark a response whose body depends only on the request as cacheable:
+    a weak ETag of the body plus Cache-Control. vary names request headers
+    other than the URL that the body depends on. A GET whose If-None-Match
+    carries the ETag gets an empty 304 instead.
+    """
+    etag = f'W/"{hashlib.sha256(response.body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    candidates = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if request.method in ("GET", "HEAD") and (etag in candidates or etag[2:] in candidates or "*" in candidates):
+        response = Response(status_code=304, headers=headers)
+    else:
+        response.headers.update(headers)
+    for name in vary:
+        response.headers.add_vary_header(name)
+    return response
@@ -0,0 +1,158 @@
+"""
+Persistent result store shared by all worker processes on a host.
+
+Balanced-equation cache entries (by canonical key) and OCR results (by
+image SHA-256) are kept in one SQLite database in WAL mode, so any number
+of processes can read while one writes. Each kind holds at most
+max_entries rows; the least recently used rows are evicted. The database
+records the version it was written with, and a store opened with a
+different version (e.g. after a solver change) starts empty.
+
+Store errors are logged and treated as misses: the store only ever makes
+requests faster, never fails them.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bump when the table layout changes
+SCHEMA_VERSION = 1
+
+KINDS = ("equation", "image")
+
+# Reads refresh a row's access time at most this often, to keep reads from
+# turning into writes
+TOUCH_INTERVAL = 300.0
+
+# Evict once every this many writes per process
+TRIM_EVERY = 64
+
+
+class ResultStore:
+    def __init__(self, path: str, version: str, max_entries: int):
+        self.path = path
+        self.version = f"{SCHEMA_VERSION}:{version}"
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = False
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection; the schema is checked on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                if not self._opened:
+                    self._prepare(connection)
+                    self._opened = True
+            self._local.connection = connection
+        return connection
+
+    def _prepare(self, connection: sqlite3.Connection) -> None:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != self.version:
+                # Written by another schema or solver version: start over
+                connection.execute("DROP TABLE IF EXISTS results")
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, accessed REAL NOT NULL,"
+                " PRIMARY KEY (kind, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (kind, accessed)")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _failed(self, action: str, error: Exception) -> None:
+        with self._lock:
+            self.errors += 1
+        print(f"⚠️  Warning: result store {action} failed: {error}")
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        try:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT value, accessed FROM results WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is not None and row[1] < time.time() - TOUCH_INTERVAL:
+                connection.execute(
+                    "UPDATE results SET accessed = ? WHERE kind = ? AND key = ?", (time.time(), kind, key)
+                )
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            return None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, kind: str, key: str, value: Any) -> None:
+        try:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(value, ensure_ascii=False), time.time())
+            )
+            with self._lock:
+                self._writes += 1
+                trim = self._writes % TRIM_EVERY == 0
+            if trim:
+                self.trim(kind)
+        except sqlite3.Error as e:
+            self._failed("write", e)
+
+    def trim(self, kind: str) -> None:
+        """Evict the least recently used rows of a kind beyond max_entries."""
+        connection = self._connect()
+        deleted = connection.execute(
+            "DELETE FROM results WHERE kind = ? AND key IN ("
+            " SELECT key FROM results WHERE kind = ? ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (kind, kind, self.max_entries)
+        ).rowcount
+        with self._lock:
+            self.evictions += max(0, deleted)
+
+    def recent(self, kind: str, limit: int) -> List[Tuple[str, Any]]:
+        """The most recently used (key, value) pairs of a kind, for warming memory caches."""
+        try:
+            rows = self._connect().execute(
+                "SELECT key, value FROM results WHERE kind = ? ORDER BY accessed DESC LIMIT ?", (kind, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            return []
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            counts = dict(self._connect().execute("SELECT kind, COUNT(*) FROM results GROUP BY kind").fetchall())
+        except sqlite3.Error:
+            counts = {}
+        with self._lock:
+            return {
+                "path": self.path,
+                "version": self.version,
+                "entries": {kind: counts.get(kind, 0) for kind in KINDS},
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "errors": self.errors,
+            }
@@ -0,0 +1,58 @@
+"""
+Text line detection for worksheet pages.
+
+Lines are found with projection profiles on the preprocessed grayscale
+image. Rows that contain dark pixels form bands, bands separated by small
+gaps are merged, and each band is trimmed to its dark columns.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# (left, top, right, bottom) in pixels, right and bottom exclusive
+Box = Tuple[int, int, int, int]
+
+# Pixels darker than this count as ink
+INK_THRESHOLD = 128
+
+
+def _runs(mask) -> List[Tuple[int, int]]:
+    """(start, end) of each run of True values in a 1-D boolean array."""
+    import numpy as np
+
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def find_text_lines(image: Image.Image, min_height: int = 8, max_gap: int = 3, pad: int = 6) -> List[Box]:
+    """
+    Bounding boxes of the text lines in a grayscale image, top to bottom.
+    Bands shorter than min_height rows are treated as noise; gaps of at
+    most max_gap rows inside a line (e.g. under subscripts) are bridged.
+    """
+    import numpy as np
+
+    ink = np.asarray(image) < INK_THRESHOLD
+    height, width = ink.shape
+    # Ignore rows with only a few specks of noise
+    row_mask = ink.sum(axis=1) > max(1, width // 500)
+
+    bands: List[List[int]] = []
+    for start, end in _runs(row_mask):
+        if bands and start - bands[-1][1] <= max_gap:
+            bands[-1][1] = end
+        else:
+            bands.append([start, end])
+
+    boxes = []
+    for top, bottom in bands:
+        if bottom - top < min_height:
+            continue
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        left, right = int(columns[0]), int(columns[-1]) + 1
+        boxes.append((max(0, left - pad), max(0, top - pad), min(width, right + pad), min(height, bottom + pad)))
+    return boxes
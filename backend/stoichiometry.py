@@ -0,0 +1,138 @@
+"""
+Stoichiometry for balanced equations: molar masses, mass ratios, limiting
+reagents and theoretical yields.
+
+Molar masses of all species are one product of the atomic-weight vector
+(in the balancer's element order, i.e. the rows of build_matrix) with the
+element-count matrix. Limiting reagents and yields are computed for a
+whole batch of quantity sets ("scenarios") at once, with one row per
+scenario and one column per species.
+"""
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Mapping, Sequence, Tuple
+
+from elements import ATOMIC_WEIGHTS
+
+if TYPE_CHECKING:
+    import numpy as np
+    from chemistry_solver import EquationBalancer
+
+UNITS = ("mol", "g")
+
+# Digits kept in reported amounts
+PRECISION = 6
+
+
+@lru_cache(maxsize=1024)
+def atomic_weights(elements: Tuple[str, ...]) -> np.ndarray:
+    """Read-only atomic-weight vector (g/mol) in the given element order."""
+    import numpy as np
+
+    unknown = [symbol for symbol in elements if symbol not in ATOMIC_WEIGHTS]
+    if unknown:
+        raise ValueError(f"Unknown element: {', '.join(unknown)}")
+    weights = np.array([ATOMIC_WEIGHTS[symbol] for symbol in elements], dtype=float)
+    weights.setflags(write=False)
+    return weights
+
+
+def molar_masses(balancer: EquationBalancer) -> np.ndarray:
+    """Molar mass of every species of a parsed equation, reactants then products."""
+    import numpy as np
+
+    A, _ = balancer.build_matrix()
+    return atomic_weights(tuple(balancer.all_elements)) @ np.abs(A)
+
+
+def limiting_reagents(coefficients: np.ndarray, moles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Limiting reactant and reaction extent for each scenario.
+
+    moles has one row per scenario and one column per reactant; NaN marks a
+    reactant present in excess. Returns the column of the limiting reactant
+    (-1 when every reactant is in excess) and the extent in moles of
+    reaction (inf when every reactant is in excess).
+    """
+    import numpy as np
+
+    extents = np.where(np.isnan(moles), np.inf, moles / coefficients)
+    limiting = np.argmin(extents, axis=1)
+    extent = extents[np.arange(len(extents)), limiting]
+    return np.where(np.isinf(extent), -1, limiting), extent
+
+
+def _amounts(names: Sequence[str], moles: np.ndarray, masses: np.ndarray) -> Dict[str, Dict[str, float]]:
+    return {
+        name: {"mol": round(float(mol), PRECISION), "g": round(float(mol * mass), PRECISION)}
+        for name, mol, mass in zip(names, moles, masses)
+    }
+
+
+def solve_scenarios(balancer: EquationBalancer, coefficients: Sequence[int],
+                    scenarios: Sequence[Mapping[str, float]], unit: str = "g") -> Dict:
+    """
+    Stoichiometry of a balanced equation for a batch of scenarios.
+
+    Each scenario maps reactant formulas to the amount available, in grams
+    or moles (unit); reactants left out are in excess. Each result gives
+    the limiting reagent, the product yields and what remains of every
+    given reactant. Raises ValueError for a unit, species or amount that
+    cannot be used.
+    """
+    import numpy as np
+
+    if unit not in UNITS:
+        raise ValueError(f"Unknown unit {unit!r} (use one of: {', '.join(UNITS)})")
+    reactants = [f.formula for f in balancer.reactants]
+    products = [f.formula for f in balancer.products]
+    columns = {name: col for col, name in enumerate(reactants)}
+
+    masses = molar_masses(balancer)
+    weights = np.asarray(coefficients, dtype=float)
+    reactant_masses, product_masses = masses[:len(reactants)], masses[len(reactants):]
+    reactant_coefficients, product_coefficients = weights[:len(reactants)], weights[len(reactants):]
+
+    amounts = np.full((len(scenarios), len(reactants)), np.nan)
+    for row, scenario in enumerate(scenarios):
+        for name, amount in scenario.items():
+            if name not in columns:
+                raise ValueError(f"{name} is not a reactant of this equation")
+            if not (math.isfinite(amount) and amount >= 0):
+                raise ValueError(f"Amount of {name} must be a non-negative number")
+            amounts[row, columns[name]] = amount
+    moles = amounts / reactant_masses if unit == "g" else amounts
+
+    limiting, extent = limiting_reagents(reactant_coefficients, moles)
+    bounded = np.isfinite(extent)
+    finite_extent = np.where(bounded, extent, 0.0)
+    produced = finite_extent[:, None] * product_coefficients
+    # Rounding can leave the limiting reactant a hair below zero
+    left_over = np.maximum(moles - finite_extent[:, None] * reactant_coefficients, 0.0)
+
+    results: List[Dict] = []
+    for row in range(len(scenarios)):
+        if not bounded[row]:
+            results.append({"error": "Give the amount of at least one reactant."})
+            continue
+        given = ~np.isnan(moles[row])
+        results.append({
+            "limiting_reagent": reactants[limiting[row]],
+            "extent_mol": round(float(extent[row]), PRECISION),
+            "theoretical_yield": _amounts(products, produced[row], product_masses),
+            "remaining": _amounts([name for name, g in zip(reactants, given) if g],
+                               left_over[row][given], reactant_masses[given]),
+        })
+
+    total = float(reactant_coefficients @ reactant_masses)
+    return {
+        "molar_masses": {name: round(float(mass), PRECISION) for name, mass in zip(reactants + products, masses)},
+        "mass_ratios": {
+            name: round(float(mass), PRECISION)
+            for name, mass in zip(reactants + products, weights * masses / total)
+        },
+        "unit": unit,
+        "scenarios": results,
+    }
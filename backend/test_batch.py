@@ -0,0 +1,51 @@
+"""
+Test script for the batch endpoint /api/solve-equations.
+Run this to test: python test_batch.py
+"""
+from fastapi.testclient import TestClient
+
+import config
+from app import app
+
+client = TestClient(app)
+
+
+def test_order_and_errors():
+    print("Testing order, duplicates and per-item errors...")
+    equations = ["H2 + O2 -> H2O", "not an equation", "CH4 + O2 -> CO2 + H2O", " H2 + O2 -> H2O ",
+                 "H" * (config.MAX_EQUATION_LENGTH + 1)]
+    body = client.post("/api/solve-equations", json={"equations": equations}).json()
+    results = body["results"]
+    print(f"  {[result.get('balanced_equation', result.get('error', '')[:30]) for result in results]}\n")
+    assert body["count"] == 5 and body["unique"] == 3
+    assert results[0]["balanced_equation"] == "2H2 + O2 → 2H2O"
+    assert "error" in results[1]
+    assert results[2]["balanced_equation"] == "CH4 + 2O2 → CO2 + 2H2O"
+    assert results[3] == results[0]
+    assert "longer than" in results[4]["error"]
+
+
+def test_limits():
+    print("Testing the batch size limit...\n")
+    response = client.post("/api/solve-equations", json={"equations": ["H2 + O2 -> H2O"] * (config.MAX_BATCH_SIZE + 1)})
+    assert response.status_code == 413
+    assert client.post("/api/solve-equations", json={"equations": []}).json()["count"] == 0
+
+
+def test_process_pool():
+    print("Testing a batch large enough for the process pool...")
+    equations = [f"C{n}H{2 * n + 2} + O2 -> CO2 + H2O" for n in range(2, config.BATCH_INLINE_THRESHOLD + 10)]
+    body = client.post("/api/solve-equations?compact=1", json={"equations": equations}).json()
+    print(f"  {body['count']} results, last: {body['results'][-1]['balanced_equation']}\n")
+    assert body["count"] == len(equations)
+    assert body["results"][0]["balanced_equation"] == "2C2H6 + 7O2 → 4CO2 + 6H2O"
+    assert body["results"][1]["balanced_equation"] == "C3H8 + 5O2 → 3CO2 + 4H2O"
+    for n, result in enumerate(body["results"], start=2):
+        assert f"C{n}H{2 * n + 2}" in result["coefficients"]["reactants"]
+    assert all("steps" not in result for result in body["results"])
+
+
+if __name__ == "__main__":
+    test_order_and_errors()
+    test_limits()
+    test_process_pool()
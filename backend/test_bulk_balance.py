@@ -0,0 +1,39 @@
+"""
+Test script for the bulk balancing command.
+Run this to test: python test_bulk_balance.py
+"""
+import io
+import json
+
+from bulk_balance import read_csv, read_jsonl, run
+
+
+def test_bulk_run():
+    print("Testing bulk balancing...")
+    lines = [json.dumps({"equation": "H2 + O2 -> H2O"}), "not json", json.dumps("CH4 + O2 -> CO2 + H2O")] * 20
+    
+    for workers in (1, 2):
+        out = io.StringIO()
+        summary = run(read_jsonl(io.StringIO("\n".join(lines)), "equation"), out, workers=workers, chunk_size=7)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        print(f"  {workers} worker(s): {summary['balanced']} balanced, {summary['failed']} failed")
+        assert [r["line"] for r in results] == list(range(1, 61))
+        assert summary["balanced"] == 40 and summary["failed"] == 20
+        assert results[0]["balanced_equation"] == "2H2 + O2 → 2H2O" and "steps" not in results[0]
+    print()
+
+
+def test_csv_input():
+    print("Testing CSV input...")
+    source = io.StringIO('id,equation\n1,Fe + O2 -> Fe2O3\n2,"Ca(OH)2 + HCl -> CaCl2 + H2O"\n')
+    out = io.StringIO()
+    run(read_csv(source, "equation"), out, workers=1, chunk_size=10, ordered=False)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    print(f"  {[r['balanced_equation'] for r in results]}\n")
+    assert [r["line"] for r in results] == [2, 3]
+    assert results[1]["balanced_equation"] == "Ca(OH)2 + 2HCl → CaCl2 + 2H2O"
+
+
+if __name__ == "__main__":
+    test_bulk_run()
+    test_csv_input()
@@ -0,0 +1,101 @@
+"""
+Test script for the solver and image result caches.
+Run this to test: python test_cache.py
+"""
+import time
+
+from cache import ImageResultCache, TTLCache, hamming_distance
+
+
+def test_ttl_cache():
+    print("Testing LRU eviction and expiry...")
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # "b" was the least recently used
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    print(f"  {cache.stats()}\n")
+    assert cache.stats()["evictions"] == 1 and cache.stats()["expirations"] == 1
+
+
+def test_image_cache_eviction():
+    print("Testing size-bounded eviction...")
+    cache = ImageResultCache(max_bytes=1000)
+    cache.set("a", "A", 400)
+    cache.set("b", "B", 400)
+    assert cache.get("a") == "A"
+    cache.set("c", "C", 400)
+    assert cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C"
+    # Replacing an entry frees its old cost; one larger than the cache is not kept
+    cache.set("a", "A2", 100)
+    cache.set("huge", "H", 5000)
+    assert cache.get("huge") is None
+    print(f"  {cache.stats()}\n")
+    assert cache.total_bytes == 500 and cache.evictions == 1
+
+
+def test_find_similar():
+    print("Testing perceptual lookups...")
+    cache = ImageResultCache(max_bytes=10_000, max_distance=4)
+    reference = 0b1011_0110 << 40
+    cache.set("photo", "H2 + O2 -> H2O", 100, fingerprint=reference)
+    cache.set("other", "N2 + H2 -> NH3", 100, fingerprint=~reference & (2 ** 64 - 1))
+    cache.set("unhashed", "C + O2 -> CO2", 100)
+
+    near = reference ^ 0b1011  # 3 bits differ
+    far = reference ^ 0b11111  # 5 bits differ
+    assert hamming_distance(near, reference) == 3 and hamming_distance(far, reference) == 5
+    assert cache.find_similar(reference) == "H2 + O2 -> H2O"
+    assert cache.find_similar(near) == "H2 + O2 -> H2O"
+    assert cache.find_similar(far) is None
+    print(f"  {cache.stats()}\n")
+    assert cache.similar_hits == 2
+
+    # The closest of several candidates wins
+    cache.set("closer", "2H2 + O2 -> 2H2O", 100, fingerprint=reference ^ 0b1)
+    assert cache.find_similar(reference ^ 0b11) == "2H2 + O2 -> 2H2O"
+
+
+def test_find_similar_scan_limit():
+    print("Testing that perceptual lookups scan only recent entries...")
+    cache = ImageResultCache(max_bytes=100_000, max_distance=4, max_scan=3)
+    cache.set("old", "H2 + O2 -> H2O", 100, fingerprint=0)
+    for i in range(3):
+        cache.set(f"new{i}", f"result {i}", 100, fingerprint=(2 ** 64 - 1) >> i)
+    # The matching entry is older than the three most recent ones
+    assert cache.find_similar(0) is None
+    assert cache.get("old") == "H2 + O2 -> H2O"
+    # Using it made it recent again
+    assert cache.find_similar(0) == "H2 + O2 -> H2O"
+    print(f"  {cache.stats()}\n")
+
+
+def test_image_dhash():
+    print("Testing difference hashes of real images...")
+    from PIL import Image, ImageDraw
+
+    from app import image_dhash
+
+    def page(text_at: int, brightness: int = 255) -> Image.Image:
+        image = Image.new("L", (400, 200), brightness)
+        ImageDraw.Draw(image).rectangle((text_at, 80, text_at + 150, 120), fill=0)
+        return image
+
+    original = image_dhash(page(40))
+    relit = image_dhash(page(40, brightness=235))
+    moved = image_dhash(page(220))
+    print(f"  relit: {hamming_distance(original, relit)} bits, moved: {hamming_distance(original, moved)} bits\n")
+    assert hamming_distance(original, relit) <= 4
+    assert hamming_distance(original, moved) > 4
+
+
+if __name__ == "__main__":
+    test_ttl_cache()
+    test_image_cache_eviction()
+    test_find_similar()
+    test_find_similar_scan_limit()
+    test_image_dhash()
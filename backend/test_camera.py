@@ -0,0 +1,21 @@
+"""
+Test script for camera result stabilization.
+Run this to test: python test_camera.py
+"""
+from camera import FrameStabilizer
+
+
+def test_stabilizer():
+    print("Testing frame stabilization...")
+    stabilizer = FrameStabilizer(required=3)
+    frames = ["H2 + O2 → H2O", "H2 + O2 → H2O", None, "H2 + O2 → H2O", "H2 + O2 → H2O",
+              "H2 + O2 → H2O", "H2 + O2 → H2O", "N2 + H2 → NH3", "N2 + H2 → NH3", "N2 + H2 → NH3"]
+    confirmed = [(i, eq) for i, eq in enumerate(stabilizer.update(frame) for frame in frames) if eq]
+    print(f"  confirmed {confirmed}")
+    # Unreadable frames reset the streak; a stable equation is sent only once
+    assert confirmed == [(5, "H2 + O2 → H2O"), (9, "N2 + H2 → NH3")]
+    print()
+
+
+if __name__ == "__main__":
+    test_stabilizer()
@@ -4,7 +4,8 @@ Run this to test: python test_chemistry.py
 """
 import sys
 import io
-from chemistry_solver import balance_equation
+from chemistry_solver import (EquationBalancer, balance_equation, equation_cache, incomplete_reason, integer_nullspace,
+                              sparse_integer_nullspace)
 
 # Fix encoding for Windows console
 if sys.platform == 'win32':
@@ -17,6 +18,9 @@ def test_equations():
         "Fe + O2 -> Fe2O3",
         "CaCO3 -> CaO + CO2",
         "N2 + H2 -> NH3",
+        "C57H110O6 + O2 -> CO2 + H2O",
+        "K4FeC6N6 + KMnO4 + H2SO4 -> KHSO4 + Fe2S3O12 + MnSO4 + HNO3 + CO2 + H2O",
+        "Ca(OH)2 + H3PO4 -> Ca3(PO4)2 + H2O",
     ]
     
     print("Testing equation balancing...\n")
@@ -30,6 +34,124 @@ def test_equations():
         else:
             print(f"  Balanced: {result['balanced_equation']}\n")
             print(f"  Steps: {len(result['steps'])} steps generated\n")
+            print(f"  Solver: {result['solver']}\n")
+
+def test_bracketed_groups():
+    print("Testing bracketed groups...\n")
+    result = balance_equation("Al2(SO4)3 + Ca(OH)2 -> Al(OH)3 + CaSO4")
+    print(f"  {result['balanced_equation']}\n")
+    assert result["balanced_equation"] == "Al2(SO4)3 + 3Ca(OH)2 → 2Al(OH)3 + 3CaSO4"
+
+
+def test_equation_cache():
+    # Same reaction typed with different arrows, spacing and species order
+    variants = [
+        "H2 + O2 -> H2O",
+        "O2+H2 => H2O",
+        "2H2 + O2 = 2H2O",
+        "O2 + H2 → H2O",
+    ]
+    
+    print("Testing equation cache...\n")
+    
+    equation_cache.clear()
+    hits_before = equation_cache.hits
+    for equation in variants:
+        result = balance_equation(equation)
+        print(f"  {equation:20} -> {result['balanced_equation']}")
+        assert result["coefficients"]["reactants"]["H2"] == 2
+        assert result["coefficients"]["reactants"]["O2"] == 1
+    
+    print(f"  Cache: {equation_cache.stats()}\n")
+    assert equation_cache.hits - hits_before == len(variants) - 1
+
+
+def test_incomplete_equations():
+    print("Testing incomplete input...\n")
+    partial = {
+        "CH4 + O2": "arrow",
+        "CH4 + O2 ->": "products",
+        "CH4 + -> CO2": "after each",
+        "Qq2 + O2 -> QqO": "Unknown element",
+        "Ca(OH2 -> CaO + H2O": "brackets",
+    }
+    for equation, reason in partial.items():
+        message = incomplete_reason(equation)
+        print(f"  {equation:22} -> {message}")
+        assert message is not None and reason in message
+    assert incomplete_reason("CH4 + 2O2 -> CO2 + 2H2O") is None
+    print()
+
+def test_compact_results():
+    print("Testing compact results...\n")
+    full = balance_equation("Fe + O2 -> Fe2O3")
+    compact = balance_equation("Fe + O2 -> Fe2O3", include_steps=False)
+    assert "steps" not in compact and "explanation" not in compact
+    assert compact == {name: value for name, value in full.items() if name not in ("steps", "explanation")}
+
+
+def test_multiple_solutions():
+    print("Testing equations with several independent reactions...\n")
+    result = balance_equation("C + O2 -> CO + CO2")
+    print(f"  {result['balanced_equation']}  {result['solver']}\n")
+    assert result["balanced_equation"] == "3C + 2O2 → 2CO + CO2"
+    assert result["solver"]["method"] == "lattice"
+    assert len(result["solver"]["independent_reactions"]) == 2
+    
+    result = balance_equation("O2 -> O3 + H2 + H2O")
+    print(f"  {result['error']}\n")
+    assert result["independent_reactions"] == [
+        {"reactants": {"O2": 3}, "products": {"O3": 2}},
+        {"reactants": {"O2": 1, "H2": 2}, "products": {"H2O": 2}},
+    ]
+
+
+def test_sparse_nullspace():
+    print("Testing sparse elimination...\n")
+    import random
+    rng = random.Random(7)
+    for _ in range(100):
+        rows, cols = rng.randint(1, 6), rng.randint(1, 9)
+        matrix = [[rng.choice((0, 0, 0, 1, 2, -1, 3)) for _ in range(cols)] for _ in range(rows)]
+        sparse = [{col: v for col, v in enumerate(row) if v} for row in matrix]
+        assert sparse_integer_nullspace(sparse, cols) == integer_nullspace(matrix)
+    
+    # 28 alkanes burnt together: many species, nullity 28
+    alkanes = " + ".join(f"C{n}H{2 * n + 2}" for n in range(2, 30))
+    result = balance_equation(f"{alkanes} + O2 -> CO2 + H2O")
+    print(f"  ... {result['balanced_equation'][-30:]}  nullity {result['solver']['nullity']}\n")
+    assert result["balanced_equation"].endswith("665O2 → 434CO2 + 462H2O")
+
+
+def test_time_budget():
+    print("Testing the solver time budget...\n")
+    import config
+    budget = config.SOLVER_TIME_BUDGET_MS
+    config.SOLVER_TIME_BUDGET_MS = 0
+    try:
+        result = EquationBalancer("Fe + O2 -> FeO + Fe2O3").balance()
+    finally:
+        config.SOLVER_TIME_BUDGET_MS = budget
+    print(f"  {result}\n")
+    assert "too large" in result["error"]
+    
+    # Running out of time is not remembered: a retry with more time solves it
+    equation_cache.clear()
+    config.SOLVER_TIME_BUDGET_MS = 0
+    try:
+        assert balance_equation("Fe + O2 -> FeO + Fe2O3")["budget_exceeded"]
+    finally:
+        config.SOLVER_TIME_BUDGET_MS = budget
+    result = balance_equation("O2 + Fe => Fe2O3 + FeO")
+    print(f"  retry: {result.get('balanced_equation')}\n")
+    assert "error" not in result and len(equation_cache) == 1
 
 if __name__ == "__main__":
     test_equations()
+    test_bracketed_groups()
+    test_equation_cache()
+    test_incomplete_equations()
+    test_compact_results()
+    test_multiple_solutions()
+    test_sparse_nullspace()
+    test_time_budget()
@@ -0,0 +1,52 @@
+"""
+Test script for extracting equations from OCR text.
+Run this to test: python test_equation_scanner.py
+"""
+import sys
+import io
+import time
+from equation_scanner import extract_equations
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+def test_extraction():
+    test_cases = [
+        ("H2 + O2 -> H2O", ["H2 + O2 → H2O"]),
+        ("Balance: 2 H2 + O2 = 2 H 2 O.", ["2H2 + O2 → 2H2O"]),
+        ("Fe + O2 → Fe2O3 and CaCO3 => CaO + CO2", ["Fe + O2 → Fe2O3", "CaCO3 → CaO + CO2"]),
+        ("N2 + 3H2 <=> 2NH3", ["N2 + 3H2 → 2NH3"]),
+        ("H₂ + O₂ → H₂O", ["H2 + O2 → H2O"]),
+        ("Ca(OH)2 + HCl --> CaCl2 + H2O", ["Ca(OH)2 + HCl → CaCl2 + H2O"]),
+        ("The pH of the solution is 7", []),
+        ("2H2 + 02 -> 2H20", ["2H2 + 02 → 2H20"]),
+        ("10 + 20 = 30", []),
+    ]
+    
+    print("Testing equation extraction...\n")
+    
+    for text, expected in test_cases:
+        found = extract_equations(text)
+        print(f"  {text!r} -> {found}")
+        assert found == expected
+    print()
+
+def test_linear_time():
+    # Long reactant chains with no arrow made the old regexes backtrack
+    print("Testing extraction time on adversarial text...\n")
+    
+    timings = []
+    for repeat in (1000, 4000):
+        text = "H2 + " * repeat
+        start = time.perf_counter()
+        assert extract_equations(text) == []
+        timings.append(time.perf_counter() - start)
+        print(f"  {len(text)} chars: {timings[-1] * 1000:.2f} ms")
+    print()
+    # 4x the input should take roughly 4x the time, not 16x
+    assert timings[1] < timings[0] * 10
+
+if __name__ == "__main__":
+    test_extraction()
+    test_linear_time()
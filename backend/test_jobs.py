@@ -0,0 +1,97 @@
+"""
+Test script for the background job store.
+Run this to test: python test_jobs.py
+"""
+import asyncio
+import time
+
+import jobs
+from jobs import JobStore, JobStoreFullError
+
+
+def test_job_events():
+    async def scenario():
+        store = JobStore(max_jobs=4, ttl=60)
+        job, created = store.create()
+        assert created and job.status == jobs.QUEUED
+        
+        job.emit("uploaded", {"bytes": 10})
+        past, queue = job.subscribe()
+        job.start()
+        job.emit("ocr_done")
+        job.finish({"balanced_equation": "2H2 + O2 → 2H2O"})
+        
+        live = [queue.get_nowait()["stage"] for _ in range(queue.qsize())]
+        print(f"  replayed {[e['stage'] for e in past]}, then {live}")
+        assert [e["stage"] for e in past] == ["uploaded"]
+        assert live == ["ocr_done", jobs.DONE]
+        assert store.get(job.id).to_dict()["result"]["balanced_equation"] == "2H2 + O2 → 2H2O"
+    
+    print("Testing job events...")
+    asyncio.run(scenario())
+    print()
+
+
+def test_idempotency_and_bounds():
+    print("Testing idempotency keys and store bounds...")
+    store = JobStore(max_jobs=2, ttl=60)
+    first, created = store.create("retry-1")
+    again, created_again = store.create("retry-1")
+    assert created and not created_again and again is first
+    
+    store.create()
+    try:
+        store.create()
+        assert False, "store should be full of unfinished jobs"
+    except JobStoreFullError:
+        pass
+    
+    # A finished job makes room, and its key can start a new job
+    first.fail("boom")
+    replacement, created = store.create()
+    assert created and store.get(first.id) is None
+    replacement.finish({})
+    assert store.create("retry-1")[1]
+    print(f"  {store.stats()}\n")
+
+
+def test_failed_keys_and_pending_bytes():
+    print("Testing retries of failed jobs and the upload byte budget...")
+    store = JobStore(max_jobs=8, ttl=60, max_pending_bytes=1000)
+    failed, _ = store.create(("10.0.0.1", "retry-1"), 400)
+    failed.fail("boom")
+    # A failed job does not answer a retry, and its upload no longer counts
+    retry, created = store.create(("10.0.0.1", "retry-1"), 400)
+    assert created and retry is not failed and store.get(failed.id) is failed
+    assert store.create(("10.0.0.1", "retry-1"))[0] is retry
+    # The same key from another client is a different job
+    other, created = store.create(("10.0.0.2", "retry-1"), 400)
+    assert created and other is not retry
+    
+    assert store.pending_bytes() == 800
+    try:
+        store.create(None, 400)
+        assert False, "unfinished uploads should exceed the byte budget"
+    except JobStoreFullError:
+        pass
+    retry.finish({})
+    assert store.create(None, 400)[1]
+    print(f"  {store.stats()}\n")
+
+
+def test_expiry():
+    print("Testing job expiry...")
+    store = JobStore(max_jobs=4, ttl=60)
+    job, _ = store.create("key")
+    job.finish({})
+    job.updated_at = time.time() - 120
+    assert store.get(job.id) is None
+    assert store.stats()["expired"] == 1
+    print("  expired jobs are dropped\n")
+
+
+if __name__ == "__main__":
+    test_job_events()
+    test_idempotency_and_bounds()
+    test_failed_keys_and_pending_bytes()
+    test_expiry()
@@ -0,0 +1,44 @@
+"""
+Test script for as-you-type balancing over /api/ws/solve.
+Run this to test: python test_live_solve.py
+"""
+import time
+
+from fastapi.testclient import TestClient
+
+import app
+import config
+
+
+def test_live_solve():
+    print("Testing the live solve websocket...")
+    superseded = app.live_counts["superseded"]
+    with TestClient(app.app).websocket_connect("/api/ws/solve") as socket:
+        # A reply waits out the debounce interval
+        start = time.perf_counter()
+        socket.send_json({"revision": 1, "equation": "N2 + H2 -> NH3"})
+        reply = socket.receive_json()
+        elapsed = time.perf_counter() - start
+        print(f"  revision 1 after {elapsed * 1000:.0f} ms: {reply['result']['balanced_equation']}")
+        assert reply["revision"] == 1 and reply["status"] == "balanced"
+        assert reply["result"]["balanced_equation"] == "N2 + 3H2 → 2NH3"
+        assert elapsed >= config.LIVE_DEBOUNCE_MS / 1000
+
+        # A newer revision sent within the interval replaces the pending one
+        socket.send_json({"revision": 2, "equation": "H2 + O2 -> H2"})
+        socket.send_json({"revision": 3, "equation": "H2 + O2 -> H2O"})
+        reply = socket.receive_json()
+        print(f"  revision {reply['revision']}: {reply['result']['balanced_equation']}")
+        assert reply["revision"] == 3 and reply["result"]["balanced_equation"] == "2H2 + O2 → 2H2O"
+        assert app.live_counts["superseded"] == superseded + 1
+
+        # Half-typed input is answered without solving; plain text works too
+        socket.send_text("CH4 + O2 ->")
+        reply = socket.receive_json()
+        print(f"  revision {reply['revision']}: {reply}\n")
+        assert reply["revision"] == 4 and reply["status"] == "incomplete" and reply["reason"]
+        assert "result" not in reply
+
+
+if __name__ == "__main__":
+    test_live_solve()
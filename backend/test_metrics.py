@@ -0,0 +1,86 @@
+"""
+Test script for latency metrics, /metrics and Server-Timing.
+Run this to test: python test_metrics.py
+"""
+import re
+
+import metrics
+
+
+def test_histogram_rendering():
+    print("Testing histogram exposition...")
+    histogram = metrics.Histogram("test_seconds", "Test latency.", "stage", buckets=(0.01, 0.1, 1.0))
+    try:
+        for value in (0.005, 0.01, 0.05, 0.5, 3.0):
+            histogram.observe('o"cr', value)
+        lines = histogram.render()
+    finally:
+        metrics._registry.remove(histogram)
+    print("  " + "\n  ".join(lines) + "\n")
+    assert lines[:2] == ["# HELP test_seconds Test latency.", "# TYPE test_seconds histogram"]
+    # Buckets are cumulative and inclusive of their upper bound
+    assert lines[2:] == [
+        'test_seconds_bucket{stage="o\\"cr",le="0.01"} 2',
+        'test_seconds_bucket{stage="o\\"cr",le="0.1"} 3',
+        'test_seconds_bucket{stage="o\\"cr",le="1.0"} 4',
+        'test_seconds_bucket{stage="o\\"cr",le="+Inf"} 5',
+        'test_seconds_sum{stage="o\\"cr"} 3.565',
+        'test_seconds_count{stage="o\\"cr"} 5',
+    ]
+
+
+def test_counters():
+    print("Testing counter and gauge exposition...\n")
+    assert metrics.format_samples("x_total", "counter", "Things.", "kind", {"b": 2, "a": 1}) == [
+        "# HELP x_total Things.", "# TYPE x_total counter", 'x_total{kind="a"} 1', 'x_total{kind="b"} 2']
+
+
+def test_server_timing():
+    print("Testing Server-Timing...")
+    token = metrics.start_request()
+    with metrics.stage("decode"):
+        pass
+    with metrics.solver_path("exact"):
+        pass
+    timings = metrics.finish_request(token)
+    header = metrics.server_timing_header(timings, 0.0123)
+    print(f"  {header}\n")
+    assert [name for name, _ in timings] == ["decode", "solver_exact"]
+    assert re.fullmatch(r"decode;dur=\d+\.\d\d, solver_exact;dur=\d+\.\d\d, total;dur=12\.30", header)
+    # Outside a request nothing is collected
+    assert metrics.current_timings() == []
+
+
+def test_endpoint():
+    print("Testing /metrics and the Server-Timing header...")
+    from fastapi.testclient import TestClient
+
+    from app import app
+
+    client = TestClient(app)
+    solved = client.post("/api/solve-equation", json={"equation": "N2 + H2 -> NH3"})
+    print(f"  Server-Timing: {solved.headers['server-timing']}")
+    assert re.search(r"\bbalance;dur=[\d.]+", solved.headers["server-timing"])
+    assert re.search(r"\btotal;dur=[\d.]+$", solved.headers["server-timing"])
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    print(f"  {len(text.splitlines())} lines\n")
+    assert "# TYPE photochem_request_seconds histogram" in text
+    assert re.search(r'photochem_request_seconds_count\{route="/api/solve-equation"\} [1-9]', text)
+    assert re.search(r'photochem_stage_seconds_bucket\{stage="balance",le="\+Inf"\} [1-9]', text)
+    assert 'photochem_cache_hits_total{cache="equation"}' in text
+    # Every sample line is "name{labels} value"
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            sample, value = line.rsplit(" ", 1)
+            assert re.fullmatch(r'[a-z_]+(\{[^}]*\})?', sample), line
+            float(value)
+
+
+if __name__ == "__main__":
+    test_histogram_rendering()
+    test_counters()
+    test_server_timing()
+    test_endpoint()
@@ -0,0 +1,120 @@
+"""
+Test script for the OCR backend abstraction, with stand-in engines so it
+runs without Tesseract installed.
+Run this to test: python test_ocr_backends.py
+"""
+import sys
+import threading
+import types
+
+from PIL import Image
+
+import app
+
+
+class FakeAPI:
+    """Records the engines a TesserocrBackend starts and releases."""
+    started = []
+    ended = []
+
+    def __init__(self, psm, oem):
+        self.settings = {"psm": psm, "oem": oem}
+        self.variables = {}
+        FakeAPI.started.append(self)
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        self.image = (len(data), width, height, bytes_per_pixel, bytes_per_line)
+
+    def GetUTF8Text(self):
+        return "H2 + O2 -> H2O\n"
+
+    def End(self):
+        FakeAPI.ended.append(self)
+
+
+def _fake_tesserocr():
+    FakeAPI.started, FakeAPI.ended = [], []
+    return types.SimpleNamespace(PyTessBaseAPI=FakeAPI)
+
+
+def test_tesserocr_engines():
+    print("Testing tesserocr engine probing and reuse...")
+    sys.modules["tesserocr"] = _fake_tesserocr()
+    installed, app.TESSEROCR_INSTALLED = app.TESSEROCR_INSTALLED, True
+    try:
+        backend = app.select_ocr_backend("tesserocr")
+        assert isinstance(backend, app.TesserocrBackend)
+        # The probe engine was released, and no thread kept one
+        assert len(FakeAPI.started) == 1 and FakeAPI.ended == FakeAPI.started
+
+        image = Image.new("L", (30, 10), 255)
+        assert backend.image_to_string(image, "chemistry") == "H2 + O2 -> H2O\n"
+        backend.image_to_string(image, "chemistry")
+        engine = FakeAPI.started[-1]
+        assert len(FakeAPI.started) == 2 and engine.image == (300, 30, 10, 1, 30)
+        assert engine.variables == {"tessedit_char_whitelist": app.CHEMISTRY_WHITELIST}
+
+        # Each worker thread has its own engines
+        worker = threading.Thread(target=backend.image_to_string, args=(image.convert("RGB"), "line"))
+        worker.start()
+        worker.join()
+        assert len(FakeAPI.started) == 3 and FakeAPI.started[-1].image[3] == 3
+        print(f"  {len(FakeAPI.started)} engines started, {len(FakeAPI.ended)} released\n")
+    finally:
+        app.TESSEROCR_INSTALLED = installed
+        del sys.modules["tesserocr"]
+
+
+def test_backend_selection():
+    print("Testing backend selection and fallback...")
+    sys.modules["tesserocr"] = _fake_tesserocr()
+    installed, app.TESSEROCR_INSTALLED = app.TESSEROCR_INSTALLED, True
+    probe = app.probe_pytesseract
+
+    def broken(self):
+        raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+    probe_engine, app.TesserocrBackend.probe = app.TesserocrBackend.probe, broken
+    try:
+        app.probe_pytesseract = lambda: True
+        assert isinstance(app.select_ocr_backend("auto"), app.PytesseractBackend)
+        assert app.select_ocr_backend("tesserocr") is None
+        app.probe_pytesseract = lambda: False
+        assert app.select_ocr_backend("auto") is None
+    finally:
+        app.TesserocrBackend.probe = probe_engine
+        app.probe_pytesseract = probe
+        app.TESSEROCR_INSTALLED = installed
+        del sys.modules["tesserocr"]
+    print()
+
+
+def test_pytesseract_words():
+    print("Testing pytesseract word data...")
+    backend = app.PytesseractBackend()
+    calls = []
+
+    def image_to_data(image, config, output_type):
+        calls.append(config)
+        return {"text": ["", "2H2", "+", " ", "O2"], "conf": ["-1", "91.5", "88", "-1", "40"],
+                "left": [0, 10, 50, 0, 70], "top": [0, 5, 5, 0, 5], "width": [0, 30, 8, 0, 20],
+                "height": [0, 12, 12, 0, 12], "block_num": [1] * 5, "par_num": [1] * 5, "line_num": [0, 1, 1, 1, 2]}
+
+    fake = types.SimpleNamespace(image_to_data=image_to_data, Output=types.SimpleNamespace(DICT="dict"))
+    backend._pytesseract = fake
+    words = backend.image_to_data(Image.new("L", (100, 30)), "chemistry")
+    print(f"  {words}\n")
+    assert calls == [f"--oem 3 --psm 6 -c tessedit_char_whitelist={app.CHEMISTRY_WHITELIST}"]
+    assert [(w["text"], w["conf"], w["line"]) for w in words] == [
+        ("2H2", 91.5, (1, 1, 1)), ("+", 88.0, (1, 1, 1)), ("O2", 40.0, (1, 1, 2))]
+    assert app._words_to_text(words) == "2H2 +\nO2"
+    assert backend._config("default") == "--oem 3 --psm 3"
+
+
+if __name__ == "__main__":
+    test_tesserocr_engines()
+    test_backend_selection()
+    test_pytesseract_words()
@@ -0,0 +1,101 @@
+"""
+Test script for the confidence-driven OCR mode, with a scripted backend
+so it runs without Tesseract installed.
+Run this to test: python test_ocr_modes.py
+"""
+import time
+
+from PIL import Image
+
+import app
+import config
+
+
+class ScriptedBackend(app.OCRBackend):
+    """Returns fixed words for the page and for re-read crops."""
+
+    in_process = True
+
+    def __init__(self, words, reread=(), full_text="full page text"):
+        self.words = words
+        self.reread = list(reread)
+        self.full_text = full_text
+        self.calls = []
+
+    def image_to_data(self, image, profile):
+        self.calls.append(("data", profile))
+        if profile == "line":
+            return [self.reread.pop(0)] if self.reread else []
+        return [dict(word) for word in self.words]
+
+    def image_to_string(self, image, profile):
+        self.calls.append(("string", profile))
+        return self.full_text
+
+
+def _word(text, conf, line=0, left=0):
+    return {"text": text, "conf": conf, "box": (left, 10, 30, 20), "line": line}
+
+
+PAGE = Image.new("L", (400, 100), 255)
+
+
+def test_plausible_tokens():
+    print("Testing the equation token filter...")
+    for token in ("2H2O", "Ca(OH)2", "+", "->", "→", "[Fe(CN)6]", "12"):
+        assert app._PLAUSIBLE_TOKEN.match(token), token
+    for token in ("the", "H2o!", "ab", "2x", ""):
+        assert not app._PLAUSIBLE_TOKEN.match(token), token
+
+    # Long digit runs that end in a bad character fail in linear time
+    start = time.perf_counter()
+    assert not app._PLAUSIBLE_TOKEN.match("1" * 20_000 + "x")
+    elapsed = time.perf_counter() - start
+    print(f"  20k-digit token rejected in {elapsed * 1000:.2f} ms\n")
+    assert elapsed < 0.1
+
+
+def test_single_pass():
+    print("Testing confident words in one pass...\n")
+    backend = ScriptedBackend([_word("2H2", 95), _word("+", 90), _word("O2", 92), _word("→", 88, line=0),
+                               _word("2H2O", 91, line=1)])
+    text, info = app._ocr_confidence(backend, PAGE)
+    assert text == "2H2 + O2 →\n2H2O"
+    assert info == {"path": "single_pass", "passes": 1}
+    assert backend.calls == [("data", "chemistry")]
+
+
+def test_region_rescan():
+    print("Testing re-reading of weak words...\n")
+    backend = ScriptedBackend([_word("CH4", 93), _word("+", 90), _word("2O2", 35, left=60), _word("the", 96)],
+                              reread=[_word("2O2", 87), _word("the", 50)])
+    text, info = app._ocr_confidence(backend, PAGE)
+    assert info == {"path": "region_rescan", "passes": 3, "rescanned_regions": 2}
+    # The low-confidence word and the implausible one were re-read; only a
+    # more confident reading replaces a word
+    assert backend.calls.count(("data", "line")) == 2
+    assert text == "CH4 + 2O2 the"
+
+
+def test_full_rescan():
+    print("Testing fallbacks to a full unrestricted pass...\n")
+    backend = ScriptedBackend([_word("H", 20)])
+    assert app._ocr_confidence(backend, PAGE) == ("full page text", {"path": "full_rescan", "passes": 2})
+
+    weak = [_word(f"w{i}", 10) for i in range(config.OCR_MAX_RESCAN_REGIONS + 1)]
+    text, info = app._ocr_confidence(ScriptedBackend(weak), PAGE)
+    assert text == "full page text" and info["weak_words"] == len(weak)
+
+    # An engine started per call re-reads the page once rather than each crop
+    backend = ScriptedBackend([_word("CH4", 93), _word("2O2", 35)], reread=[_word("2O2", 87)])
+    backend.in_process = False
+    text, info = app._ocr_confidence(backend, PAGE)
+    assert info == {"path": "full_rescan", "passes": 2, "weak_words": 1}
+    assert backend.calls == [("data", "chemistry"), ("string", "default")]
+
+
+if __name__ == "__main__":
+    test_plausible_tokens()
+    test_single_pass()
+    test_region_rescan()
+    test_full_rescan()
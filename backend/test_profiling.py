@@ -0,0 +1,160 @@
+"""
+Test script for per-request profiling.
+Run this to test: python test_profiling.py
+"""
+import asyncio
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import types
+
+import config
+import profiling
+from chemistry_solver import EquationBalancer, balance_equation
+
+
+def test_choose():
+    print("Testing profile selection...\n")
+    token, rate = config.PROFILE_TOKEN, config.PROFILE_SAMPLE_RATE
+    config.PROFILE_TOKEN, config.PROFILE_SAMPLE_RATE = "s3cret", 0.0
+    try:
+        assert profiling.choose("s3cret") == "token"
+        assert profiling.choose("guess") is None
+        assert profiling.choose(None) is None
+        config.PROFILE_SAMPLE_RATE = 1.0
+        assert profiling.choose(None) == "sampled"
+    finally:
+        config.PROFILE_TOKEN, config.PROFILE_SAMPLE_RATE = token, rate
+
+
+def test_profile_and_rotation():
+    print("Testing profiles of worker thread work and rotation...")
+    directory, keep = config.PROFILE_DIR, config.PROFILE_MAX_FILES
+    config.PROFILE_DIR, config.PROFILE_MAX_FILES = tempfile.mkdtemp(), 2
+
+    async def request(equation):
+        profile = profiling.begin("token")
+        assert profiling.begin("token") is None
+        try:
+            await asyncio.to_thread(profiling.call, EquationBalancer(equation).balance)
+        finally:
+            profiling.end(profile)
+        return profile.save({"path": "/api/solve-equation", "duration_ms": 1.0})
+
+    try:
+        for equation in ("H2 + O2 -> H2O", "CH4 + O2 -> CO2 + H2O", "C + O2 -> CO + CO2"):
+            asyncio.run(request(equation))
+        names = sorted(os.listdir(config.PROFILE_DIR))
+        print(f"  {names}\n")
+        assert len([name for name in names if name.endswith(".json")]) == 2
+
+        record = json.load(open(os.path.join(config.PROFILE_DIR, [n for n in names if n.endswith(".json")][0])))
+        stats = pstats.Stats(os.path.join(config.PROFILE_DIR, record["files"][0]))
+        assert any(name == "solve_balance" for _, _, name in stats.stats)
+    finally:
+        config.PROFILE_DIR, config.PROFILE_MAX_FILES = directory, keep
+
+
+def test_failed_start():
+    print("Testing a profiler that fails to start...\n")
+    start = profiling.RequestProfile.start
+    
+    def broken(self):
+        raise RuntimeError("profiler already active")
+    
+    profiling.RequestProfile.start = broken
+    try:
+        profiling.begin("token")
+    except RuntimeError:
+        pass
+    finally:
+        profiling.RequestProfile.start = start
+    # Later requests can still be profiled
+    profile = profiling.begin("token")
+    assert profile is not None
+    profiling.end(profile)
+
+
+def test_stage_totals():
+    print("Testing stage totals...\n")
+    timings = [("decode", 0.002), ("ocr", 0.010), ("ocr", 0.015), ("balance", 0.001)]
+    assert profiling.stage_totals_ms(timings) == {"decode": 2.0, "ocr": 25.0, "balance": 1.0}
+
+
+def test_other_profiler_active():
+    print("Testing work when a thread profiler cannot start...\n")
+    
+    class Busy:
+        """cProfile.Profile on 3.12+ while another profiler is running."""
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+    
+    async def request():
+        profile = profiling.begin("token")
+        module, profiling.cProfile = profiling.cProfile, types.SimpleNamespace(Profile=Busy)
+        try:
+            return await asyncio.to_thread(profiling.call, balance_equation, "Fe + O2 -> Fe2O3")
+        finally:
+            profiling.cProfile = module
+            profiling.end(profile)
+    
+    shared, profiling.SHARED_CPROFILE = profiling.SHARED_CPROFILE, False
+    try:
+        result = asyncio.run(request())
+    finally:
+        profiling.SHARED_CPROFILE = shared
+    assert result["balanced_equation"] == "4Fe + 3O2 → 2Fe2O3"
+    
+    # The request profiler itself cannot start: the request is not profiled
+    module, profiling.cProfile = profiling.cProfile, types.SimpleNamespace(Profile=Busy)
+    try:
+        if profiling.PROFILER == "cprofile":
+            assert profiling.begin("token") is None and not profiling._busy
+    finally:
+        profiling.cProfile = module
+
+
+def test_profiled_requests():
+    print("Testing requests served with profiling on...")
+    code = """
+from fastapi.testclient import TestClient
+import app
+client = TestClient(app.app)
+headers = {"X-Profile-Token": "s3cret"}
+solved = client.post("/api/solve-equation", json={"equation": "C + O2 -> CO + CO2"}, headers=headers)
+assert solved.status_code == 200, solved.text
+assert solved.json()["balanced_equation"] == "3C + 2O2 → 2CO + CO2", solved.json()
+assert "X-Profile-Id" in solved.headers
+batch = client.post("/api/solve-equations", json={"equations": ["H2 + O2 -> H2O"]}, headers=headers)
+assert batch.json()["results"][0]["balanced_equation"] == "2H2 + O2 → 2H2O", batch.json()
+print(solved.headers["X-Profile-Id"])
+"""
+    with tempfile.TemporaryDirectory() as folder:
+        env = dict(os.environ, PHOTOCHEM_PROFILE_TOKEN="s3cret", PHOTOCHEM_PROFILE_DIR=folder)
+        run = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             env=env, capture_output=True, text=True)
+        print(f"  {run.stdout.strip() or run.stderr[-500:]}\n")
+        assert run.returncode == 0
+        assert any(name.endswith(".prof") for name in os.listdir(folder))
+
+
+def test_slowest():
+    print("Testing slowest requests...\n")
+    recent = profiling.RecentRequests(3)
+    for ms in (5.0, 50.0, 1.0, 20.0):
+        recent.add({"duration_ms": ms})
+    assert [record["duration_ms"] for record in recent.slowest(2)] == [50.0, 20.0]
+    assert len(recent) == 3
+
+
+if __name__ == "__main__":
+    test_choose()
+    test_profile_and_rotation()
+    test_failed_start()
+    test_other_profiler_active()
+    test_profiled_requests()
+    test_stage_totals()
+    test_slowest()
@@ -0,0 +1,71 @@
+"""
+Test script for the precomputed reaction index.
+Run this to test: python test_reaction_index.py
+"""
+import os
+import tempfile
+
+import chemistry_solver
+from chemistry_solver import SOLVER_VERSION, snap_to_known_reaction
+from reaction_index import ReactionIndex, build
+
+
+def test_index_lookups():
+    print("Testing reaction index...")
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "reactions.txt")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("# comment\nH2 + O2 -> H2O\nC + O2 -> CO2\nCH4 + O2 -> CO2 + H2O\nnot an equation\n")
+        path = os.path.join(folder, "reactions.idx")
+        summary = build([source], path)
+        print(f"  built {summary}")
+        assert summary["reactions"] == 3 and summary["skipped"] == 1
+        
+        index = ReactionIndex.open(path, SOLVER_VERSION)
+        entry = index.get("CH4 + O2 -> CO2 + H2O")
+        assert entry["coefficients"]["reactants"] == {"CH4": 1, "O2": 2}
+        assert index.get("O2 + CH4 -> CO2 + H2O") is None
+        
+        # OCR readings where 0 and O are confused find the reaction
+        key, _ = index.find_signature("C + O2 -> CO2")
+        assert key == "C + O2 -> CO2"
+        assert index.find_signature("Xe + F2 -> XeF4") is None
+        
+        # An index built by another solver version is not used
+        assert ReactionIndex.open(path, SOLVER_VERSION + "-old") is None
+        assert ReactionIndex.open(os.path.join(folder, "missing.idx"), SOLVER_VERSION) is None
+        print(f"  {index.stats()['hits']} hit(s), {index.stats()['misses']} miss(es)\n")
+
+
+def test_ocr_correction():
+    print("Testing OCR misread correction against the index...")
+    from app import extract_equation_from_text
+    
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "reactions.txt")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("H2 + O2 -> H2O\nC + O2 -> CO2\nCH4 + O2 -> CO2 + H2O\n")
+        path = os.path.join(folder, "reactions.idx")
+        build([source], path)
+        index, chemistry_solver.reaction_index = chemistry_solver.reaction_index, ReactionIndex.open(path, SOLVER_VERSION)
+        try:
+            cases = [
+                ("2H2 + 02 -> 2H20", "2H2 + O2 → 2H2O"),
+                ("CH4 + 202 -> C02 + 2H20", "CH4 + 2O2 → CO2 + 2H2O"),
+                ("C + O2 -> C02", "C + O2 → CO2"),
+            ]
+            for text, expected in cases:
+                print(f"  {text!r} -> {snap_to_known_reaction(text)!r}")
+                assert snap_to_known_reaction(text) == expected
+                assert extract_equation_from_text(f"Balance: {text}\n") == expected
+            assert snap_to_known_reaction("Xe + F2 -> XeF4") is None
+            # Without a match, an equation that reads cleanly is preferred
+            assert extract_equation_from_text("2Xe + 02 -> 2Xe0\nN2 + H2 -> NH3") == "N2 + H2 → NH3"
+        finally:
+            chemistry_solver.reaction_index = index
+        print()
+
+
+if __name__ == "__main__":
+    test_index_lookups()
+    test_ocr_correction()
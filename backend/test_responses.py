@@ -0,0 +1,86 @@
+"""
+Test script for JSON rendering, compression and cache headers.
+Run this to test: python test_responses.py
+"""
+import json
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from responses import CompressionMiddleware, FastJSONResponse, _accepted_encoding, cacheable
+
+
+def test_rendering():
+    print("Testing JSON rendering...")
+    body = FastJSONResponse(content={"coefficients": {"H2": 2}, "big": 2 ** 70, "text": "→"}).body
+    print(f"  {body}\n")
+    assert json.loads(body) == {"coefficients": {"H2": 2}, "big": 2 ** 70, "text": "→"}
+
+
+def test_accepted_encoding():
+    print("Testing Accept-Encoding...\n")
+    assert _accepted_encoding("gzip, deflate") == "gzip"
+    assert _accepted_encoding("gzip;q=0, deflate") is None
+    assert _accepted_encoding("") is None
+
+
+def _client() -> TestClient:
+    async def solve(request: Request):
+        size = int(request.query_params.get("size", "10"))
+        return cacheable(request, FastJSONResponse(content={"steps": ["x" * size]}), 60, vary=("Prefer",))
+
+    async def events(request: Request):
+        async def stream():
+            for i in range(3):
+                yield f"data: {'x' * 2000}{i}\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/solve", solve), Route("/events", events)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_compression():
+    print("Testing compression...")
+    client = _client()
+    small = client.get("/solve?size=10", headers={"Accept-Encoding": "gzip"})
+    large = client.get("/solve?size=5000", headers={"Accept-Encoding": "gzip"})
+    stream = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    print(f"  small: {small.headers.get('content-encoding')}, large: {large.headers.get('content-encoding')} "
+          f"({large.headers['content-length']} bytes), stream: {stream.headers.get('content-encoding')}\n")
+    assert "content-encoding" not in small.headers
+    assert large.headers["content-encoding"] == "gzip"
+    assert int(large.headers["content-length"]) < 5000
+    assert large.json()["steps"][0] == "x" * 5000
+    assert "content-encoding" not in stream.headers
+    # Shared caches must keep encodings apart, also for bodies sent as is
+    plain = client.get("/solve?size=5000", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    for response in (small, large, plain):
+        assert "Accept-Encoding" in response.headers["vary"]
+    assert "vary" not in stream.headers
+
+
+def test_etag():
+    print("Testing ETag...")
+    client = _client()
+    first = client.get("/solve")
+    etag = first.headers["etag"]
+    again = client.get("/solve", headers={"If-None-Match": etag})
+    other = client.get("/solve?size=11", headers={"If-None-Match": etag})
+    print(f"  {etag}: {again.status_code}, changed body: {other.status_code}\n")
+    assert first.headers["cache-control"] == "public, max-age=60"
+    assert again.status_code == 304 and not again.content
+    for response in (first, again):
+        assert {"Prefer", "Accept-Encoding"} <= {name.strip() for name in response.headers["vary"].split(",")}
+    assert other.status_code == 200
+
+
+if __name__ == "__main__":
+    test_rendering()
+    test_accepted_encoding()
+    test_compression()
+    test_etag()
@@ -0,0 +1,47 @@
+"""
+Test script for the persistent result store.
+Run this to test: python test_result_store.py
+"""
+import os
+import tempfile
+import time
+
+from result_store import ResultStore
+
+
+def test_round_trip_and_versions():
+    print("Testing stored results and version invalidation...")
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "results.db")
+        store = ResultStore(path, "solver-1", max_entries=100)
+        entry = {"coefficients": {"reactants": {"H2": 2, "O2": 1}, "products": {"H2O": 2}}}
+        store.set("equation", "H2+O2=H2O", entry)
+        assert store.get("equation", "H2+O2=H2O") == entry
+        assert store.get("image", "H2+O2=H2O") is None
+        
+        # Another process with the same version sees the result...
+        assert ResultStore(path, "solver-1", max_entries=100).get("equation", "H2+O2=H2O") == entry
+        # ...a new solver version starts empty
+        upgraded = ResultStore(path, "solver-2", max_entries=100)
+        assert upgraded.get("equation", "H2+O2=H2O") is None
+        print(f"  {upgraded.stats()}\n")
+
+
+def test_eviction():
+    print("Testing size-bounded eviction...")
+    with tempfile.TemporaryDirectory() as folder:
+        store = ResultStore(os.path.join(folder, "results.db"), "solver-1", max_entries=3)
+        for i in range(5):
+            store.set("equation", f"key{i}", {"i": i})
+            time.sleep(0.001)
+        store.trim("equation")
+        kept = [key for key, _ in store.recent("equation", 10)]
+        print(f"  kept {kept}")
+        assert kept == ["key4", "key3", "key2"]
+        assert store.stats()["evictions"] == 2
+        print()
+
+
+if __name__ == "__main__":
+    test_round_trip_and_versions()
+    test_eviction()
@@ -0,0 +1,30 @@
+"""
+Test script for worksheet line detection.
+Run this to test: python test_segmentation.py
+"""
+from PIL import Image, ImageDraw
+
+from segmentation import find_text_lines
+
+
+def test_find_text_lines():
+    print("Testing text line detection...")
+    page = Image.new("L", (600, 400), 255)
+    draw = ImageDraw.Draw(page)
+    # Three "lines": the second has a subscript separated by a 2px gap
+    draw.rectangle((50, 40, 300, 60), fill=0)
+    draw.rectangle((80, 150, 500, 170), fill=0)
+    draw.rectangle((200, 173, 220, 178), fill=0)
+    draw.rectangle((20, 300, 120, 330), fill=0)
+    # A speck of noise is not a line
+    draw.point((590, 250), fill=0)
+    
+    boxes = find_text_lines(page, pad=0)
+    print(f"  {boxes}")
+    assert boxes == [(50, 40, 301, 61), (80, 150, 501, 179), (20, 300, 121, 331)]
+    assert find_text_lines(Image.new("L", (100, 100), 255)) == []
+    print()
+
+
+if __name__ == "__main__":
+    test_find_text_lines()
@@ -0,0 +1,124 @@
+"""
+Test script for single-flight request coalescing.
+Run this to test: python test_singleflight.py
+"""
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_coalescing():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = 0
+        
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "2H2 + O2 → 2H2O"
+        
+        results = await asyncio.gather(*(flight.do("H2+O2=H2O", compute) for _ in range(30)))
+        print(f"  30 requests, {calls} computation, {flight.stats()}")
+        assert calls == 1
+        assert [shared for _, shared in results].count(False) == 1
+        assert all(result == "2H2 + O2 → 2H2O" for result, _ in results)
+        assert len(flight) == 0
+    
+    print("Testing coalescing...")
+    asyncio.run(scenario())
+    print()
+
+
+def test_errors_and_cancellation():
+    async def scenario():
+        flight = SingleFlight("test")
+        
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad equation")
+        
+        outcomes = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+        
+        # The leader going away does not stop the computation for the others
+        finished = asyncio.Event()
+        
+        async def slow():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return 42
+        
+        leader = asyncio.ensure_future(flight.do("slow", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("slow", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == (42, True)
+        assert finished.is_set()
+        
+        # ...but it is cancelled once nobody is waiting for it
+        lonely = asyncio.ensure_future(flight.do("lonely", slow))
+        await asyncio.sleep(0.01)
+        lonely.cancel()
+        await asyncio.sleep(0.01)
+        assert len(flight) == 0 and flight.cancelled == 1
+        print(f"  {flight.stats()}")
+    
+    print("Testing error propagation and cancellation...")
+    asyncio.run(scenario())
+    print()
+
+
+def test_coalesced_images_count_once():
+    import time
+    import app
+    
+    def analyze(data, digest):
+        time.sleep(0.05)
+        return {"extracted_text": "H2 + O2 -> H2O", "ocr": {"path": "single_pass", "passes": 1},
+                "image_size": (100, 40), "equation": "H2 + O2 → H2O"}, None
+    
+    async def scenario():
+        return await asyncio.gather(*(app.solve_image(b"same upload bytes") for _ in range(5)))
+    
+    print("Testing OCR path counts for coalesced uploads...")
+    analyze_image, app.analyze_image = app.analyze_image, analyze
+    before = app.ocr_path_counts["single_pass"]
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        app.analyze_image = analyze_image
+    print(f"  {app.image_flight.stats()}\n")
+    assert all(result["balanced_equation"] == "2H2 + O2 → 2H2O" for result in results)
+    assert app.ocr_path_counts["single_pass"] == before + 1
+
+
+def test_uncached_equations_off_the_loop():
+    import threading
+    import app
+    
+    print("Testing equations without a cache key...\n")
+    loop_thread = threading.get_ident()
+    threads = []
+    balance_parsed = app.EquationBalancer.balance_parsed
+    
+    def record(self, include_steps=True):
+        threads.append(threading.get_ident())
+        return balance_parsed(self, include_steps)
+    
+    app.EquationBalancer.balance_parsed = record
+    try:
+        # H2 appears twice, so there is no canonical key
+        result = asyncio.run(app.balance_coalesced("H2 + H2 + O2 -> H2O"))
+    finally:
+        app.EquationBalancer.balance_parsed = balance_parsed
+    assert "balanced_equation" in result or "error" in result
+    assert threads and loop_thread not in threads
+
+
+if __name__ == "__main__":
+    test_coalescing()
+    test_errors_and_cancellation()
+    test_coalesced_images_count_once()
+    test_uncached_equations_off_the_loop()
@@ -0,0 +1,105 @@
+"""
+Test script for fast imports and the background OCR probe.
+Run this to test: python test_startup.py
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import app
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_deferred_imports():
+    print("Testing that importing the app defers heavy modules...")
+    code = ("import sys, app; "
+            "print(' '.join(m for m in ('PIL', 'numpy', 'pytesseract', 'tesserocr') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True).stdout
+    print(f"  loaded at import: {loaded.strip() or 'none'}\n")
+    assert loaded.strip() == ""
+
+
+def test_probe_does_not_block_the_loop():
+    print("Testing the OCR probe while requests are served...")
+    probed, backend, select = app._ocr_probed, app._ocr_backend, app.select_ocr_backend
+    started = threading.Event()
+
+    def slow_probe(preference):
+        started.set()
+        time.sleep(0.3)
+        return None
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        # The startup probe holds the lock...
+        probe = asyncio.ensure_future(asyncio.to_thread(app.get_ocr_backend))
+        await asyncio.to_thread(started.wait)
+        # ...so ocr_available answers at once, and wait_for_ocr waits off the loop
+        before = time.perf_counter()
+        assert app.ocr_available() is False
+        assert time.perf_counter() - before < 0.05
+        assert await app.wait_for_ocr() is False
+        await probe
+        ticker.cancel()
+        return ticks
+
+    app._ocr_probed, app._ocr_backend, app.select_ocr_backend = False, None, slow_probe
+    try:
+        ticks = asyncio.run(scenario())
+    finally:
+        app._ocr_probed, app._ocr_backend, app.select_ocr_backend = probed, backend, select
+    print(f"  event loop ran {ticks} times during the probe\n")
+    assert ticks >= 10
+
+
+def test_warm_up_status():
+    print("Testing that readiness reports the real warm-up outcome...")
+    balance, wait, enabled = app.balance_equation, app.wait_for_ocr, app.config.WARMUP_ON_STARTUP
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def record(equation):
+        threads.append(threading.get_ident())
+        return balance(equation)
+
+    def broken(equation):
+        raise RuntimeError("solver unavailable")
+
+    async def no_ocr():
+        return False
+
+    app.wait_for_ocr, app.config.WARMUP_ON_STARTUP = no_ocr, True
+    try:
+        app.balance_equation = record
+        asyncio.run(app.prepare_worker())
+        assert app.readiness_check()["warmed_up"] is True
+        # The warm-up solves ran on worker threads
+        assert len(threads) == len(app.WARMUP_EQUATIONS) and loop_thread not in threads
+
+        app._warmed_up = False
+        app.balance_equation = broken
+        asyncio.run(app.prepare_worker())
+        status = app.readiness_check()
+        print(f"  after a failed warm-up: {status}\n")
+        assert status["status"] == "ready" and status["warmed_up"] is False
+    finally:
+        app.balance_equation, app.wait_for_ocr, app.config.WARMUP_ON_STARTUP = balance, wait, enabled
+        app._warmed_up = False
+
+
+if __name__ == "__main__":
+    test_deferred_imports()
+    test_probe_does_not_block_the_loop()
+    test_warm_up_status()
@@ -0,0 +1,66 @@
+"""
+Test script for molar masses, limiting reagents and yields.
+Run this to test: python test_stoichiometry.py
+"""
+from chemistry_solver import EquationBalancer, balance_equation
+from stoichiometry import limiting_reagents, molar_masses, solve_scenarios
+
+
+def parsed(equation):
+    balancer = EquationBalancer(equation)
+    assert balancer.parse_equation()
+    result = balance_equation(equation)
+    coefficients = (
+        [result["coefficients"]["reactants"][f.formula] for f in balancer.reactants] +
+        [result["coefficients"]["products"][f.formula] for f in balancer.products]
+    )
+    return balancer, coefficients
+
+
+def test_molar_masses():
+    print("Testing molar masses...\n")
+    balancer, _ = parsed("Al2(SO4)3 + Ca(OH)2 -> Al(OH)3 + CaSO4")
+    masses = molar_masses(balancer)
+    for formula, mass in zip(balancer.reactants + balancer.products, masses):
+        print(f"  {formula.formula:10} {mass:8.3f} g/mol")
+    assert [round(float(mass), 1) for mass in masses] == [342.1, 74.1, 78.0, 136.1]
+    print()
+
+
+def test_limiting_reagents():
+    print("Testing batched limiting reagents...\n")
+    import numpy as np
+
+    # 2H2 + O2 -> 2H2O, four scenarios in moles; NaN means in excess
+    moles = np.array([[4.0, 1.0], [1.0, 4.0], [np.nan, 3.0], [np.nan, np.nan]])
+    limiting, extent = limiting_reagents(np.array([2.0, 1.0]), moles)
+    print(f"  limiting: {limiting.tolist()}, extent: {extent.tolist()}\n")
+    assert limiting.tolist() == [1, 0, 1, -1]
+    assert extent[:3].tolist() == [1.0, 0.5, 3.0]
+
+
+def test_scenarios():
+    print("Testing scenarios...\n")
+    balancer, coefficients = parsed("CH4 + O2 -> CO2 + H2O")
+    answer = solve_scenarios(balancer, coefficients, [{"CH4": 1, "O2": 1}, {"O2": 4}, {}], unit="mol")
+    first, second, empty = answer["scenarios"]
+    print(f"  {first}\n  {second}\n  {empty}\n")
+    assert first["limiting_reagent"] == "O2"
+    assert first["theoretical_yield"]["H2O"]["mol"] == 1.0
+    assert first["remaining"]["CH4"]["mol"] == 0.5
+    assert second["theoretical_yield"]["CO2"]["mol"] == 2.0
+    assert "error" in empty
+    assert round(sum(answer["mass_ratios"][f] for f in ("CH4", "O2")), 6) == 1.0
+
+    try:
+        solve_scenarios(balancer, coefficients, [{"CO2": 1}])
+    except ValueError as e:
+        print(f"  Rejected: {e}\n")
+    else:
+        raise AssertionError("a product was accepted as a reactant amount")
+
+
+if __name__ == "__main__":
+    test_molar_masses()
+    test_limiting_reagents()
+    test_scenarios()
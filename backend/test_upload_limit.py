@@ -0,0 +1,64 @@
+"""
+Test script for the upload size limit.
+Run this to test: python test_upload_limit.py
+"""
+import asyncio
+
+from fastapi import FastAPI, File, UploadFile
+from starlette.testclient import TestClient
+
+from upload_limit import BodySizeLimitMiddleware
+
+LIMIT = 10_000
+
+
+def _app() -> BodySizeLimitMiddleware:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(image: UploadFile = File(...)):
+        return {"bytes": len(await image.read())}
+
+    return BodySizeLimitMiddleware(app, max_bytes=LIMIT, detail="too large")
+
+
+def test_content_length():
+    print("Testing uploads refused by Content-Length...")
+    client = TestClient(_app())
+    small = client.post("/upload", files={"image": ("a.png", b"x" * 1000)})
+    large = client.post("/upload", files={"image": ("a.png", b"x" * 50_000)})
+    print(f"  small: {small.status_code}, large: {large.status_code} {large.json()}\n")
+    assert small.status_code == 200 and small.json() == {"bytes": 1000}
+    assert large.status_code == 413 and large.json() == {"detail": "too large"}
+
+
+def test_streamed_body():
+    print("Testing chunked uploads stopped while they arrive...")
+    boundary = "xyz"
+    chunks = [f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="a.png"\r\n\r\n'.encode()]
+    chunks += [b"x" * 4096] * 100 + [f"\r\n--{boundary}--\r\n".encode()]
+    read = []
+    statuses = []
+
+    async def receive():
+        body = chunks[len(read)]
+        read.append(len(body))
+        return {"type": "http.request", "body": body, "more_body": len(read) < len(chunks)}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    # No Content-Length: the body is sent chunked
+    scope = {"type": "http", "method": "POST", "path": "/upload", "raw_path": b"/upload", "root_path": "",
+             "scheme": "http", "query_string": b"", "server": ("test", 80), "client": ("test", 1),
+             "http_version": "1.1", "headers": [(b"content-type", f"multipart/form-data; boundary={boundary}".encode())]}
+    asyncio.run(_app()(scope, receive, send))
+    print(f"  {statuses}, {sum(read)} of {sum(map(len, chunks))} bytes read\n")
+    assert statuses == [413]
+    assert sum(read) <= LIMIT + 4096
+
+
+if __name__ == "__main__":
+    test_content_length()
+    test_streamed_body()
@@ -0,0 +1,101 @@
+"""
+Test script for the bounded OCR worker pool.
+Run this to test: python test_worker_pool.py
+"""
+import asyncio
+import io
+import threading
+import time
+
+from worker_pool import BoundedWorkerPool, PoolSaturatedError
+
+
+def test_saturation():
+    async def scenario():
+        pool = BoundedWorkerPool("test", workers=1, max_queue=1)
+        release = threading.Event()
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        try:
+            await pool.run(lambda: "rejected")
+            raise AssertionError("a third task should not fit")
+        except PoolSaturatedError as e:
+            print(f"  rejected, retry after {e.retry_after}s; {pool.stats()}")
+            assert e.retry_after >= 1
+        release.set()
+        assert await running is True and await queued == "queued"
+        stats = pool.stats()
+        assert stats["completed"] == 2 and stats["rejected"] == 1 and stats["queue_depth"] == 0
+        pool.shutdown()
+
+    print("Testing saturation...")
+    asyncio.run(scenario())
+    print()
+
+
+def test_accounting_on_errors_and_cancellation():
+    async def scenario():
+        pool = BoundedWorkerPool("test", workers=1, max_queue=1)
+
+        def fail():
+            raise ValueError("unreadable image")
+
+        try:
+            await pool.run(fail)
+        except ValueError:
+            pass
+        assert pool.stats()["running"] == 0 and pool._pending == 0
+
+        # A queued task whose request goes away frees its slot
+        release = threading.Event()
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(time.sleep, 0))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.sleep(0)
+        assert pool._pending == 1
+        # ...so another one fits again
+        again = asyncio.ensure_future(pool.run(lambda: "again"))
+        release.set()
+        assert await running is True and await again == "again"
+        assert pool._pending == 0
+        print(f"  {pool.stats()}")
+        pool.shutdown()
+
+    print("Testing in-flight accounting after errors and cancellation...")
+    asyncio.run(scenario())
+    print()
+
+
+def test_busy_response():
+    print("Testing 503 with Retry-After when the OCR pool is full...")
+    from fastapi.testclient import TestClient
+    from PIL import Image
+
+    import app
+
+    pool, app.ocr_pool = app.ocr_pool, BoundedWorkerPool("ocr", workers=1, max_queue=0)
+    release = threading.Event()
+    blocker = threading.Thread(target=lambda: asyncio.run(app.ocr_pool.run(release.wait)))
+    blocker.start()
+    try:
+        while app.ocr_pool.stats()["running"] == 0:
+            time.sleep(0.01)
+        upload = io.BytesIO()
+        Image.new("L", (40, 40), 255).save(upload, format="PNG")
+        response = TestClient(app.app).post("/api/process-image", files={"image": ("page.png", upload.getvalue())})
+        print(f"  {response.status_code}, Retry-After: {response.headers.get('retry-after')}\n")
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) >= 1
+    finally:
+        release.set()
+        blocker.join()
+        app.ocr_pool.shutdown()
+        app.ocr_pool = pool
+
+
+if __name__ == "__main__":
+    test_saturation()
+    test_accounting_on_errors_and_cancellation()
+    test_busy_response()
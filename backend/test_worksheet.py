@@ -0,0 +1,60 @@
+"""
+Test script for worksheet mode, with a stand-in OCR engine so it runs
+without Tesseract installed.
+Run this to test: python test_worksheet.py
+"""
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import app
+
+# One box per line, told apart by width
+LINES = {100: "C + 02 -> C02", 200: "line unreadable", 300: "H2 + O2 -> H2O; N2 + H2 -> NH3"}
+
+
+class LineBackend(app.OCRBackend):
+    name = "lines"
+
+    def image_to_string(self, image, profile):
+        text = LINES[image.width]
+        if text == "line unreadable":
+            raise RuntimeError("tesseract crashed")
+        return text
+
+
+def _page() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("L", (400, 100), 255).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_worksheet_lines():
+    print("Testing worksheet lines with snapping and a failed line...")
+    saved = app._ocr_probed, app._ocr_backend, app.find_text_lines
+    app._ocr_probed, app._ocr_backend = True, LineBackend()
+    app.find_text_lines = lambda page: [(0, 0, 100, 20), (0, 30, 200, 50), (0, 60, 300, 80)]
+    try:
+        response = TestClient(app.app).post(
+            "/api/process-worksheet", files={"image": ("page.png", _page(), "image/png")})
+    finally:
+        app._ocr_probed, app._ocr_backend, app.find_text_lines = saved
+    assert response.status_code == 200, response.text
+    lines = response.json()["lines"]
+    for line in lines:
+        print(f"  {line['index']}: {line.get('error') or [eq['equation'] for eq in line['equations']]}")
+    print()
+
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    # OCR misreads are snapped to the known reaction, as for a single photo
+    assert [eq["equation"] for eq in lines[0]["equations"]] == ["C + O2 → CO2"]
+    assert "balanced_equation" in lines[0]["equations"][0]["result"]
+    # One line's OCR error is reported on that line only
+    assert lines[1]["error"] == "OCR error: tesseract crashed" and lines[1]["equations"] == []
+    assert [eq["equation"] for eq in lines[2]["equations"]] == ["H2 + O2 → H2O", "N2 + H2 → NH3"]
+    assert response.json()["equations_found"] == 3
+
+
+if __name__ == "__main__":
+    test_worksheet_lines()
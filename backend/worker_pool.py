@@ -0,0 +1,98 @@
+"""
+Bounded thread pool for blocking work (OCR) called from async endpoints.
+"""
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a task is submitted while the pool's queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Worker pool is saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedWorkerPool:
+    """
+    Runs blocking callables on a fixed number of threads with a bounded
+    queue in front of them. Submissions beyond workers + max_queue are
+    rejected immediately instead of waiting without limit.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_service = 0.0
+
+    def _retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up, from the mean service time."""
+        mean_service = self._total_service / self.completed if self.completed else 1.0
+        return max(1, math.ceil(mean_service * (self._pending - self._running + 1) / self.workers))
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args) on the pool and await its result."""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturatedError(self._retry_after())
+            self._pending += 1
+        submitted = time.perf_counter()
+        # Keep request-scoped context (e.g. stage timings) visible in the worker
+        context = contextvars.copy_context()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                wait = started - submitted
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                return context.run(fn, *args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self.completed += 1
+                    self._total_service += time.perf_counter() - started
+
+        future = self._executor.submit(task)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            # A task cancelled before it started never reaches its own cleanup
+            if future.cancelled():
+                with self._lock:
+                    self._pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self._running
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(1000 * self._total_wait / started, 2) if started else 0.0,
+                "max_wait_ms": round(1000 * self._max_wait, 2),
+            }